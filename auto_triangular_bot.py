@@ -20,6 +20,11 @@ import logging
 from dataclasses import dataclass
 import json
 
+from conversion import conversion_symbols, execute_conversions, plan_conversions
+from log_pipeline import setup_async_logging
+from rate_limiter import RateLimitedExchange, get_rate_limiter
+from valuation import free_balances
+
 # Загружаем переменные окружения
 try:
     from dotenv import load_dotenv
@@ -54,6 +59,7 @@ class AutoTriangularBot:
         # Настройки
         self.min_profit = float(os.getenv('MIN_PROFIT_THRESHOLD', '0.5'))  # Снижаем порог
         self.min_balance_usdt = float(os.getenv('MIN_BALANCE_USDT', '10.0'))  # Минимальный баланс
+        self.conversion_concurrency = int(os.getenv('CONVERSION_CONCURRENCY', '4'))
         self.trading_mode = os.getenv('TRADING_MODE', 'live')
         
         # Telegram
@@ -73,15 +79,8 @@ class AutoTriangularBot:
         self.setup_logging()
         
     def setup_logging(self):
-        """Настройка логирования"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('auto_triangular.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Настройка логирования (очередь + фоновая запись с ротацией)"""
+        setup_async_logging('auto_triangular.log')
         self.logger = logging.getLogger(__name__)
     
     async def initialize(self):
@@ -98,14 +97,14 @@ class AutoTriangularBot:
             return False
         
         try:
-            self.exchange = ccxt.mexc({
+            # Лимиты соблюдает общий менеджер по весам эндпоинтов MEXC, а не фиксированный rateLimit ccxt
+            self.exchange = RateLimitedExchange(ccxt.mexc({
                 'apiKey': api_key,
                 'secret': api_secret,
                 'sandbox': sandbox,
-                'enableRateLimit': True,
-                'rateLimit': 500,  # Быстрее для арбитража
+                'enableRateLimit': False,
                 'options': {'defaultType': 'spot'}
-            })
+            }), get_rate_limiter())
             
             # Загружаем рынки
             self.markets = await self.exchange.load_markets()
@@ -203,49 +202,34 @@ class AutoTriangularBot:
     async def convert_to_base_currency(self, base_currency: str) -> float:
         """Конвертировать весь баланс в базовую валюту"""
         try:
+            # Один снимок баланса и тикеров для всего плана
             balance = await self.exchange.fetch_balance()
-            total_base = 0.0
-            conversions = []
+            balances = free_balances(balance)
+            symbols = conversion_symbols(balances, self.markets, base_currency)
+            tickers = await self.exchange.fetch_tickers(symbols) if symbols else {}
             
-            for currency, info in balance.items():
-                free_amount = info.get('free', 0.0)
-                if free_amount > 0 and currency != base_currency:
-                    # Пытаемся найти прямую пару
-                    pair = f"{currency}/{base_currency}"
-                    if pair in self.markets:
-                        try:
-                            ticker = await self.exchange.fetch_ticker(pair)
-                            if ticker['bid'] > 0:
-                                # Продаем валюту за базовую
-                                order = await self.exchange.create_market_sell_order(pair, free_amount)
-                                if order['status'] == 'closed':
-                                    converted = order['filled'] * order['average']
-                                    total_base += converted
-                                    conversions.append(f"{currency}: {free_amount:.6f} → {converted:.6f} {base_currency}")
-                                    self.logger.info(f"✅ Конвертировано {currency}: {free_amount:.6f} → {converted:.6f} {base_currency}")
-                        except Exception as e:
-                            self.logger.warning(f"⚠️ Не удалось конвертировать {currency}: {e}")
-                    else:
-                        # Пытаемся через обратную пару
-                        reverse_pair = f"{base_currency}/{currency}"
-                        if reverse_pair in self.markets:
-                            try:
-                                ticker = await self.exchange.fetch_ticker(reverse_pair)
-                                if ticker['ask'] > 0:
-                                    # Покупаем базовую валюту
-                                    base_amount = free_amount / ticker['ask']
-                                    order = await self.exchange.create_market_buy_order(reverse_pair, base_amount)
-                                    if order['status'] == 'closed':
-                                        converted = order['filled']
-                                        total_base += converted
-                                        conversions.append(f"{currency}: {free_amount:.6f} → {converted:.6f} {base_currency}")
-                                        self.logger.info(f"✅ Конвертировано {currency}: {free_amount:.6f} → {converted:.6f} {base_currency}")
-                            except Exception as e:
-                                self.logger.warning(f"⚠️ Не удалось конвертировать {currency} через обратную пару: {e}")
+            # Прямые пары продаем, через обратные - покупаем базовую валюту
+            plan, dust = plan_conversions(balances, tickers, self.markets, base_currency)
+            if dust:
+                self.logger.info("💨 Пропущена пыль ниже минимального объема: %s", ', '.join(dust))
+            
+            # Независимые ордера отправляем параллельно
+            results = await execute_conversions(self.exchange, plan, self.conversion_concurrency)
+            
+            total_converted = 0.0
+            conversions = []
+            for result in results:
+                order = result.order
+                if result.success:
+                    total_converted += result.converted
+                    conversions.append(f"{order.currency}: {order.source_amount:.6f} → {result.converted:.6f} {base_currency}")
+                    self.logger.info("✅ Конвертировано %s: %.6f → %.6f %s", order.currency, order.source_amount, result.converted, base_currency)
+                else:
+                    self.logger.warning("⚠️ Не удалось конвертировать %s: %s", order.currency, result.error)
             
             # Добавляем уже имеющуюся базовую валюту
-            existing_base = balance.get(base_currency, {}).get('free', 0.0)
-            total_base += existing_base
+            existing_base = balances.get(base_currency, 0.0)
+            total_base = existing_base + total_converted
             
             if conversions:
                 await self.send_telegram(f"""
@@ -254,6 +238,7 @@ class AutoTriangularBot:
 🔄 **Конвертировано:**
 {chr(10).join(conversions)}
 
+💱 **Получено:** {total_converted:.6f} {base_currency}
 💰 **Итого {base_currency}:** {total_base:.6f}
                 """)
             
@@ -534,7 +519,7 @@ class AutoTriangularBot:
                 self.stats['cycles'] += 1
                 cycle_start = time.time()
                 
-                self.logger.info(f"🔄 Цикл {self.stats['cycles']} - {datetime.now().strftime('%H:%M:%S')}")
+                self.logger.info("🔄 Цикл %d", self.stats['cycles'])
                 
                 # Ищем лучший треугольник
                 opportunity = await self.find_best_triangle()
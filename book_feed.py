@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Потоковые стаканы через WebSocket (ccxt.pro watch_order_book)
+Подписка только на ноги треугольников-кандидатов, лучшие цены пишутся в QuoteStore,
+верхние уровни глубины - для перепроверки перед сделкой.
+
+У каждого стакана есть состояние: syncing - ждем первый стакан, live - стакан целый,
+resync - номер обновления (nonce) пошел назад или стакан пересекся (bid >= ask).
+В resync котировка помечается устаревшей, кэш стакана в ccxt сбрасывается, обновления
+потока копятся в буфере, а стакан восстанавливается по REST снимку и самому свежему
+обновлению из буфера, которое новее снимка.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from quote_store import QuoteStore
+
+logger = logging.getLogger(__name__)
+
+# Состояния стакана
+BOOK_SYNCING = 'syncing'
+BOOK_LIVE = 'live'
+BOOK_RESYNC = 'resync'
+
+# Причины пересинхронизации
+RESYNC_SEQUENCE = 'sequence'
+RESYNC_CROSSED = 'crossed'
+
+# Сколько обновлений потока храним, пока идет REST снимок
+RESYNC_BUFFER = 50
+
+
+class BookTop:
+    """Верхние уровни стакана одного символа"""
+
+    __slots__ = ('bids', 'asks', 'timestamp', 'received')
+
+    def __init__(self, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]],
+                 timestamp: float, received: float):
+        self.bids = bids
+        self.asks = asks
+        self.timestamp = timestamp  # время на бирже, мс (0 - неизвестно)
+        self.received = received    # time.monotonic()
+
+    def age_ms(self, now_ms: Optional[float] = None, now_monotonic: Optional[float] = None) -> float:
+        if now_monotonic is None:
+            now_monotonic = time.monotonic()
+        age = (now_monotonic - self.received) * 1000
+        if self.timestamp > 0:
+            if now_ms is None:
+                now_ms = time.time() * 1000
+            age = max(age, now_ms - self.timestamp)
+        return age
+
+
+class BookFeed:
+    """Подписки на стаканы с ограничением числа символов (вытесняются давно не нужные)"""
+
+    def __init__(self, exchange, quotes: QuoteStore, depth: int = 10, max_symbols: int = 60,
+                 on_reconnect: Optional[Callable[[], None]] = None,
+                 on_message: Optional[Callable[[str], None]] = None,
+                 on_resync: Optional[Callable[[str], None]] = None):
+        self.exchange = exchange
+        self.quotes = quotes
+        self.depth = depth
+        self.max_symbols = max_symbols
+        self.on_reconnect = on_reconnect
+        self.on_message = on_message
+        self.on_resync = on_resync
+        self.books: Dict[str, BookTop] = {}
+        self.health: Dict[str, str] = {}
+        self.nonces: Dict[str, int] = {}
+        self.resyncs = 0
+        self._tasks: 'OrderedDict[str, asyncio.Task]' = OrderedDict()
+        self._ready: Dict[str, asyncio.Event] = {}
+        self._buffers: Dict[str, Deque[Dict]] = {}
+        self._resync_tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def supported(self) -> bool:
+        has = getattr(self.exchange, 'has', None) or {}
+        return bool(has.get('watchOrderBook'))
+
+    def watch(self, symbols: Iterable[str]):
+        """Подписаться на символы (уже подписанные поднимаются в начало очереди вытеснения)"""
+        for symbol in symbols:
+            if symbol in self._tasks:
+                self._tasks.move_to_end(symbol)
+                continue
+            self._ready[symbol] = asyncio.Event()
+            self.health[symbol] = BOOK_SYNCING
+            self._tasks[symbol] = asyncio.create_task(self._run(symbol))
+
+        while len(self._tasks) > self.max_symbols:
+            symbol = next(iter(self._tasks))
+            self.unwatch([symbol])
+
+    def unwatch(self, symbols: Iterable[str]):
+        """Отписаться от символов (делистинг, пара выпала из вселенной)"""
+        for symbol in symbols:
+            for tasks in (self._tasks, self._resync_tasks):
+                task = tasks.pop(symbol, None)
+                if task is not None:
+                    task.cancel()
+            for state in (self.books, self._ready, self.health, self.nonces, self._buffers):
+                state.pop(symbol, None)
+
+    async def wait_ready(self, symbols: Iterable[str], timeout: float) -> bool:
+        """Дождаться первого стакана по каждому символу"""
+        events = [self._ready[s].wait() for s in symbols if s in self._ready and not self._ready[s].is_set()]
+        if not events:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*events), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def book(self, symbol: str) -> Optional[BookTop]:
+        """Стакан символа; пока он пересинхронизируется - None"""
+        if self.health.get(symbol) == BOOK_RESYNC:
+            return None
+        return self.books.get(symbol)
+
+    def unhealthy_symbols(self) -> Set[str]:
+        """Символы, стаканам которых сейчас нельзя доверять"""
+        return {symbol for symbol, state in self.health.items() if state == BOOK_RESYNC}
+
+    def check(self, symbol: str, order_book: Dict) -> Optional[str]:
+        """Причина считать стакан испорченным или None"""
+        nonce = order_book.get('nonce')
+        previous = self.nonces.get(symbol)
+        if nonce is not None and previous is not None and nonce < previous:
+            return RESYNC_SEQUENCE
+        bids, asks = order_book.get('bids'), order_book.get('asks')
+        if bids and asks and bids[0][0] >= asks[0][0]:
+            return RESYNC_CROSSED
+        return None
+
+    def _store(self, symbol: str, order_book: Dict):
+        if self.on_message is not None:
+            self.on_message(symbol)
+        if self.health.get(symbol) == BOOK_RESYNC:
+            buffer = self._buffers.get(symbol)
+            if buffer is not None:
+                buffer.append(order_book)
+            return
+        reason = self.check(symbol, order_book)
+        if reason is not None:
+            self._start_resync(symbol, reason)
+            return
+        self._apply(symbol, order_book)
+
+    def _apply(self, symbol: str, order_book: Dict):
+        received = time.monotonic()
+        bids = [(level[0], level[1]) for level in order_book.get('bids', [])[:self.depth]]
+        asks = [(level[0], level[1]) for level in order_book.get('asks', [])[:self.depth]]
+        timestamp = order_book.get('timestamp') or 0.0
+        self.books[symbol] = BookTop(bids, asks, timestamp, received)
+
+        best_bid, bid_size = bids[0] if bids else (0.0, 0.0)
+        best_ask, ask_size = asks[0] if asks else (0.0, 0.0)
+        self.quotes.update(symbol, best_bid, best_ask, bid_size, ask_size, timestamp, received)
+
+        nonce = order_book.get('nonce')
+        if nonce is not None:
+            self.nonces[symbol] = nonce
+        self.health[symbol] = BOOK_LIVE
+
+        ready = self._ready.get(symbol)
+        if ready is not None and not ready.is_set():
+            ready.set()
+
+    def _start_resync(self, symbol: str, reason: str):
+        """Стакан испорчен: не доверять котировке, копить поток и восстановиться по снимку"""
+        self.health[symbol] = BOOK_RESYNC
+        self.resyncs += 1
+        self.quotes.mark_stale([symbol])
+        self._buffers[symbol] = deque(maxlen=RESYNC_BUFFER)
+        # Локальный стакан ccxt собран из тех же дельт - пусть соберет заново со своего снимка
+        cached = getattr(self.exchange, 'orderbooks', None)
+        if isinstance(cached, dict):
+            cached.pop(symbol, None)
+        if self.on_resync is not None:
+            self.on_resync(reason)
+        logger.warning("🧩 Стакан %s испорчен (%s), пересинхронизация по снимку", symbol, reason)
+        if symbol not in self._resync_tasks:
+            self._resync_tasks[symbol] = asyncio.create_task(self._resync(symbol))
+
+    async def _resync(self, symbol: str):
+        """REST снимок плюс более свежие обновления из буфера"""
+        attempt = 0
+        try:
+            while self.health.get(symbol) == BOOK_RESYNC:
+                try:
+                    snapshot = await self.exchange.fetch_order_book(symbol, self.depth)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    attempt += 1
+                    delay = min(30.0, 0.5 * 2 ** min(attempt, 6)) * random.uniform(0.5, 1.0)
+                    logger.warning("⚠️ Снимок стакана %s не получен (%s), повтор через %.1fс", symbol, e, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                buffer = self._buffers.get(symbol, ())
+                base = snapshot.get('nonce')
+                newer = [book for book in buffer
+                         if base is None or book.get('nonce') is None or book['nonce'] > base]
+                # Обновления потока - целые стаканы ccxt: достаточно самого свежего целого
+                self.nonces.pop(symbol, None)
+                for book in reversed([snapshot] + newer):
+                    if self.check(symbol, book) is None:
+                        self._apply(symbol, book)
+                        break
+                else:
+                    attempt += 1
+                    await asyncio.sleep(min(30.0, 0.5 * 2 ** min(attempt, 6)))
+                    continue
+                self._buffers.pop(symbol, None)
+                logger.info("🧩 Стакан %s восстановлен (снимок + %d обновлений из буфера)", symbol, len(newer))
+        finally:
+            self._resync_tasks.pop(symbol, None)
+
+    async def _run(self, symbol: str):
+        failures = 0
+        while True:
+            try:
+                order_book = await self.exchange.watch_order_book(symbol, self.depth)
+                self._store(symbol, order_book)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                if self.on_reconnect:
+                    self.on_reconnect()
+                # Пока поток лежит, котировка не обновляется - сканер не должен ей доверять.
+                # ccxt при разрыве последовательности сам собирает стакан заново - ждем первый целый
+                self.quotes.mark_stale([symbol])
+                self.nonces.pop(symbol, None)
+                if self.health.get(symbol) != BOOK_RESYNC:
+                    self.health[symbol] = BOOK_SYNCING
+                # Разброс задержки: символы упавшего соединения не переподключаются залпом
+                delay = min(30.0, 0.5 * 2 ** min(failures, 6)) * random.uniform(0.5, 1.0)
+                logger.warning("⚠️ Поток стакана %s прерван (%s), повтор через %.1fс", symbol, e, delay)
+                await asyncio.sleep(delay)
+
+    async def stop(self):
+        tasks = list(self._tasks.values()) + list(self._resync_tasks.values())
+        self._tasks.clear()
+        self._resync_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
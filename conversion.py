@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Планировщик конвертации баланса в базовую валюту
+Один снимок баланса и тикеров, отсев пыли ниже минимального объема,
+параллельная отправка независимых ордеров с ограничением конкурентности
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConversionOrder:
+    """Запланированная конвертация одной валюты"""
+    currency: str
+    symbol: str
+    side: str  # sell - currency/base, buy - base/currency
+    amount: float  # количество в базовой валюте символа
+    source_amount: float  # сколько currency тратим
+    expected: float  # ожидаемое количество base_currency
+
+
+@dataclass
+class ConversionResult:
+    """Результат конвертации"""
+    order: ConversionOrder
+    converted: float
+    success: bool
+    error: Optional[str] = None
+
+
+def _limit(market: Mapping, kind: str) -> float:
+    return ((market.get('limits') or {}).get(kind) or {}).get('min') or 0.0
+
+
+def conversion_symbols(balances: Mapping[str, float], markets: Mapping[str, Mapping], base_currency: str,
+                       allow_reverse: bool = True) -> List[str]:
+    """Символы, тикеры которых нужны для плана"""
+    symbols = []
+    for currency in balances:
+        if currency == base_currency:
+            continue
+        direct = f"{currency}/{base_currency}"
+        reverse = f"{base_currency}/{currency}"
+        if direct in markets:
+            symbols.append(direct)
+        elif allow_reverse and reverse in markets:
+            symbols.append(reverse)
+    return symbols
+
+
+def plan_conversions(balances: Mapping[str, float], tickers: Mapping[str, Mapping],
+                     markets: Mapping[str, Mapping], base_currency: str,
+                     allow_reverse: bool = True) -> Tuple[List[ConversionOrder], List[str]]:
+    """
+    План конвертации всех остатков в base_currency.
+    Возвращает (ордера, валюты-пыль ниже минимального объема или без цены).
+    """
+    orders = []
+    dust = []
+
+    for currency, free_amount in balances.items():
+        if currency == base_currency or free_amount <= 0:
+            continue
+
+        direct = f"{currency}/{base_currency}"
+        reverse = f"{base_currency}/{currency}"
+
+        if direct in markets:
+            market = markets[direct]
+            bid = (tickers.get(direct) or {}).get('bid') or 0.0
+            if bid <= 0:
+                dust.append(currency)
+                continue
+            notional = free_amount * bid
+            if free_amount < _limit(market, 'amount') or notional < _limit(market, 'cost'):
+                dust.append(currency)
+                continue
+            orders.append(ConversionOrder(currency, direct, 'sell', free_amount, free_amount, notional))
+
+        elif allow_reverse and reverse in markets:
+            market = markets[reverse]
+            ask = (tickers.get(reverse) or {}).get('ask') or 0.0
+            if ask <= 0:
+                dust.append(currency)
+                continue
+            base_amount = free_amount / ask
+            if base_amount < _limit(market, 'amount') or free_amount < _limit(market, 'cost'):
+                dust.append(currency)
+                continue
+            orders.append(ConversionOrder(currency, reverse, 'buy', base_amount, free_amount, base_amount))
+
+    return orders, dust
+
+
+async def _execute_one(exchange, order: ConversionOrder, semaphore: asyncio.Semaphore) -> ConversionResult:
+    async with semaphore:
+        try:
+            try:
+                amount = float(exchange.amount_to_precision(order.symbol, order.amount))
+            except Exception:
+                amount = order.amount
+
+            if order.side == 'sell':
+                placed = await exchange.create_market_sell_order(order.symbol, amount)
+            else:
+                placed = await exchange.create_market_buy_order(order.symbol, amount)
+
+            if placed.get('status') != 'closed':
+                return ConversionResult(order, 0.0, False, f"статус ордера {placed.get('status')}")
+
+            if order.side == 'sell':
+                converted = (placed.get('filled') or 0.0) * (placed.get('average') or 0.0)
+            else:
+                converted = placed.get('filled') or 0.0
+            return ConversionResult(order, converted, True)
+        except Exception as e:
+            return ConversionResult(order, 0.0, False, str(e))
+
+
+async def execute_conversions(exchange, orders: List[ConversionOrder], max_concurrency: int = 4) -> List[ConversionResult]:
+    """Отправить независимые ордера конвертации параллельно"""
+    if not orders:
+        return []
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    return list(await asyncio.gather(*(_execute_one(exchange, order, semaphore) for order in orders)))
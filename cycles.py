@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Поиск циклов из 4-5 ног по графу валют
+Цикл - последовательность (пара, сторона), которая начинается и заканчивается в одной валюте:
+USDT -> USDC -> BTC -> ETH -> USDT. Перебор в глубину ограничен числом ног и отсекается
+по весам ребер из текущих котировок, поэтому число кандидатов остается управляемым.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from triangles import is_tradable
+
+Leg = Tuple[str, str]        # (пара, buy/sell)
+Cycle = Tuple[Leg, ...]
+Graph = Dict[str, List[Tuple[str, str, str]]]  # валюта -> [(валюта, пара, сторона)]
+
+# Стейблкоины и фиат: через них проходят 4-ногие петли (USDC/USDT, USDT/EUR)
+STABLE_CURRENCIES = ['USDC', 'FDUSD', 'TUSD', 'DAI', 'EUR']
+
+# Комиссия одной сделки MEXC
+LEG_FEE_RATE = 0.002
+
+
+def leg_currencies(symbol: str, side: str) -> Tuple[str, str]:
+    """Из какой валюты в какую переводит нога"""
+    base, quote = symbol.split('/', 1)
+    return (quote, base) if side == 'buy' else (base, quote)
+
+
+def cycle_start(cycle: Sequence[Leg]) -> str:
+    return leg_currencies(*cycle[0])[0]
+
+
+def cycle_path(cycle: Sequence[Leg]) -> str:
+    """Путь цикла для логов: USDT → USDC → BTC → ETH → USDT"""
+    currencies = [cycle_start(cycle)] + [leg_currencies(symbol, side)[1] for symbol, side in cycle]
+    return " → ".join(currencies)
+
+
+def cycle_key(cycle: Sequence[Leg]) -> Tuple[str, ...]:
+    """Ключ цикла в формате треугольника: пары + признак 'cycle'"""
+    return tuple(symbol for symbol, _side in cycle) + ('cycle',)
+
+
+def build_currency_graph(markets: Mapping[str, Mapping], currencies: Optional[Iterable[str]] = None) -> Graph:
+    """Граф обмена: пара BASE/QUOTE дает ребра QUOTE -> BASE (buy) и BASE -> QUOTE (sell)"""
+    allowed = set(currencies) if currencies is not None else None
+    graph: Graph = {}
+    for symbol, market in markets.items():
+        if '/' not in symbol or not is_tradable(market):
+            continue
+        base, quote = symbol.split('/', 1)
+        if allowed is not None and (base not in allowed or quote not in allowed):
+            continue
+        graph.setdefault(quote, []).append((base, symbol, 'buy'))
+        graph.setdefault(base, []).append((quote, symbol, 'sell'))
+    return graph
+
+
+class CycleSearch:
+    """
+    Ограниченный по глубине перебор циклов с отсечением по весам ребер.
+
+    Вес ребра - логарифм курса с комиссией, нормированный потенциалами валют
+    (логарифм стоимости по средним ценам): w = log(rate) + phi(to) - phi(from).
+    Сумма весов по циклу равна логарифму доходности цикла при любых потенциалах,
+    а нормированные веса близки к минус полуспреду - поэтому ветка, которая уже ушла
+    ниже порога больше, чем могут вернуть оставшиеся ноги, отбрасывается без потерь.
+    slack_percent оставляет в кандидатах циклы чуть хуже порога: цены меняются между поисками.
+    """
+
+    def __init__(self, min_legs: int = 4, max_legs: int = 5, max_cycles: int = 2000,
+                 slack_percent: float = 1.0, fee_rate: float = LEG_FEE_RATE):
+        self.min_legs = min_legs
+        self.max_legs = max_legs
+        self.max_cycles = max_cycles
+        self.slack_percent = slack_percent
+        self.fee_rate = fee_rate
+        # Статистика последнего поиска
+        self.visited = 0
+        self.pruned = 0
+        self.found = 0
+        self.elapsed_ms = 0.0
+
+    def edge_weights(self, graph: Graph, bid, ask, ids: Mapping[str, int]) -> Dict[Leg, float]:
+        """Логарифм курса ребра с комиссией; ребра без котировки не попадают"""
+        fee = math.log(1 - self.fee_rate)
+        weights: Dict[Leg, float] = {}
+        for edges in graph.values():
+            for _to, symbol, side in edges:
+                i = ids.get(symbol)
+                if i is None or bid[i] <= 0 or ask[i] <= 0:
+                    continue
+                rate = 1 / ask[i] if side == 'buy' else bid[i]
+                weights[(symbol, side)] = math.log(rate) + fee
+        return weights
+
+    @staticmethod
+    def potentials(graph: Graph, bid, ask, ids: Mapping[str, int], roots: Iterable[str]) -> Dict[str, float]:
+        """Логарифм стоимости валют по средним ценам: обход в ширину от корней"""
+        phi: Dict[str, float] = {}
+        for root in list(roots) + list(graph):
+            if root in phi or root not in graph:
+                continue
+            phi[root] = 0.0
+            queue = deque([root])
+            while queue:
+                current = queue.popleft()
+                for to, symbol, side in graph[current]:
+                    if to in phi:
+                        continue
+                    i = ids.get(symbol)
+                    if i is None or bid[i] <= 0 or ask[i] <= 0:
+                        continue
+                    mid = (bid[i] + ask[i]) / 2
+                    rate = 1 / mid if side == 'buy' else mid
+                    phi[to] = phi[current] - math.log(rate)
+                    queue.append(to)
+        return phi
+
+    def find(self, graph: Graph, starts: Iterable[str], bid, ask, ids: Mapping[str, int],
+             min_profit_percent: float = 0.0) -> List[Cycle]:
+        """Циклы от стартовых валют, лучшие по текущей доходности, не более max_cycles"""
+        start_time = time.perf_counter()
+        starts = [s for s in starts if s in graph]
+        raw = self.edge_weights(graph, bid, ask, ids)
+        phi = self.potentials(graph, bid, ask, ids, starts)
+
+        weights: Dict[Leg, float] = {}
+        for currency, edges in graph.items():
+            for to, symbol, side in edges:
+                w = raw.get((symbol, side))
+                if w is not None and currency in phi and to in phi:
+                    weights[(symbol, side)] = w + phi[to] - phi[currency]
+        best = max(weights.values(), default=0.0)
+        floor = math.log1p(min_profit_percent / 100) - self.slack_percent / 100
+
+        found: List[Tuple[float, Cycle]] = []
+        self.visited = self.pruned = 0
+
+        def extend(start: str, node: str, legs: List[Leg], visited: Set[str], partial: float):
+            for to, symbol, side in graph.get(node, ()):
+                w = weights.get((symbol, side))
+                if w is None:
+                    continue
+                self.visited += 1
+                total = partial + w
+                depth = len(legs) + 1
+                if to == start:
+                    if depth >= self.min_legs and total >= floor:
+                        found.append((total, tuple(legs) + ((symbol, side),)))
+                    continue
+                if depth >= self.max_legs or to in visited:
+                    continue
+                # Сколько еще могут вернуть оставшиеся ноги (минимум одна - замыкающая)
+                remaining = self.max_legs - depth
+                bound = total + (best * remaining if best > 0 else best)
+                if bound < floor:
+                    self.pruned += 1
+                    continue
+                legs.append((symbol, side))
+                visited.add(to)
+                extend(start, to, legs, visited, total)
+                visited.discard(to)
+                legs.pop()
+
+        for start in starts:
+            extend(start, start, [], {start}, 0.0)
+
+        found.sort(key=lambda item: item[0], reverse=True)
+        self.found = len(found)
+        self.elapsed_ms = (time.perf_counter() - start_time) * 1000
+        return [cycle for _edge, cycle in found[:self.max_cycles]]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Общий асинхронный клиент MEXC
+Одно подключение на процесс: пул keep-alive HTTP соединений и рынки, загруженные один раз
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from rate_limiter import RateLimitedExchange, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeClient:
+    """Долгоживущий async клиент MEXC, общий для всех корутин"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or {}
+        self.exchange = None
+        self.session = None
+        self._lock = asyncio.Lock()
+        self._markets_loaded = False
+
+    def _build_config(self) -> Dict:
+        config = {
+            'apiKey': os.getenv('MEXC_API_KEY'),
+            'secret': os.getenv('MEXC_API_SECRET'),
+            'sandbox': os.getenv('MEXC_SANDBOX', 'false').lower() == 'true',
+            # Лимиты соблюдает общий менеджер rate_limiter по весам эндпоинтов
+            'enableRateLimit': False,
+            'timeout': int(os.getenv('MEXC_TIMEOUT_MS', '15000')),
+            'options': {
+                'defaultType': 'spot',
+                'adjustForTimeDifference': True,
+            },
+        }
+        config.update(self.config)
+        return config
+
+    def _create_session(self):
+        """HTTP сессия с пулом keep-alive соединений"""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv('MEXC_HTTP_POOL_SIZE', '20')),
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(connector=connector, trust_env=True)
+
+    def _create_exchange(self, config: Dict):
+        """Клиент ccxt поверх общей сессии"""
+        import ccxt.async_support as ccxt_async
+
+        return ccxt_async.mexc(config)
+
+    async def get(self):
+        """Вернуть готовый клиент, создав его и загрузив рынки при первом вызове"""
+        if self.exchange is not None and self._markets_loaded:
+            return self.exchange
+
+        async with self._lock:
+            if self.exchange is None:
+                self.session = self._create_session()
+                config = self._build_config()
+                config['session'] = self.session
+                self.exchange = RateLimitedExchange(self._create_exchange(config), get_rate_limiter())
+                logger.info("🔌 Создан общий клиент MEXC")
+
+            if not self._markets_loaded:
+                await self.exchange.load_markets()
+                self._markets_loaded = True
+                logger.info("✅ Рынки MEXC загружены: %d пар", len(self.exchange.markets))
+
+        return self.exchange
+
+    @property
+    def has_credentials(self) -> bool:
+        config = self._build_config()
+        return bool(config.get('apiKey') and config.get('secret'))
+
+    async def close(self):
+        """Закрыть клиент и пул соединений"""
+        async with self._lock:
+            if self.exchange is not None:
+                try:
+                    await self.exchange.close()
+                except Exception as e:
+                    logger.warning("⚠️ Ошибка закрытия клиента MEXC: %s", e)
+                self.exchange = None
+            if self.session is not None:
+                await self.session.close()
+                self.session = None
+            self._markets_loaded = False
+
+
+_shared_client: Optional[ExchangeClient] = None
+
+
+def get_shared_client(config: Optional[Dict] = None) -> ExchangeClient:
+    """Общий клиент процесса (config учитывается только при первом вызове)"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = ExchangeClient(config)
+    return _shared_client
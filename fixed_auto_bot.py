@@ -18,6 +18,12 @@ import logging
 from dataclasses import dataclass
 import json
 
+from conversion import conversion_symbols, execute_conversions, plan_conversions
+from log_pipeline import setup_async_logging
+from rate_limiter import RateLimitedExchange, get_rate_limiter, reporting_priority
+from universe import UniverseManager
+from valuation import free_balances, value_portfolio
+
 # Загружаем переменные окружения
 try:
     from dotenv import load_dotenv
@@ -53,8 +59,19 @@ class FixedAutoBot:
         # Настройки (более мягкие)
         self.min_profit = float(os.getenv('MIN_PROFIT_THRESHOLD', '0.3'))  # Еще ниже
         self.min_balance_usdt = float(os.getenv('MIN_BALANCE_USDT', '5.0'))  # Меньше минимум
+        self.conversion_concurrency = int(os.getenv('CONVERSION_CONCURRENCY', '4'))
         self.trading_mode = os.getenv('TRADING_MODE', 'live')
         
+        # Валюты и треугольники выбираются по ликвидности и пересчитываются по ходу работы
+        self.universe = UniverseManager(
+            max_triangles=int(os.getenv('UNIVERSE_MAX_TRIANGLES', '300')),
+            max_currencies=int(os.getenv('UNIVERSE_MAX_CURRENCIES', '30')),
+            min_volume_usd=float(os.getenv('UNIVERSE_MIN_VOLUME_USD', '50000')),
+            max_spread_bps=float(os.getenv('UNIVERSE_MAX_SPREAD_BPS', '50')),
+            base_currencies=['USDT'],
+        )
+        self.universe_refresh_interval = float(os.getenv('UNIVERSE_REFRESH_INTERVAL', '900'))
+        
         # Telegram
         self.telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
@@ -73,15 +90,8 @@ class FixedAutoBot:
         self.setup_logging()
         
     def setup_logging(self):
-        """Настройка логирования без эмодзи"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('fixed_auto_bot.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Настройка логирования без эмодзи (очередь + фоновая запись с ротацией)"""
+        setup_async_logging('fixed_auto_bot.log')
         self.logger = logging.getLogger(__name__)
     
     async def initialize(self):
@@ -98,14 +108,14 @@ class FixedAutoBot:
             return False
         
         try:
-            self.exchange = ccxt.mexc({
+            # Лимиты соблюдает общий менеджер по весам эндпоинтов MEXC, а не фиксированный rateLimit ccxt
+            self.exchange = RateLimitedExchange(ccxt.mexc({
                 'apiKey': api_key,
                 'secret': api_secret,
                 'sandbox': sandbox,
-                'enableRateLimit': True,
-                'rateLimit': 500,
+                'enableRateLimit': False,
                 'options': {'defaultType': 'spot'}
-            })
+            }), get_rate_limiter())
             
             # Загружаем рынки
             self.markets = await self.exchange.load_markets()
@@ -143,15 +153,15 @@ class FixedAutoBot:
         except Exception as e:
             self.logger.error(f"Ошибка Telegram: {e}")
     
-    async def generate_triangles(self):
-        """ИСПРАВЛЕННАЯ генерация треугольников"""
+    async def generate_triangles(self, tickers: Optional[Dict] = None):
+        """ИСПРАВЛЕННАЯ генерация треугольников по самым ликвидным валютам"""
         self.logger.info("Генерация треугольных возможностей...")
         
-        # Упрощенный список популярных валют
-        popular_cryptos = [
-            'BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX',
-            'MATIC', 'LINK', 'UNI', 'LTC', 'DOGE', 'SHIB', 'TRX'
-        ]
+        # Валюты с наибольшим объемом к USDT вместо фиксированного списка (в нем были делистинги)
+        if tickers is None:
+            tickers = await self.exchange.fetch_tickers()
+        universe = self.universe.refresh(tickers, self.markets)
+        popular_cryptos = universe.currencies
         
         self.valid_triangles = []
         
@@ -183,6 +193,11 @@ class FixedAutoBot:
             if all(pair in self.markets for pair in [pair1, pair2_alt, pair3]):
                 self.valid_triangles.append((pair1, pair2_alt, pair3, 'reverse', base))
         
+        # Сканируем только лучшие живые треугольники
+        selected, _evicted = self.universe.select(t[:4] for t in self.valid_triangles)
+        rank = {triangle: i for i, triangle in enumerate(selected)}
+        self.valid_triangles = sorted((t for t in self.valid_triangles if t[:4] in rank), key=lambda t: rank[t[:4]])
+        
         self.logger.info(f"Сгенерировано {len(self.valid_triangles)} треугольных возможностей")
         
         # Показываем примеры
@@ -206,12 +221,7 @@ class FixedAutoBot:
         """Получить все балансы"""
         try:
             balance = await self.exchange.fetch_balance()
-            balances = {}
-            for currency, info in balance.items():
-                free_amount = info.get('free', 0.0)
-                if free_amount > 0:
-                    balances[currency] = free_amount
-            return balances
+            return free_balances(balance)
         except Exception as e:
             self.logger.error(f"Ошибка получения балансов: {e}")
             return {}
@@ -225,31 +235,27 @@ class FixedAutoBot:
                 await self.send_telegram("💰 **ОТЧЕТ О БАЛАНСЕ**\n\n❌ Нет доступных средств")
                 return
             
-            # Сортируем по убыванию
-            sorted_balances = sorted(balances.items(), key=lambda x: x[1], reverse=True)
+            # Показываем только значимые суммы
+            significant = {currency: amount for currency, amount in balances.items() if amount > 0.001}
+            
+            # Оцениваем весь баланс по одному снимку тикеров
+            try:
+                tickers = await self.exchange.fetch_tickers()
+            except Exception as e:
+                self.logger.warning("Не удалось получить тикеры для оценки: %s", e)
+                tickers = {}
+            
+            valuation = value_portfolio(significant, tickers, 'USDT')
             
             message = "💰 **ОТЧЕТ О БАЛАНСЕ**\n\n"
-            total_usdt_value = 0.0
             
-            for currency, amount in sorted_balances:
-                if amount > 0.001:  # Показываем только значимые суммы
-                    message += f"• **{currency}:** {amount:.6f}\n"
-                    
-                    # Пытаемся оценить в USDT
-                    if currency != 'USDT':
-                        try:
-                            pair = f"{currency}/USDT"
-                            if pair in self.markets:
-                                ticker = await self.exchange.fetch_ticker(pair)
-                                usdt_value = amount * ticker['last']
-                                total_usdt_value += usdt_value
-                                message += f"  ≈ {usdt_value:.2f} USDT\n"
-                        except:
-                            pass
-                    else:
-                        total_usdt_value += amount
+            # Сортировка по стоимости в USDT
+            for asset in valuation.assets:
+                message += f"• **{asset.currency}:** {asset.amount:.6f}\n"
+                if asset.currency != 'USDT' and asset.value > 0:
+                    message += f"  ≈ {asset.value:.2f} USDT\n"
             
-            message += f"\n💵 **Примерная общая стоимость:** {total_usdt_value:.2f} USDT"
+            message += f"\n💵 **Примерная общая стоимость:** {valuation.total:.2f} USDT"
             
             # Добавляем статистику
             uptime = time.time() - self.stats['start_time']
@@ -277,35 +283,36 @@ class FixedAutoBot:
     async def convert_to_base_currency(self, base_currency: str) -> float:
         """Конвертировать весь баланс в базовую валюту"""
         try:
+            # Один снимок баланса и тикеров для всего плана
             balance = await self.exchange.fetch_balance()
-            total_base = 0.0
-            conversions = []
+            balances = free_balances(balance)
+            symbols = conversion_symbols(balances, self.markets, base_currency, allow_reverse=False)
+            tickers = await self.exchange.fetch_tickers(symbols) if symbols else {}
             
-            for currency, info in balance.items():
-                free_amount = info.get('free', 0.0)
-                if free_amount > 0 and currency != base_currency:
-                    # Пытаемся найти прямую пару
-                    pair = f"{currency}/{base_currency}"
-                    if pair in self.markets:
-                        try:
-                            ticker = await self.exchange.fetch_ticker(pair)
-                            if ticker['bid'] > 0:
-                                # Продаем валюту за базовую
-                                order = await self.exchange.create_market_sell_order(pair, free_amount)
-                                if order['status'] == 'closed':
-                                    converted = order['filled'] * order['average']
-                                    total_base += converted
-                                    conversions.append(f"{currency}: {free_amount:.6f} -> {converted:.6f} {base_currency}")
-                                    self.logger.info(f"Конвертировано {currency}: {free_amount:.6f} -> {converted:.6f} {base_currency}")
-                        except Exception as e:
-                            self.logger.warning(f"Не удалось конвертировать {currency}: {e}")
+            plan, dust = plan_conversions(balances, tickers, self.markets, base_currency, allow_reverse=False)
+            if dust:
+                self.logger.info("Пропущена пыль ниже минимального объема: %s", ', '.join(dust))
+            
+            # Независимые продажи отправляем параллельно
+            results = await execute_conversions(self.exchange, plan, self.conversion_concurrency)
+            
+            total_converted = 0.0
+            conversions = []
+            for result in results:
+                order = result.order
+                if result.success:
+                    total_converted += result.converted
+                    conversions.append(f"{order.currency}: {order.source_amount:.6f} -> {result.converted:.6f} {base_currency}")
+                    self.logger.info("Конвертировано %s: %.6f -> %.6f %s", order.currency, order.source_amount, result.converted, base_currency)
+                else:
+                    self.logger.warning("Не удалось конвертировать %s: %s", order.currency, result.error)
             
             # Добавляем уже имеющуюся базовую валюту
-            existing_base = balance.get(base_currency, {}).get('free', 0.0)
-            total_base += existing_base
+            existing_base = balances.get(base_currency, 0.0)
+            total_base = existing_base + total_converted
             
             if conversions:
-                await self.send_telegram(f"💱 **КОНВЕРТАЦИЯ В {base_currency}**\n\n" + "\n".join(conversions) + f"\n\n💰 **Итого {base_currency}:** {total_base:.6f}")
+                await self.send_telegram(f"💱 **КОНВЕРТАЦИЯ В {base_currency}**\n\n" + "\n".join(conversions) + f"\n\n🔄 **Конвертировано:** {total_converted:.6f} {base_currency}\n💰 **Итого {base_currency}:** {total_base:.6f}")
             
             return total_base
             
@@ -321,6 +328,8 @@ class FixedAutoBot:
             
             # Получаем тикеры всех пар
             tickers = await self.exchange.fetch_tickers()
+            if self.universe.is_due(self.universe_refresh_interval):
+                await self.generate_triangles(tickers)
             
             for triangle in self.valid_triangles:
                 pair1, pair2, pair3, direction, base_currency = triangle
@@ -584,11 +593,12 @@ class FixedAutoBot:
                 self.stats['cycles'] += 1
                 cycle_start = time.time()
                 
-                self.logger.info(f"Цикл {self.stats['cycles']} - {datetime.now().strftime('%H:%M:%S')}")
+                self.logger.info("Цикл %d", self.stats['cycles'])
                 
                 # Отчет о балансе каждые 5 минут (300 секунд)
                 if time.time() - self.last_balance_report >= 300:
-                    await self.send_balance_report()
+                    with reporting_priority():
+                        await self.send_balance_report()
                 
                 # Ищем лучший треугольник
                 opportunity = await self.find_best_triangle()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Резервирование баланса под одновременно исполняемые треугольники
+Перед запуском треугольник резервирует сумму стартовой валюты из свободного баланса
+и свои пары. Два треугольника не тратят один и тот же остаток, а треугольники с общей
+ногой исполняются по очереди: второй ждет следующего скана.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+# Почему треугольник не получил резерв
+CONFLICT_LEG = 'leg'
+CONFLICT_BALANCE = 'balance'
+
+
+@dataclass
+class Reservation:
+    """Резерв одного исполняемого треугольника"""
+    key: str
+    amounts: Dict[str, float]
+    symbols: FrozenSet[str]
+    created: float = field(default_factory=time.monotonic)
+
+
+class InventoryLedger:
+    """
+    Свободный баланс минус резервы исполняемых треугольников.
+    Баланс None - неизвестен (тестовый режим): проверяются только общие ноги.
+    """
+
+    def __init__(self, balances: Optional[Mapping[str, float]] = None):
+        self.balances: Optional[Dict[str, float]] = dict(balances) if balances is not None else None
+        self.reserved: Dict[str, float] = {}
+        self.reservations: Dict[str, Reservation] = {}
+        self.busy_symbols: Dict[str, str] = {}  # пара -> ключ треугольника, который ее торгует
+        self.last_conflict: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.reservations)
+
+    def set_balances(self, balances: Optional[Mapping[str, float]]):
+        """Новый снимок свободного баланса (резервы исполняемых треугольников сохраняются)"""
+        self.balances = dict(balances) if balances is not None else None
+
+    def available(self, currency: str) -> float:
+        if self.balances is None:
+            return float('inf')
+        return self.balances.get(currency, 0.0) - self.reserved.get(currency, 0.0)
+
+    def conflict(self, key: str, amounts: Mapping[str, float], symbols: Iterable[str]) -> Optional[str]:
+        """Причина, по которой резерв невозможен, или None"""
+        if key in self.reservations:
+            return CONFLICT_LEG
+        if any(symbol in self.busy_symbols for symbol in symbols):
+            return CONFLICT_LEG
+        if any(amount > self.available(currency) + 1e-12 for currency, amount in amounts.items()):
+            return CONFLICT_BALANCE
+        return None
+
+    def reserve(self, key: str, amounts: Mapping[str, float], symbols: Iterable[str]) -> Optional[Reservation]:
+        """Зарезервировать суммы и пары; None - конфликт (причина в last_conflict)"""
+        symbols = frozenset(symbols)
+        self.last_conflict = self.conflict(key, amounts, symbols)
+        if self.last_conflict is not None:
+            return None
+        reservation = Reservation(key, dict(amounts), symbols)
+        for currency, amount in amounts.items():
+            self.reserved[currency] = self.reserved.get(currency, 0.0) + amount
+        for symbol in symbols:
+            self.busy_symbols[symbol] = key
+        self.reservations[key] = reservation
+        return reservation
+
+    def release(self, reservation: Reservation):
+        """Снять резерв после исполнения (новый снимок баланса берется перед следующей пачкой)"""
+        if self.reservations.pop(reservation.key, None) is None:
+            return
+        for currency, amount in reservation.amounts.items():
+            left = self.reserved.get(currency, 0.0) - amount
+            if left > 1e-12:
+                self.reserved[currency] = left
+            else:
+                self.reserved.pop(currency, None)
+        for symbol in reservation.symbols:
+            if self.busy_symbols.get(symbol) == reservation.key:
+                del self.busy_symbols[symbol]
+
+
+def plan_batch(ledger: InventoryLedger, candidates: Iterable[Tuple[str, Mapping[str, float], Iterable[str]]],
+               limit: int) -> Tuple[List[Tuple[int, Reservation]], Dict[str, int]]:
+    """
+    Жадный выбор кандидатов (лучшие первыми) без общих ног и с хватающим балансом.
+    Возвращает (номер кандидата, резерв) и число отказов по причинам.
+    """
+    batch: List[Tuple[int, Reservation]] = []
+    conflicts: Dict[str, int] = {}
+    for n, (key, amounts, symbols) in enumerate(candidates):
+        if len(batch) >= limit:
+            break
+        reservation = ledger.reserve(key, amounts, symbols)
+        if reservation is None:
+            conflicts[ledger.last_conflict] = conflicts.get(ledger.last_conflict, 0) + 1
+            continue
+        batch.append((n, reservation))
+    return batch, conflicts
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Поэтапные задержки пути tick-to-trade
+Монотонные метки времени для каждого этапа треугольника + HDR гистограммы
+"""
+
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Перцентили, которые показываем в логах и Telegram /stats
+REPORT_PERCENTILES = (50.0, 99.0, 99.9)
+
+# Порядок этапов пути tick-to-trade
+STAGES = (
+    'md_recv',      # получение рыночных данных
+    'scan_start',
+    'scan_end',
+    'decision',     # выбор треугольника для исполнения
+    'revalidate',   # перепроверка по свежему стакану
+    'leg1_submit', 'leg1_ack', 'leg1_fill',
+    'leg2_submit', 'leg2_ack', 'leg2_fill',
+    'leg3_submit', 'leg3_ack', 'leg3_fill',
+    'leg4_submit', 'leg4_ack', 'leg4_fill',   # циклы из 4-5 ног
+    'leg5_submit', 'leg5_ack', 'leg5_fill',
+    'last_fill',    # исполнена последняя нога (3-я у треугольника)
+    'notify',       # уведомление отправлено
+)
+
+# Интервалы между этапами: имя -> (начало, конец)
+INTERVALS = (
+    ('md_to_scan', 'md_recv', 'scan_start'),
+    ('scan', 'scan_start', 'scan_end'),
+    ('scan_to_decision', 'scan_end', 'decision'),
+    ('revalidation', 'decision', 'revalidate'),
+    ('tick_to_trade', 'md_recv', 'leg1_submit'),
+    ('leg1_ack', 'leg1_submit', 'leg1_ack'),
+    ('leg1_fill', 'leg1_submit', 'leg1_fill'),
+    ('leg2_ack', 'leg2_submit', 'leg2_ack'),
+    ('leg2_fill', 'leg2_submit', 'leg2_fill'),
+    ('leg3_ack', 'leg3_submit', 'leg3_ack'),
+    ('leg3_fill', 'leg3_submit', 'leg3_fill'),
+    ('leg4_ack', 'leg4_submit', 'leg4_ack'),
+    ('leg4_fill', 'leg4_submit', 'leg4_fill'),
+    ('leg5_ack', 'leg5_submit', 'leg5_ack'),
+    ('leg5_fill', 'leg5_submit', 'leg5_fill'),
+    ('legs_total', 'leg1_submit', 'last_fill'),
+    ('fill_to_notify', 'last_fill', 'notify'),
+    ('total', 'md_recv', 'notify'),
+)
+
+
+def now_ns() -> int:
+    """Монотонное время в наносекундах"""
+    return time.monotonic_ns()
+
+
+class HdrHistogram:
+    """
+    Гистограмма с логарифмически-линейными корзинами в стиле HdrHistogram.
+    Значения - целые микросекунды, относительная точность 2^-(sub_bucket_bits-1).
+    """
+
+    def __init__(self, sub_bucket_bits: int = 8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._linear_limit = 1 << sub_bucket_bits
+        self._half_shift = sub_bucket_bits - 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_value: Optional[int] = None
+        self.max_value: Optional[int] = None
+
+    def _index(self, value: int) -> int:
+        if value < self._linear_limit:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return (shift << self._half_shift) + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._linear_limit:
+            return index
+        shift = (index >> self._half_shift) - 1
+        mantissa = index - (shift << self._half_shift)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+
+    def percentile(self, percentile: float) -> int:
+        """Значение на заданном перцентиле (верхняя граница корзины)"""
+        if not self.total_count:
+            return 0
+        target = min(self.total_count, max(1, math.ceil(self.total_count * percentile / 100.0)))
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= target:
+                return min(self._highest_equivalent(index), self.max_value)
+        return self.max_value
+
+    def merge(self, other: 'HdrHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        if other.max_value is not None:
+            self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+
+
+class LatencyTrace:
+    """Монотонные метки этапов одного треугольника"""
+
+    __slots__ = ('key', 'stamps')
+
+    def __init__(self, key: str = '', stamps: Optional[Dict[str, int]] = None):
+        self.key = key
+        self.stamps: Dict[str, int] = dict(stamps) if stamps else {}
+
+    def mark(self, stage: str, timestamp_ns: Optional[int] = None):
+        self.stamps[stage] = now_ns() if timestamp_ns is None else timestamp_ns
+
+    def fork(self, key: str) -> 'LatencyTrace':
+        """Копия общих меток сканирования для конкретного треугольника"""
+        return LatencyTrace(key, self.stamps)
+
+    def interval_us(self, start: str, end: str) -> Optional[int]:
+        if start in self.stamps and end in self.stamps:
+            return (self.stamps[end] - self.stamps[start]) // 1000
+        return None
+
+    def intervals(self) -> Iterable[Tuple[str, int]]:
+        for name, start, end in INTERVALS:
+            value = self.interval_us(start, end)
+            if value is not None:
+                yield name, value
+
+
+class LatencyTracker:
+    """HDR гистограммы интервалов по каждому треугольнику и суммарно"""
+
+    ALL = '*'
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[str, HdrHistogram]] = {}
+
+    def _histogram(self, key: str, interval: str) -> HdrHistogram:
+        per_key = self.histograms.setdefault(key, {})
+        histogram = per_key.get(interval)
+        if histogram is None:
+            histogram = per_key[interval] = HdrHistogram()
+        return histogram
+
+    def record_interval(self, key: str, interval: str, value_us: int):
+        self._histogram(key, interval).record(value_us)
+        if key != self.ALL:
+            self._histogram(self.ALL, interval).record(value_us)
+
+    def record(self, trace: LatencyTrace):
+        for interval, value_us in trace.intervals():
+            self.record_interval(trace.key or self.ALL, interval, value_us)
+
+    def summary(self, key: str = ALL) -> Dict[str, Dict[str, float]]:
+        """{интервал: {count, p50, p99, p99.9}} в миллисекундах"""
+        result = {}
+        order = [name for name, _, _ in INTERVALS]
+        per_key = self.histograms.get(key, {})
+        for interval in sorted(per_key, key=lambda n: order.index(n) if n in order else len(order)):
+            histogram = per_key[interval]
+            entry = {'count': histogram.total_count}
+            for p in REPORT_PERCENTILES:
+                entry[f"p{p:g}"] = round(histogram.percentile(p) / 1000.0, 3)
+            result[interval] = entry
+        return result
+
+    def slowest(self, interval: str = 'total', limit: int = 5) -> List[Tuple[str, float]]:
+        """Треугольники с наибольшим p99 заданного интервала (мс)"""
+        ranked = []
+        for key, per_key in self.histograms.items():
+            if key == self.ALL or interval not in per_key:
+                continue
+            ranked.append((key, per_key[interval].percentile(99.0) / 1000.0))
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        return ranked[:limit]
+
+
+def format_latency_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    """Текст для Telegram и логов"""
+    if not summary:
+        return "нет данных"
+    lines = []
+    for interval, entry in summary.items():
+        lines.append(
+            f"• {interval}: p50 {entry.get('p50', 0):.1f} / p99 {entry.get('p99', 0):.1f} / "
+            f"p99.9 {entry.get('p99.9', 0):.1f} мс (n={entry.get('count', 0)})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Асинхронное логирование вне event loop
+Очередь + фоновый поток записи, ротация по размеру и времени, JSON записи
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+# Стандартные атрибуты LogRecord - все остальное считаем структурными полями
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['LazyQueueHandler'] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON запись на строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке.
+    Сообщение собирается из msg % args уже в потоке записи,
+    при переполнении очереди запись отбрасывается вместо блокировки.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротация файла при превышении размера или по истечении интервала"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval_seconds: float,
+                 encoding: str = 'utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.interval_seconds = interval_seconds
+        self.rollover_at = time.time() + interval_seconds if interval_seconds > 0 else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and record.created >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval_seconds > 0:
+            self.rollover_at = time.time() + self.interval_seconds
+
+
+def setup_async_logging(log_file: str, level: int = logging.INFO) -> logging.Logger:
+    """
+    Настройка корневого логгера: вызовы logger.* только кладут запись в очередь,
+    фоновый поток пишет в консоль и в ротируемый файл.
+
+    Переменные окружения:
+        LOG_MAX_BYTES       - размер файла до ротации (по умолчанию 10 МБ)
+        LOG_BACKUP_COUNT    - сколько архивных файлов хранить (5)
+        LOG_ROTATE_HOURS    - ротация по времени в часах, 0 - выключена (24)
+        LOG_FORMAT          - json или text для файла (json)
+        LOG_QUEUE_SIZE      - размер очереди записей (10000)
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    if _listener is not None:
+        return root
+
+    max_bytes = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    rotate_hours = float(os.getenv('LOG_ROTATE_HOURS', '24'))
+    file_format = os.getenv('LOG_FORMAT', 'json').lower()
+    queue_size = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    text_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+    file_handler = SizeTimeRotatingFileHandler(log_file, max_bytes, backup_count, rotate_hours * 3600)
+    file_handler.setFormatter(JsonFormatter() if file_format == 'json' else text_formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(text_formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = LazyQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def dropped_records() -> int:
+    """Количество записей, отброшенных из-за переполнения очереди"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+def shutdown_logging():
+    """Дописать очередь и остановить поток записи"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Точка входа для Railway/Docker
+Режим выбирается переменной BOT_MODE, импортируется только модуль этого режима
+(и только те зависимости ccxt/telegram, которые ему нужны). Время импорта и память
+печатаются при старте.
+"""
+
+import asyncio
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import Dict
+
+# Режим -> (модуль, функция запуска)
+MODES = {
+    'triangular': ('triangular_arbitrage_bot', 'main'),   # основной бот арбитража
+    'control': ('simple_command_bot', 'main'),            # Telegram управление командами
+    'railway': ('railway_bot', 'main'),
+    'auto': ('auto_triangular_bot', 'main'),
+    'fixed': ('fixed_auto_bot', 'main'),
+    'simple': ('ultra_simple_bot', 'main'),
+    'diagnostics': ('simple_railway_bot', 'main'),
+}
+# Режимы из нескольких процессов: арбитраж по умолчанию выключен и запускается командой
+# из Telegram, поэтому движок без бота управления запустить нечем
+COMBINED_MODES = {
+    'combined': ('control', 'triangular'),
+}
+DEFAULT_MODE = 'combined'
+
+
+def load_environment():
+    """Переменные из .env (если python-dotenv установлен)"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    if os.path.exists('.env'):
+        load_dotenv('.env')
+
+
+def resident_memory_mb() -> float:
+    """Пиковая резидентная память процесса"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def loaded_packages(modules) -> dict:
+    """Количество загруженных модулей по пакетам верхнего уровня"""
+    counts = {}
+    for name in modules:
+        top = name.split('.', 1)[0]
+        counts[top] = counts.get(top, 0) + 1
+    return counts
+
+
+def import_mode(mode: str):
+    """Импортировать модуль режима и вернуть (функция запуска, секунды, новые модули)"""
+    module_name, entry_name = MODES[mode]
+    before = set(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    new_modules = set(sys.modules) - before
+    return getattr(module, entry_name), elapsed, new_modules
+
+
+def report_startup(mode: str, elapsed: float, new_modules):
+    packages = loaded_packages(new_modules)
+    heavy = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f"⚡ Режим: {mode} ({MODES[mode][0]})")
+    print(f"⏱️ Импорт: {elapsed * 1000:.0f} мс, модулей: {len(new_modules)}, память: {resident_memory_mb():.1f} МБ")
+    if heavy:
+        print("📦 " + ", ".join(f"{name}: {count}" for name, count in heavy))
+
+
+def supervise(processes: Dict[str, subprocess.Popen], poll_interval: float = 1.0) -> int:
+    """
+    Ждать процессы режимов; первый завершившийся останавливает остальные.
+    Код выхода ненулевой, чтобы платформа перезапустила контейнер целиком.
+    """
+    try:
+        while True:
+            for mode, process in processes.items():
+                code = process.poll()
+                if code is not None:
+                    print(f"⚠️ Режим {mode} завершился с кодом {code}, остановка остальных")
+                    return code or 1
+            time.sleep(poll_interval)
+    finally:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run_combined(mode: str) -> int:
+    """Каждый режим группы - отдельный процесс main.py, импортирующий только свой модуль"""
+    processes = {}
+    for part in COMBINED_MODES[mode]:
+        env = dict(os.environ, BOT_MODE=part)
+        processes[part] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        print(f"🚀 Режим {part}: pid {processes[part].pid}")
+    return supervise(processes)
+
+
+def main():
+    load_environment()
+
+    mode = os.getenv('BOT_MODE', DEFAULT_MODE).strip().lower()
+    if mode in COMBINED_MODES:
+        sys.exit(run_combined(mode))
+    if mode not in MODES:
+        print(f"❌ Неизвестный BOT_MODE={mode}. Доступно: {', '.join(list(MODES) + list(COMBINED_MODES))}")
+        sys.exit(2)
+
+    entry, elapsed, new_modules = import_mode(mode)
+    report_startup(mode, elapsed, new_modules)
+
+    if asyncio.iscoroutinefunction(entry):
+        asyncio.run(entry())
+    else:
+        entry()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏹️ Остановка...")
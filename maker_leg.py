@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Мейкер-нога треугольника
+Вместо трех маркет-ордеров на наименее ликвидной ноге выставляется post-only лимитный ордер
+по цене, при которой цикл прибылен с учетом такер-комиссий остальных ног и мейкер-комиссии.
+Ордер переставляется, когда стакан уходит, и снимается, когда цикл перестает быть прибыльным.
+Исполнение отслеживается через watch_orders (без него - опросом fetch_order); после исполнения
+остальные ноги сразу отправляются IOC лимитами по текущему стакану.
+
+Цикл поворачивается так, чтобы мейкер-нога шла первой: тратится валюта ее входа, и после
+такер-ног сумма возвращается в ту же валюту. Частичные исполнения накапливаются и
+хеджируются вместе, когда ордер исполнен полностью или снят.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Levels = Sequence[Tuple[float, float]]  # [(цена, объем)]
+Books = Sequence[Tuple[Levels, Levels]]  # [(bids, asks)] по ногам
+
+# Итог мейкер-ноги
+MAKER_FILLED = 'filled'      # ордер исполнен полностью
+MAKER_TIMEOUT = 'timeout'    # не исполнился за отведенное время
+MAKER_EDGE = 'edge'          # стакан ушел, цикл больше не прибылен
+
+# Неисполненный остаток меньше этой доли считается пылью: меньше минимального ордера
+FILL_TOLERANCE = 0.01
+
+
+def leg_currencies(symbol: str, side: str) -> Tuple[str, str]:
+    """(что тратим, что получаем): покупка тратит quote, продажа - base"""
+    base, quote = symbol.split('/')
+    return (quote, base) if side == 'buy' else (base, quote)
+
+
+def leg_rate(side: str, price: float) -> float:
+    """Сколько валюты выхода дает единица валюты входа"""
+    return 1.0 / price if side == 'buy' else price
+
+
+def taker_price(book: Tuple[Levels, Levels], side: str) -> float:
+    bids, asks = book
+    levels = asks if side == 'buy' else bids
+    return levels[0][0] if levels else 0.0
+
+
+def leg_order(legs: int, maker_leg: int) -> List[int]:
+    """Номера ног цикла, начиная с мейкер-ноги"""
+    return [(maker_leg + n) % legs for n in range(legs)]
+
+
+def choose_maker_leg(books: Books, sides: Sequence[str], initial_amount: float) -> int:
+    """
+    Наименее ликвидная нога: минимум отношения глубины стакана на стороне тейкера
+    к объему, который нога должна пройти. Ее выгоднее всего не пробивать по рынку.
+    """
+    amount = initial_amount
+    worst, worst_ratio = 0, float('inf')
+    for n, (book, side) in enumerate(zip(books, sides)):
+        price = taker_price(book, side)
+        if price <= 0:
+            return n
+        bids, asks = book
+        quantity = amount / price if side == 'buy' else amount  # объем ноги в base
+        depth = sum(size for _price, size in (asks if side == 'buy' else bids))
+        ratio = depth / quantity if quantity > 0 else float('inf')
+        if ratio < worst_ratio:
+            worst, worst_ratio = n, ratio
+        amount *= leg_rate(side, price)
+    return worst
+
+
+def maker_limit_price(side: str, other_rates: Sequence[float], taker_fee: float, maker_fee: float,
+                      min_profit_percent: float) -> float:
+    """
+    Худшая цена мейкер-ноги, при которой цикл дает min_profit после комиссий:
+    курс мейкер-ноги * произведение курсов такер-ног * (1 - комиссии) = 1 + min_profit.
+    """
+    product = 1.0
+    for rate in other_rates:
+        product *= rate * (1 - taker_fee)
+    rate = (1 + min_profit_percent / 100) / (product * (1 - maker_fee))
+    return 1.0 / rate if side == 'buy' else rate
+
+
+def resting_price(side: str, limit: float, bid: float, ask: float, max_depth_bps: float = 0.0) -> Optional[float]:
+    """
+    Цена post-only ордера: в лучшей цене своей стороны, если она укладывается в предел,
+    иначе глубже, по самому пределу. Через спред не переходит - иначе ордер стал бы тейкером.
+    max_depth_bps - насколько глубже лучшей цены еще имеет смысл стоять (0 - без ограничения).
+    """
+    if side == 'buy':
+        price = min(limit, bid) if bid > 0 else limit
+        if max_depth_bps > 0 and bid > 0 and (bid - price) / bid * 1e4 > max_depth_bps:
+            return None
+        return price if 0 < price and (ask <= 0 or price < ask) else None
+    price = max(limit, ask) if ask > 0 else limit
+    if max_depth_bps > 0 and ask > 0 and (price - ask) / ask * 1e4 > max_depth_bps:
+        return None
+    return price if price > 0 and price > bid else None
+
+
+def maker_quote(books: Books, sides: Sequence[str], maker_leg: int, taker_fee: float, maker_fee: float,
+                min_profit_percent: float, max_depth_bps: float = 0.0) -> Optional[float]:
+    """Цена мейкер-ноги по текущим стаканам; None - цикл не сходится или стакана нет"""
+    other_rates = []
+    for n, (book, side) in enumerate(zip(books, sides)):
+        if n == maker_leg:
+            continue
+        price = taker_price(book, side)
+        if price <= 0:
+            return None
+        other_rates.append(leg_rate(side, price))
+    bids, asks = books[maker_leg]
+    limit = maker_limit_price(sides[maker_leg], other_rates, taker_fee, maker_fee, min_profit_percent)
+    return resting_price(sides[maker_leg], limit, bids[0][0] if bids else 0.0, asks[0][0] if asks else 0.0,
+                         max_depth_bps)
+
+
+@dataclass
+class MakerResult:
+    """Итог исполнения с мейкер-ногой"""
+    status: str
+    spent: float = 0.0            # потрачено валюты входа мейкер-ноги
+    final_amount: float = 0.0     # вернулось в ту же валюту после такер-ног
+    reprices: int = 0
+    orders: List[Tuple[int, Dict]] = field(default_factory=list)  # (номер ноги, ордер)
+    error: Optional[str] = None
+
+    @property
+    def profit(self) -> float:
+        return self.final_amount - self.spent
+
+
+class MakerLegStrategy:
+    """Исполнение цикла: post-only ордер на одной ноге, остальные - IOC после его исполнения"""
+
+    def __init__(self, exchange, taker_fee: float = 0.002, maker_fee: float = 0.0,
+                 min_profit_percent: float = 0.3, reprice_bps: float = 5.0, timeout: float = 30.0,
+                 check_interval: float = 0.5, ioc_slippage_bps: float = 10.0, max_depth_bps: float = 20.0):
+        self.exchange = exchange
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.min_profit_percent = min_profit_percent
+        self.reprice_bps = reprice_bps              # перестановка, если цена ушла дальше
+        self.timeout = timeout                      # сколько ждать исполнения, секунд
+        self.check_interval = check_interval
+        self.ioc_slippage_bps = ioc_slippage_bps    # запас цены IOC ордеров такер-ног
+        self.max_depth_bps = max_depth_bps          # дальше от лучшей цены - цикл не сходится
+
+    def quote(self, books: Books, sides: Sequence[str], maker_leg: int) -> Optional[float]:
+        return maker_quote(books, sides, maker_leg, self.taker_fee, self.maker_fee, self.min_profit_percent,
+                           self.max_depth_bps)
+
+    async def execute(self, symbols: Sequence[str], sides: Sequence[str], maker_leg: int, amount: float,
+                      books: Callable[[], Books]) -> MakerResult:
+        """
+        Выставить мейкер-ногу на amount валюты ее входа и после исполнения пройти остальные ноги.
+        books() отдает текущие стаканы всех ног цикла.
+        """
+        result = MakerResult(MAKER_TIMEOUT)
+        received = await self._rest(symbols[maker_leg], sides, maker_leg, amount, books, result)
+        if received <= 0:
+            return result
+        # Такер-ноги сразу после исполнения; частично исполненный остаток тоже хеджируется
+        try:
+            result.final_amount = await self._take(symbols, sides, leg_order(len(symbols), maker_leg)[1:],
+                                                   received, books(), result)
+        except Exception as e:
+            result.error = str(e)
+        return result
+
+    async def _rest(self, symbol: str, sides: Sequence[str], maker_leg: int, amount: float,
+                    books: Callable[[], Books], result: MakerResult) -> float:
+        """Держать post-only ордер до исполнения; возвращает полученную валюту выхода"""
+        side = sides[maker_leg]
+        received = 0.0
+        order = None
+        order_price = 0.0
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                price = self.quote(books(), sides, maker_leg)
+                if order is not None and (price is None or abs(price / order_price - 1) * 1e4 >= self.reprice_bps):
+                    spent, got = await self._cancel(symbol, side, maker_leg, order, result)
+                    result.spent += spent
+                    received += got
+                    order = None
+                    if price is not None:
+                        result.reprices += 1
+                if amount - result.spent <= amount * FILL_TOLERANCE:
+                    result.status = MAKER_FILLED
+                    break
+                if price is None:
+                    result.status = MAKER_EDGE
+                    break
+                if time.monotonic() >= deadline:
+                    result.status = MAKER_TIMEOUT
+                    break
+                if order is None:
+                    remaining = amount - result.spent
+                    quantity = remaining / price if side == 'buy' else remaining
+                    try:
+                        order = await self.exchange.create_order(symbol, 'limit', side, quantity, price,
+                                                                 {'postOnly': True})
+                        order_price = price
+                    except Exception as e:
+                        # Post-only отклонен (стакан перешел через цену) - новая цена на следующем шаге
+                        logger.info("🪤 Post-only %s %s по %.8f отклонен: %s", side, symbol, price, e)
+                        await asyncio.sleep(self.check_interval)
+                        continue
+                update = await self._wait_update(symbol, order)
+                if update is not None:
+                    order = update
+                if order.get('status') in ('closed', 'canceled', 'rejected', 'expired'):
+                    spent, got = self._filled(side, order)
+                    result.spent += spent
+                    received += got
+                    if got > 0:
+                        result.orders.append((maker_leg, order))
+                    order = None  # снят биржей без исполнения - на следующем шаге выставляется заново
+        finally:
+            if order is not None:
+                spent, got = await self._cancel(symbol, side, maker_leg, order, result)
+                result.spent += spent
+                received += got
+        return received
+
+    async def _wait_update(self, symbol: str, order: Dict) -> Optional[Dict]:
+        """Последнее состояние ордера: поток watch_orders или опрос fetch_order"""
+        if self.exchange.has.get('watchOrders'):
+            try:
+                updates = await asyncio.wait_for(self.exchange.watch_orders(symbol), self.check_interval)
+            except asyncio.TimeoutError:
+                return None
+            latest = None
+            for update in updates or ():
+                if update.get('id') == order['id']:
+                    latest = update
+            return latest
+        await asyncio.sleep(self.check_interval)
+        return await self.exchange.fetch_order(order['id'], symbol)
+
+    async def _cancel(self, symbol: str, side: str, maker_leg: int, order: Dict,
+                      result: MakerResult) -> Tuple[float, float]:
+        """Снять ордер и вернуть (потрачено, получено) по его итоговому исполнению"""
+        try:
+            await self.exchange.cancel_order(order['id'], symbol)
+        except Exception as e:
+            # Ордер мог исполниться до отмены - итог берем из fetch_order
+            logger.debug("Отмена ордера %s: %s", order['id'], e)
+        final = await self.exchange.fetch_order(order['id'], symbol)
+        spent, got = self._filled(side, final)
+        if got > 0:
+            result.orders.append((maker_leg, final))
+        return spent, got
+
+    @staticmethod
+    def _filled(side: str, order: Dict) -> Tuple[float, float]:
+        """(потрачено валюты входа, получено валюты выхода) по исполненной части ордера"""
+        filled = order.get('filled') or 0.0
+        cost = order.get('cost') or filled * (order.get('average') or order.get('price') or 0.0)
+        return (cost, filled) if side == 'buy' else (filled, cost)
+
+    async def _take(self, symbols: Sequence[str], sides: Sequence[str], legs: Sequence[int], amount: float,
+                    books: Books, result: MakerResult) -> float:
+        """Такер-ноги IOC лимитами с запасом ioc_slippage_bps от лучшей цены"""
+        slip = self.ioc_slippage_bps / 1e4
+        for n in legs:
+            symbol, side = symbols[n], sides[n]
+            touch = taker_price(books[n], side)
+            if touch <= 0:
+                raise Exception(f"Нет стакана для ноги {n + 1} ({symbol})")
+            if side == 'buy':
+                price = touch * (1 + slip)
+                order = await self.exchange.create_order(symbol, 'limit', side, amount / price, price,
+                                                         {'timeInForce': 'IOC'})
+            else:
+                price = touch * (1 - slip)
+                order = await self.exchange.create_order(symbol, 'limit', side, amount, price,
+                                                         {'timeInForce': 'IOC'})
+            result.orders.append((n, order))
+            spent, got = self._filled(side, order)
+            if got <= 0:
+                raise Exception(f"IOC ордер ноги {n + 1} ({symbol}) не исполнен")
+            if spent < amount * (1 - FILL_TOLERANCE):
+                logger.warning("⚠️ Нога %d %s исполнена частично: %.8f из %.8f", n + 1, symbol, spent, amount)
+            amount = got
+        return amount
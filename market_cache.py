@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Дисковый кэш рынков и треугольников для быстрого старта
+Сжатый бинарный файл (pickle + zlib) с TTL и sha256 содержимого:
+при рестарте бот сразу начинает сканирование, а рынки обновляются в фоне
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b'MKC1'
+# magic, время сохранения, длина сжатых данных, sha256 сжатых данных
+_HEADER = struct.Struct('>4sdI32s')
+
+# Поля рынка ccxt, нужные для торговли (сырой ответ биржи 'info' не храним)
+MARKET_FIELDS = (
+    'id', 'symbol', 'base', 'quote', 'baseId', 'quoteId', 'active', 'type', 'spot',
+    'precision', 'limits', 'taker', 'maker', 'percentage', 'tierBased',
+)
+
+
+@dataclass
+class MarketDiff:
+    """Изменения списка рынков между двумя загрузками"""
+    added: List[str]
+    removed: List[str]  # делистинг или приостановка торгов
+    changed: List[str]  # поменялись лимиты, точность, комиссии
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+@dataclass
+class CachedMarkets:
+    """Содержимое кэша"""
+    markets: Dict[str, Dict]
+    triangles: List[tuple]
+    markets_hash: str
+    config_key: str
+    saved_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.saved_at
+
+
+def compact_markets(markets: Mapping[str, Mapping]) -> Dict[str, Dict]:
+    """Только нужные поля рынков"""
+    return {
+        symbol: {key: market[key] for key in MARKET_FIELDS if key in market}
+        for symbol, market in markets.items()
+    }
+
+
+def markets_hash(markets: Mapping[str, Mapping]) -> str:
+    """Хэш содержимого рынков, не зависящий от порядка ключей"""
+    payload = json.dumps(compact_markets(markets), sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def diff_markets(old: Mapping[str, Mapping], new: Mapping[str, Mapping]) -> MarketDiff:
+    """Новые, исчезнувшие/приостановленные и измененные пары"""
+    def active(markets, symbol):
+        return symbol in markets and markets[symbol].get('active') is not False
+
+    symbols = set(old) | set(new)
+    added = sorted(s for s in symbols if active(new, s) and not active(old, s))
+    removed = sorted(s for s in symbols if active(old, s) and not active(new, s))
+    changed = []
+    for symbol in sorted(set(old) & set(new)):
+        if symbol in added or symbol in removed:
+            continue
+        old_market = {key: old[symbol].get(key) for key in MARKET_FIELDS}
+        new_market = {key: new[symbol].get(key) for key in MARKET_FIELDS}
+        if old_market != new_market:
+            changed.append(symbol)
+    return MarketDiff(added, removed, changed)
+
+
+def triangles_config_key(base_currencies: Sequence[str], crypto_currencies: Optional[Sequence[str]]) -> str:
+    """Ключ настроек генерации: при их изменении кэш треугольников недействителен"""
+    cryptos = ','.join(sorted(crypto_currencies)) if crypto_currencies is not None else '*'
+    return ','.join(base_currencies) + '|' + cryptos
+
+
+class MarketCache:
+    """Кэш рынков и скомпилированных треугольников в одном файле"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        self.path = path or os.getenv('MARKET_CACHE_PATH', 'market_cache.bin')
+        self.ttl = ttl if ttl is not None else float(os.getenv('MARKET_CACHE_TTL', '3600'))
+
+    def is_fresh(self, cached: CachedMarkets) -> bool:
+        return cached.age < self.ttl
+
+    def save(self, markets: Mapping[str, Mapping], triangles: List[tuple], config_key: str = '',
+             digest: Optional[str] = None) -> CachedMarkets:
+        """Атомарно записать кэш (через временный файл)"""
+        compact = compact_markets(markets)
+        cached = CachedMarkets(
+            markets=compact,
+            triangles=[tuple(t) for t in triangles],
+            markets_hash=digest or markets_hash(compact),
+            config_key=config_key,
+            saved_at=time.time(),
+        )
+        payload = zlib.compress(pickle.dumps({
+            'markets': cached.markets,
+            'triangles': cached.triangles,
+            'markets_hash': cached.markets_hash,
+            'config_key': cached.config_key,
+        }, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        header = _HEADER.pack(CACHE_MAGIC, cached.saved_at, len(payload), hashlib.sha256(payload).digest())
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+        logger.info("💾 Кэш рынков сохранен: %d пар, %d треугольников, %d байт",
+                    len(compact), len(cached.triangles), _HEADER.size + len(payload))
+        return cached
+
+    def touch(self) -> bool:
+        """
+        Обновить время сохранения, не переписывая содержимое: рынки с прошлой записи не изменились.
+        False - файла нет или он не наш, нужен полный save().
+        """
+        try:
+            with open(self.path, 'r+b') as f:
+                if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                    return False
+                # saved_at идет в заголовке сразу за magic и не входит в sha256 содержимого
+                f.write(struct.pack('>d', time.time()))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning("⚠️ Не удалось обновить время кэша рынков: %s", e)
+            return False
+
+    def load(self, config_key: Optional[str] = None) -> Optional[CachedMarkets]:
+        """
+        Прочитать кэш. None - если файла нет, он поврежден
+        или построен для других настроек треугольников.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("⚠️ Не удалось прочитать кэш рынков: %s", e)
+            return None
+
+        try:
+            magic, saved_at, length, digest = _HEADER.unpack_from(data)
+            payload = data[_HEADER.size:_HEADER.size + length]
+            if magic != CACHE_MAGIC or len(payload) != length or hashlib.sha256(payload).digest() != digest:
+                logger.warning("⚠️ Кэш рынков поврежден, будет перестроен")
+                return None
+            content = pickle.loads(zlib.decompress(payload))
+        except Exception as e:
+            logger.warning("⚠️ Кэш рынков не читается: %s", e)
+            return None
+
+        cached = CachedMarkets(
+            markets=content['markets'],
+            triangles=content['triangles'],
+            markets_hash=content['markets_hash'],
+            config_key=content.get('config_key', ''),
+            saved_at=saved_at,
+        )
+        if config_key is not None and cached.config_key != config_key:
+            logger.info("ℹ️ Настройки треугольников изменились, кэш не используется")
+            return None
+        return cached
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Метрики треугольного арбитража в формате Prometheus
+Счетчики, gauge и гистограммы + HTTP эндпоинт /metrics без внешних зависимостей
+"""
+
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы по умолчанию для гистограмм задержек (секунды)
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Границы для проскальзывания ног (базисные пункты, отрицательные - улучшение цены)
+SLIPPAGE_BPS_BUCKETS = (-50, -20, -10, -5, -2, 0, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_value(value: float) -> str:
+    """Число в формате экспозиции Prometheus"""
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Строка меток {a="b",c="d"}"""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class _Metric:
+    """Базовый класс метрики с метками"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получено {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Счетчик может только увеличиваться")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if not self._values and not self.labelnames:
+            return [f"{self.name} 0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if not self._values and not self.labelnames:
+            return [f"{self.name} 0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or bounds[-1] != math.inf:
+            bounds.append(math.inf)
+        self.buckets = tuple(bounds)
+        # ключ меток -> [счетчики по корзинам, сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = [[0] * len(self.buckets), 0.0, 0]
+            self._series[key] = series
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Текст в формате экспозиции Prometheus 0.0.4"""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+class ArbitrageMetrics:
+    """Набор метрик движка треугольного арбитража"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+
+        self.scan_duration = r.histogram(
+            'arbitrage_scan_duration_seconds', 'Длительность одного сканирования треугольников')
+        self.scans = r.counter(
+            'arbitrage_scans_total', 'Количество выполненных сканирований')
+        self.triangles_evaluated = r.counter(
+            'arbitrage_triangles_evaluated_total', 'Количество оцененных треугольников')
+        self.opportunities = r.counter(
+            'arbitrage_opportunities_total', 'Возможности с прибылью выше порога')
+        self.trades = r.counter(
+            'arbitrage_trades_total', 'Исполненные треугольные сделки', ('result',))
+        self.leg_fill_latency = r.histogram(
+            'arbitrage_leg_fill_latency_seconds', 'Задержка от отправки ордера до исполнения ноги', ('leg',))
+        self.rate_limit_hits = r.counter(
+            'arbitrage_rate_limit_hits_total', 'Ответы биржи о превышении лимита запросов', ('endpoint',))
+        self.ws_reconnects = r.counter(
+            'arbitrage_ws_reconnects_total', 'Переподключения WebSocket')
+        self.telegram_queue_depth = r.gauge(
+            'arbitrage_telegram_queue_depth', 'Telegram сообщения, ожидающие отправки')
+        self.valid_triangles = r.gauge(
+            'arbitrage_valid_triangles', 'Треугольники, которые сканируются')
+        self.total_profit = r.gauge(
+            'arbitrage_total_profit_usd', 'Накопленная прибыль в USD')
+        self.stale_rejections = r.counter(
+            'arbitrage_stale_rejections_total', 'Возможности, отброшенные из-за устаревшей котировки ноги', ('leg',))
+        self.revalidation_aborts = r.counter(
+            'arbitrage_revalidation_aborts_total', 'Сделки, отмененные перепроверкой перед первой ногой', ('reason',))
+        self.leg_slippage = r.histogram(
+            'arbitrage_leg_slippage_bps', 'Проскальзывание исполнения ноги относительно цены сканера',
+            ('leg',), SLIPPAGE_BPS_BUCKETS)
+        self.scheduled_triangles = r.gauge(
+            'arbitrage_scheduled_triangles', 'Треугольники, оцененные в последнем скане по расписанию')
+        self.universe_live_pairs = r.gauge(
+            'arbitrage_universe_live_pairs', 'Пары, прошедшие фильтр ликвидности вселенной')
+        self.ws_message_rate = r.gauge(
+            'arbitrage_ws_message_rate', 'Сообщений стакана в секунду по соединению WebSocket', ('connection',))
+        self.ws_connections_down = r.gauge(
+            'arbitrage_ws_connections_down', 'Соединения WebSocket в переподключении')
+        self.book_resyncs = r.counter(
+            'arbitrage_book_resyncs_total', 'Пересинхронизации испорченных стаканов по REST снимку', ('reason',))
+        self.unhealthy_books = r.gauge(
+            'arbitrage_unhealthy_books', 'Стаканы в пересинхронизации')
+        self.quote_workers = r.gauge(
+            'arbitrage_quote_workers', 'Живые процессы-воркеры котировок')
+        self.log_records_dropped = r.counter(
+            'arbitrage_log_records_dropped_total', 'Записи лога, отброшенные при переполнении очереди')
+        self.stale_quotes = r.gauge(
+            'arbitrage_stale_quotes', 'Символы с котировкой старше допустимого возраста')
+        self.inflight_triangles = r.gauge(
+            'arbitrage_inflight_triangles', 'Треугольники, исполняемые одновременно')
+        self.reservation_conflicts = r.counter(
+            'arbitrage_reservation_conflicts_total', 'Возможности, отложенные из-за занятой ноги или баланса', ('reason',))
+        self.maker_orders = r.counter(
+            'arbitrage_maker_orders_total', 'Итоги post-only ордеров мейкер-ноги', ('result',))
+        self.maker_reprices = r.counter(
+            'arbitrage_maker_reprices_total', 'Перестановки post-only ордера вслед за стаканом')
+
+
+class MetricsServer:
+    """Минимальный HTTP сервер для /metrics на asyncio"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '0.0.0.0', port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info("📈 Метрики доступны на http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Пропускаем заголовки запроса
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if not line or line in (b'\r\n', b'\n'):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            path = parts[1].split('?')[0] if len(parts) >= 2 else ''
+
+            if len(parts) >= 2 and parts[0] == 'GET' and path == '/metrics':
+                status = '200 OK'
+                body = self.registry.render().encode('utf-8')
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                status = '404 Not Found'
+                body = b'Not Found\n'
+                content_type = 'text/plain; charset=utf-8'
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug("Ошибка обработки запроса метрик: %s", e)
+        finally:
+            writer.close()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Поиск отрицательных циклов на живом графе курсов (SPFA / Bellman-Ford в логарифмах)
+Вес ребра -log(rate * (1 - fee)): цикл с отрицательной суммой весов приносит прибыль после
+комиссий. Граф покрывает всю биржу, веса обновляются только у пар с изменившейся котировкой,
+а расстояния от фондированных валют переиспользуются между запусками.
+"""
+
+import math
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from cycles import LEG_FEE_RATE, Cycle
+from quote_store import QuoteStore
+from triangles import is_tradable
+
+INF = float('inf')
+
+
+@dataclass
+class DetectedCycle:
+    """Найденный отрицательный цикл"""
+    start: str
+    legs: Cycle
+    log_return: float  # -сумма весов: логарифм доходности после комиссий
+
+    @property
+    def profit_percent(self) -> float:
+        return math.expm1(self.log_return) * 100
+
+
+class RateGraph:
+    """
+    Граф обмена в параллельных массивах: пара BASE/QUOTE дает ребро QUOTE -> BASE (buy, 1/ask)
+    и BASE -> QUOTE (sell, bid). Ребра пары лежат рядом: 2k - покупка, 2k + 1 - продажа.
+    """
+
+    def __init__(self, markets: Mapping[str, Mapping], store: QuoteStore,
+                 currencies: Optional[Iterable[str]] = None, fee_rate: float = LEG_FEE_RATE):
+        allowed = set(currencies) if currencies is not None else None
+        self.store = store
+        self.fee = math.log(1 - fee_rate)
+        self.nodes: List[str] = []
+        self.node_ids: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.symbol_ids = array('l')        # id пары в QuoteStore
+        self.src = array('l')
+        self.dst = array('l')
+        self.out: List[List[int]] = []
+        for symbol, market in markets.items():
+            if '/' not in symbol or not is_tradable(market):
+                continue
+            base, quote = symbol.split('/', 1)
+            if allowed is not None and (base not in allowed or quote not in allowed):
+                continue
+            b, q = self._node(base), self._node(quote)
+            self.symbols.append(symbol)
+            self.symbol_ids.append(store.symbol_id(symbol))
+            for u, v in ((q, b), (b, q)):
+                self.out[u].append(len(self.src))
+                self.src.append(u)
+                self.dst.append(v)
+        self.weight = array('d', [INF]) * len(self.src)
+        # Котировки, по которым посчитаны веса: по ним видно, какие пары изменились
+        self._bid = array('d', bytes(8 * len(self.symbols)))
+        self._ask = array('d', bytes(8 * len(self.symbols)))
+
+    def _node(self, currency: str) -> int:
+        node = self.node_ids.get(currency)
+        if node is None:
+            node = self.node_ids[currency] = len(self.nodes)
+            self.nodes.append(currency)
+            self.out.append([])
+        return node
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def leg(self, edge: int) -> Tuple[str, str]:
+        return self.symbols[edge >> 1], 'sell' if edge & 1 else 'buy'
+
+    def sync(self) -> Tuple[List[int], List[int]]:
+        """
+        Пересчитать веса пар, котировка которых изменилась с прошлого раза.
+        Возвращает ребра, вес которых уменьшился и увеличился.
+        """
+        bid, ask = self.store.bid, self.store.ask
+        fee = self.fee
+        weight = self.weight
+        decreased: List[int] = []
+        increased: List[int] = []
+        for k, i in enumerate(self.symbol_ids):
+            b, a = bid[i], ask[i]
+            if b == self._bid[k] and a == self._ask[k]:
+                continue
+            self._bid[k], self._ask[k] = b, a
+            new = (-(fee - math.log(a)) if a > 0 else INF, -(math.log(b) + fee) if b > 0 else INF)
+            for edge, w in zip((2 * k, 2 * k + 1), new):
+                old = weight[edge]
+                if w < old:
+                    decreased.append(edge)
+                elif w > old:
+                    increased.append(edge)
+                weight[edge] = w
+        return decreased, increased
+
+
+class NegativeCycleDetector:
+    """
+    SPFA от каждой фондированной валюты с проверкой графа предков на цикл.
+    Пока отрицательного цикла нет, расстояния сохраняются: следующий запуск ставит в очередь
+    только начала подешевевших ребер. Если подорожало ребро дерева кратчайших путей -
+    расчет для этой валюты начинается заново.
+    Найденный цикл запоминается, его самое дорогое ребро временно выключается и поиск
+    повторяется (не более max_rounds раз) - из найденных выбираются самые выгодные.
+    """
+
+    def __init__(self, graph: RateGraph, max_legs: int = 5, max_rounds: int = 4):
+        self.graph = graph
+        self.max_legs = max_legs
+        self.max_rounds = max_rounds
+        self._state: Dict[int, Tuple[array, array]] = {}  # стартовая валюта -> (dist, parent edge)
+        self.relaxations = 0
+        self.elapsed_ms = 0.0
+
+    def detect(self, starts: Iterable[str], decreased: Sequence[int] = (),
+               increased: Sequence[int] = ()) -> List[DetectedCycle]:
+        """Отрицательные циклы, достижимые из стартовых валют, от самого выгодного"""
+        start_time = time.perf_counter()
+        self.relaxations = 0
+        found: Dict[Tuple[str, ...], DetectedCycle] = {}
+        increased_set = set(increased)
+
+        for currency in starts:
+            source = self.graph.node_ids.get(currency)
+            if source is None:
+                continue
+            state = self._state.pop(source, None)
+            if state is not None and any(state[1][self.graph.dst[e]] == e for e in increased_set):
+                state = None
+            disabled: Set[int] = set()
+            accepted = False
+            for _round in range(self.max_rounds):
+                if state is None:
+                    dist = array('d', [INF]) * len(self.graph)
+                    parent = array('l', [-1]) * len(self.graph)
+                    dist[source] = 0.0
+                    seeds = [source]
+                else:
+                    dist, parent = state
+                    seeds = [self.graph.src[e] for e in decreased if dist[self.graph.src[e]] < INF]
+                cycle_edges = self._spfa(dist, parent, seeds, disabled)
+                if cycle_edges is None:
+                    # Расстояния без выключенных ребер годятся, если выключены только ребра
+                    # отвергнутых циклов (длинных): иначе следующий запуск ищет с нуля
+                    if not accepted:
+                        self._state[source] = (dist, parent)
+                    break
+                detected = self._to_cycle(cycle_edges, currency)
+                if detected is not None:
+                    accepted = True
+                    key = tuple(sorted(detected.legs))
+                    if key not in found or found[key].log_return < detected.log_return:
+                        found[key] = detected
+                # Выключаем самое дорогое ребро цикла и ищем дальше с нуля
+                disabled.add(max(cycle_edges, key=lambda e: self.graph.weight[e]))
+                state = None
+
+        self.elapsed_ms = (time.perf_counter() - start_time) * 1000
+        return sorted(found.values(), key=lambda c: c.log_return, reverse=True)
+
+    def _spfa(self, dist: array, parent: array, seeds: Iterable[int], disabled: Set[int]) -> Optional[List[int]]:
+        """Релаксация из seeds; при появлении цикла в графе предков - его ребра"""
+        graph = self.graph
+        weight, dst, out = graph.weight, graph.dst, graph.out
+        n = len(graph)
+        queue = deque()
+        queued = bytearray(n)
+        for node in seeds:
+            if not queued[node]:
+                queued[node] = 1
+                queue.append(node)
+        since_check = 0
+        while queue:
+            u = queue.popleft()
+            queued[u] = 0
+            du = dist[u]
+            for edge in out[u]:
+                w = weight[edge]
+                if w == INF or edge in disabled:
+                    continue
+                v = dst[edge]
+                if du + w < dist[v] - 1e-12:
+                    dist[v] = du + w
+                    parent[v] = edge
+                    self.relaxations += 1
+                    since_check += 1
+                    if not queued[v]:
+                        queued[v] = 1
+                        queue.append(v)
+            # Цикл в графе предков появляется раньше, чем Bellman-Ford доходит до n итераций
+            if since_check >= n:
+                since_check = 0
+                cycle = self._parent_cycle(parent)
+                if cycle is not None:
+                    return cycle
+        return None
+
+    def _parent_cycle(self, parent: array) -> Optional[List[int]]:
+        """Ребра цикла в графе предков (в порядке обхода вперед) или None"""
+        src = self.graph.src
+        n = len(parent)
+        color = bytearray(n)  # 0 - не посещен, 1 - в текущем проходе, 2 - проверен
+        for node in range(n):
+            if color[node]:
+                continue
+            path = []
+            x = node
+            while x >= 0 and not color[x]:
+                color[x] = 1
+                path.append(x)
+                edge = parent[x]
+                x = src[edge] if edge >= 0 else -1
+            if x >= 0 and color[x] == 1:
+                # x - на цикле: идем по предкам до возврата в x
+                edges = []
+                y = x
+                while True:
+                    edge = parent[y]
+                    edges.append(edge)
+                    y = src[edge]
+                    if y == x:
+                        break
+                edges.reverse()
+                for p in path:
+                    color[p] = 2
+                return edges
+            for p in path:
+                color[p] = 2
+        return None
+
+    def _to_cycle(self, edges: List[int], funded: str) -> Optional[DetectedCycle]:
+        """Цикл в формате cycles.Cycle, повернутый к фондированной валюте, если она в нем есть"""
+        if len(edges) > self.max_legs:
+            return None
+        graph = self.graph
+        currencies = [graph.nodes[graph.src[e]] for e in edges]
+        offset = currencies.index(funded) if funded in currencies else 0
+        edges = edges[offset:] + edges[:offset]
+        total = sum(graph.weight[e] for e in edges)
+        if total >= 0:
+            return None
+        return DetectedCycle(
+            start=graph.nodes[graph.src[edges[0]]],
+            legs=tuple(graph.leg(e) for e in edges),
+            log_return=-total,
+        )
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Аналитика жизни возможностей
+Эпизоды, когда треугольник держится выше порога прибыли: начало, конец, пиковая прибыль
+и доступная глубина. Распределения длительности по треугольникам и базовым валютам
+задают бюджет задержки и частоту сканирования.
+"""
+
+import time
+from array import array
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from latency import HdrHistogram
+
+# Перцентили длительности эпизодов
+LIFETIME_PERCENTILES = (50.0, 90.0, 99.0)
+
+
+class Episode:
+    """Один непрерывный эпизод выше порога"""
+
+    __slots__ = ('key', 'base', 'start', 'last_seen', 'end', 'peak_edge', 'peak_depth', 'observations')
+
+    def __init__(self, key: str, base: str, start: float, edge: float, depth: float):
+        self.key = key
+        self.base = base
+        self.start = start
+        self.last_seen = start
+        self.end: Optional[float] = None
+        self.peak_edge = edge
+        self.peak_depth = depth
+        self.observations = 1
+
+    def observe(self, now: float, edge: float, depth: float):
+        self.last_seen = now
+        self.observations += 1
+        if edge > self.peak_edge:
+            self.peak_edge = edge
+            self.peak_depth = depth
+
+    @property
+    def lifetime(self) -> float:
+        """Длительность в секундах: до первого наблюдения ниже порога (верхняя оценка)"""
+        end = self.end if self.end is not None else self.last_seen
+        return end - self.start
+
+
+def triangle_depth(bid, ask, bid_size, ask_size, legs: Tuple[int, int, int], direct: bool) -> float:
+    """
+    Объем на лучших уровнях всех трех ног в базовой валюте треугольника
+    (минимум по ногам; 0 - объем неизвестен).
+    """
+    i1, i2, i3 = legs
+    leg1 = ask[i1] * ask_size[i1]                      # base, потраченные на crypto1
+    leg3 = bid[i3] * bid_size[i3]                      # base, полученные за crypto2
+    if direct:
+        leg2 = bid_size[i2] * ask[i1]                  # crypto1 -> base
+    else:
+        leg2 = ask_size[i2] * bid[i3]                  # crypto2 -> base
+    depths = [d for d in (leg1, leg2, leg3) if d > 0]
+    return min(depths) if len(depths) == 3 else 0.0
+
+
+def cycle_depth(bid, ask, bid_size, ask_size, legs: Tuple[int, ...], buys: Tuple[bool, ...]) -> float:
+    """
+    То же для цикла из N ног: объем каждой ноги в валюте, которую она тратит,
+    пересчитывается в стартовую валюту по ценам предыдущих ног.
+    """
+    depths = []
+    value = 1.0  # стоимость единицы расходуемой валюты в стартовой
+    for i, buy in zip(legs, buys):
+        if buy:
+            depths.append(ask[i] * ask_size[i] * value)   # тратим quote
+            value *= ask[i]
+        else:
+            depths.append(bid_size[i] * value)            # тратим base
+            value = value / bid[i] if bid[i] > 0 else 0.0
+    return min(depths) if depths and all(d > 0 for d in depths) else 0.0
+
+
+def episode_key(entry) -> str:
+    """Ключ эпизода скомпилированного треугольника или цикла"""
+    return f"{entry.path} ({entry.triangle[-1]})"
+
+
+def net_edge_percent(prices: Sequence[float], buys: Sequence[bool], fee_rate: float) -> float:
+    """Прибыль цикла после комиссий в % по ценам ног (покупка по ask, продажа по bid)"""
+    amount = 1.0
+    for price, buy in zip(prices, buys):
+        amount = amount / price if buy else amount * price
+    return (amount - 1.0 - fee_rate) * 100
+
+
+class OpportunityAnalytics:
+    """Учет эпизодов по снимкам сканера"""
+
+    def __init__(self, history: int = 1000):
+        self.open: Dict[str, Episode] = {}
+        self.closed: Deque[Episode] = deque(maxlen=history)
+        self.by_triangle: Dict[str, HdrHistogram] = {}
+        self.by_base: Dict[str, HdrHistogram] = {}
+        self.last_update: Optional[float] = None
+        self._intervals = HdrHistogram()  # интервал между наблюдениями - разрешение измерений
+
+    def update(self, above: Mapping[str, Tuple[str, float, float]], now: Optional[float] = None,
+               scored: Optional[Iterable[str]] = None) -> List[Episode]:
+        """
+        Снимок сканирования: above - {ключ треугольника: (базовая валюта, прибыль %, глубина)}
+        для всех треугольников выше порога. Эпизоды, которых нет в снимке, закрываются.
+        scored - ключи, которые пересчитывались (частичный снимок): закрываются только они.
+        Возвращает закрытые эпизоды.
+        """
+        if now is None:
+            now = time.monotonic()
+        if self.last_update is not None:
+            self._intervals.record((now - self.last_update) * 1e6)
+        self.last_update = now
+
+        for key, (base, edge, depth) in above.items():
+            episode = self.open.get(key)
+            if episode is None:
+                self.open[key] = Episode(key, base, now, edge, depth)
+            else:
+                episode.observe(now, edge, depth)
+
+        if scored is None:
+            finished = [key for key in self.open if key not in above]
+        else:
+            finished = [key for key in scored if key in self.open and key not in above]
+        closed = []
+        for key in finished:
+            episode = self.open.pop(key)
+            episode.end = now
+            self._record(episode)
+            closed.append(episode)
+        return closed
+
+    def _record(self, episode: Episode):
+        value_us = episode.lifetime * 1e6
+        for table, key in ((self.by_triangle, episode.key), (self.by_base, episode.base)):
+            histogram = table.get(key)
+            if histogram is None:
+                histogram = table[key] = HdrHistogram()
+            histogram.record(value_us)
+        self.closed.append(episode)
+
+    @staticmethod
+    def _describe(histogram: HdrHistogram) -> Dict[str, float]:
+        entry = {'count': histogram.total_count}
+        for p in LIFETIME_PERCENTILES:
+            entry[f"p{p:g}"] = round(histogram.percentile(p) / 1e6, 3)
+        return entry
+
+    def summary(self, top: int = 5) -> Dict:
+        """Распределения длительности (секунды) по базовым валютам и самым частым треугольникам"""
+        frequent = sorted(self.by_triangle.items(), key=lambda item: item[1].total_count, reverse=True)[:top]
+        peaks = sorted(e.peak_edge for e in self.closed)
+        return {
+            'resolution_s': round(self._intervals.percentile(50.0) / 1e6, 3),
+            'open': len(self.open),
+            'by_base': {base: self._describe(h) for base, h in sorted(self.by_base.items())},
+            'top_triangles': {key: self._describe(h) for key, h in frequent},
+            'median_peak_edge': round(peaks[len(peaks) // 2], 4) if peaks else 0.0,
+        }
+
+
+class LifetimeSampler:
+    """
+    Эпизоды между сканами по потоковым котировкам.
+    Проход находит символы, котировка которых обновилась (колонка received), пересчитывает
+    только треугольники и циклы с такой ногой и продлевает или закрывает их эпизоды.
+    Воркеры пишут котировки в общую память без уведомлений, поэтому изменения ищутся опросом.
+    """
+
+    def __init__(self, analytics: OpportunityAnalytics, quotes):
+        self.analytics = analytics
+        self.quotes = quotes
+        self.seen = array('d')  # received на прошлом проходе
+        self.by_symbol: Dict[int, List[Tuple[object, Tuple[bool, ...]]]] = {}
+        self._source: Tuple = ()
+
+    def _index(self, *sources: Sequence):
+        """Треугольники и циклы по id символа ноги (перестраивается при смене списков)"""
+        if len(sources) == len(self._source) and all(a is b for a, b in zip(sources, self._source)):
+            return
+        self._source = sources
+        self.by_symbol = {}
+        for entries in sources:
+            for entry in entries:
+                item = (entry, tuple(side == 'buy' for side in entry.sides))
+                for i in set(entry.legs):
+                    self.by_symbol.setdefault(i, []).append(item)
+
+    def sample(self, triangles: Sequence, cycles: Sequence, fee_rate: Callable[[int], float],
+               min_profit: float, now: Optional[float] = None) -> int:
+        """Пересчитать треугольники с обновившейся ногой; возвращает число пересчитанных"""
+        self._index(triangles, cycles)
+        quotes = self.quotes
+        received, seen = quotes.received, self.seen
+        n = len(quotes)
+        if len(seen) < n:
+            seen.extend(array('d', bytes(8 * (n - len(seen)))))
+        changed = [i for i, fresh, old in zip(range(n), received, seen) if fresh != old]
+        if not changed:
+            return 0
+        entries = {}
+        for i in changed:
+            seen[i] = received[i]
+            for item in self.by_symbol.get(i, ()):
+                entries[id(item[0])] = item
+
+        above = {}
+        scored = []
+        for entry, buys in entries.values():
+            key = episode_key(entry)
+            scored.append(key)
+            # Согласованные котировки ног: строку может в этот момент переписывать воркер
+            legs = [quotes.read(i) for i in entry.legs]
+            bid = [leg[0] for leg in legs]
+            ask = [leg[1] for leg in legs]
+            prices = [a if buy else b for b, a, buy in zip(bid, ask, buys)]
+            if not all(price > 0 for price in prices):
+                continue
+            edge = net_edge_percent(prices, buys, fee_rate(len(buys)))
+            if edge >= min_profit:
+                depth = cycle_depth(bid, ask, [leg[2] for leg in legs], [leg[3] for leg in legs],
+                                    tuple(range(len(legs))), buys)
+                above[key] = (entry.path.split(' → ')[0], edge, depth)
+        if scored:
+            self.analytics.update(above, now, scored=scored)
+        return len(scored)
+
+
+def format_lifetime_summary(summary: Mapping) -> str:
+    """Текст для Telegram и логов"""
+    if not summary or not summary.get('by_base'):
+        return "нет данных"
+    lines = [f"Разрешение: ~{summary.get('resolution_s', 0):.1f}с, открыто эпизодов: {summary.get('open', 0)}"]
+    for base, entry in summary['by_base'].items():
+        lines.append(
+            f"• {base}: p50 {entry.get('p50', 0):.1f} / p90 {entry.get('p90', 0):.1f} / "
+            f"p99 {entry.get('p99', 0):.1f} с (n={entry.get('count', 0)})"
+        )
+    for key, entry in summary.get('top_triangles', {}).items():
+        lines.append(f"  {key}: p50 {entry.get('p50', 0):.1f} с (n={entry.get('count', 0)})")
+    lines.append(f"Медианная пиковая прибыль: {summary.get('median_peak_edge', 0):.3f}%")
+    return "\n".join(lines)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Компактное хранилище котировок
+Параллельные массивы float (bid, ask, объемы, время) по числовому id символа
+вместо словарей тикеров ccxt, и треугольники, скомпилированные в индексы ног.
+Для каждой котировки хранится время на бирже и время получения - по ним считается возраст.
+"""
+
+import time
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from cycles import Cycle, cycle_key, cycle_path
+from triangles import triangle_path, triangle_sides
+
+
+class QuoteStore:
+    """Лучшие цены по всем символам в параллельных массивах array('d')"""
+
+    __slots__ = ('ids', 'symbols', 'bid', 'ask', 'bid_size', 'ask_size', 'timestamp', 'received')
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.bid = array('d')
+        self.ask = array('d')
+        self.bid_size = array('d')
+        self.ask_size = array('d')
+        self.timestamp = array('d')  # время котировки на бирже, мс (0 - неизвестно)
+        self.received = array('d')   # время получения, time.monotonic() в секундах
+        for symbol in symbols:
+            self.symbol_id(symbol)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.ids
+
+    def symbol_id(self, symbol: str) -> int:
+        """Id символа (новый символ получает следующий индекс)"""
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+            for column in (self.bid, self.ask, self.bid_size, self.ask_size, self.timestamp, self.received):
+                column.append(0.0)
+        return symbol_id
+
+    def update(self, symbol: str, bid: Optional[float], ask: Optional[float],
+               bid_size: Optional[float] = None, ask_size: Optional[float] = None,
+               timestamp: Optional[float] = None, received: Optional[float] = None) -> int:
+        i = self.symbol_id(symbol)
+        self.bid[i] = bid or 0.0
+        self.ask[i] = ask or 0.0
+        self.bid_size[i] = bid_size or 0.0
+        self.ask_size[i] = ask_size or 0.0
+        self.timestamp[i] = timestamp or 0.0
+        self.received[i] = time.monotonic() if received is None else received
+        return i
+
+    def update_from_tickers(self, tickers: Mapping[str, Mapping], received: Optional[float] = None) -> int:
+        """Записать ответ fetch_tickers / watch_tickers; сам словарь не сохраняется"""
+        if received is None:
+            received = time.monotonic()
+        for symbol, ticker in tickers.items():
+            self.update(symbol, ticker.get('bid'), ticker.get('ask'),
+                        ticker.get('bidVolume'), ticker.get('askVolume'), ticker.get('timestamp'), received)
+        return len(tickers)
+
+    def age_ms(self, i: int, now_ms: Optional[float] = None, now_monotonic: Optional[float] = None) -> float:
+        """
+        Возраст котировки: больший из возраста по времени биржи и времени с момента получения.
+        Котировка, которую еще не получали, бесконечно старая.
+        """
+        if self.received[i] <= 0:
+            return float('inf')
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        if now_monotonic is None:
+            now_monotonic = time.monotonic()
+        age = (now_monotonic - self.received[i]) * 1000
+        if self.timestamp[i] > 0:
+            age = max(age, now_ms - self.timestamp[i])
+        return age
+
+    def ages_ms(self, now_ms: Optional[float] = None, now_monotonic: Optional[float] = None) -> array:
+        """Возраст всех котировок одним проходом (для сканирования)"""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        if now_monotonic is None:
+            now_monotonic = time.monotonic()
+        inf = float('inf')
+        ages = array('d', bytes(8 * len(self.symbols)))
+        # range ограничивает проход числом символов: колонки могут быть длиннее (общая память)
+        for i, timestamp, received in zip(range(len(ages)), self.timestamp, self.received):
+            if received <= 0:
+                ages[i] = inf
+                continue
+            age = (now_monotonic - received) * 1000
+            if timestamp > 0 and now_ms - timestamp > age:
+                age = now_ms - timestamp
+            ages[i] = age
+        return ages
+
+    def read(self, i: int) -> Tuple[float, float, float, float, float, float]:
+        """Котировка символа целиком: bid, ask, bid_size, ask_size, timestamp, received"""
+        return (self.bid[i], self.ask[i], self.bid_size[i], self.ask_size[i],
+                self.timestamp[i], self.received[i])
+
+    def mark_stale(self, symbols: Iterable[str]) -> int:
+        """Сбросить время получения: возраст котировок становится бесконечным до следующего обновления"""
+        marked = 0
+        for symbol in symbols:
+            i = self.ids.get(symbol)
+            if i is not None:
+                self.received[i] = 0.0
+                self.timestamp[i] = 0.0
+                marked += 1
+        return marked
+
+    def has_quote(self, i: int) -> bool:
+        return self.bid[i] > 0 and self.ask[i] > 0
+
+    def quote(self, symbol: str) -> Optional[Tuple[float, float]]:
+        i = self.ids.get(symbol)
+        if i is None:
+            return None
+        return self.bid[i], self.ask[i]
+
+
+class CompiledTriangle:
+    """Треугольник с id символов ног вместо строк"""
+
+    __slots__ = ('triangle', 'path', 'leg1', 'leg2', 'leg3', 'direct', 'sides')
+
+    def __init__(self, triangle: Tuple[str, str, str, str], path: str, legs: Tuple[int, int, int]):
+        self.triangle = triangle
+        self.path = path
+        self.leg1, self.leg2, self.leg3 = legs
+        self.direct = triangle[3] == 'direct'
+        self.sides = triangle_sides(triangle[3])
+
+    @property
+    def legs(self) -> Tuple[int, int, int]:
+        return self.leg1, self.leg2, self.leg3
+
+
+class CompiledCycle:
+    """Цикл из N ног: id символов и стороны (True - покупка по ask, False - продажа по bid)"""
+
+    __slots__ = ('triangle', 'path', 'legs', 'buys', 'sides')
+
+    def __init__(self, cycle: Cycle, legs: Tuple[int, ...]):
+        self.triangle = cycle_key(cycle)
+        self.path = cycle_path(cycle)
+        self.legs = legs
+        self.sides = tuple(side for _symbol, side in cycle)
+        self.buys = tuple(side == 'buy' for side in self.sides)
+
+
+def compile_triangles(triangles: Iterable[Tuple[str, str, str, str]], store: QuoteStore) -> List[CompiledTriangle]:
+    """Перевести треугольники в индексы хранилища"""
+    compiled = []
+    for triangle in triangles:
+        pair1, pair2, pair3, _direction = triangle
+        legs = (store.symbol_id(pair1), store.symbol_id(pair2), store.symbol_id(pair3))
+        compiled.append(CompiledTriangle(triangle, triangle_path(triangle), legs))
+    return compiled
+
+
+def compile_cycles(cycles: Iterable[Cycle], store: QuoteStore) -> List[CompiledCycle]:
+    """Перевести циклы в индексы хранилища"""
+    return [CompiledCycle(cycle, tuple(store.symbol_id(symbol) for symbol, _side in cycle)) for cycle in cycles]
+
+
+def freshness_score(leg_ages_ms: Iterable[float], max_age_ms: float) -> float:
+    """Свежесть треугольника: 1.0 - все котировки новые, 0.0 - самая старая нога на пределе"""
+    if max_age_ms <= 0:
+        return 1.0
+    oldest = max(leg_ages_ms)
+    return max(0.0, 1.0 - oldest / max_age_ms)
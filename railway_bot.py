@@ -9,7 +9,13 @@ import time
 import os
 import sys
 import traceback
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Iterable, Iterator, List, Mapping
+
+from exchange_client import get_shared_client
+from rate_limiter import reporting_priority
+from valuation import free_balances, value_portfolio
 
 # Загружаем переменные окружения
 try:
@@ -19,6 +25,46 @@ try:
 except ImportError:
     pass
 
+@dataclass
+class SpreadOpportunity:
+    """Возможность по спреду пары"""
+    pair: str
+    bid: float
+    ask: float
+    spread: float  # %
+    profit: float = 0.0  # потенциальная прибыль %, заполняется при оценке
+
+
+def iter_spreads(tickers: Mapping[str, Mapping]) -> Iterator[SpreadOpportunity]:
+    """Спреды по тикерам с валидным стаканом"""
+    for pair, ticker in tickers.items():
+        bid = ticker.get('bid')
+        ask = ticker.get('ask')
+        if bid and ask and bid > 0:
+            yield SpreadOpportunity(pair=pair, bid=bid, ask=ask, spread=((ask - bid) / bid) * 100)
+
+
+def filter_opportunities(opportunities: Iterable[SpreadOpportunity], max_spread: float) -> Iterator[SpreadOpportunity]:
+    """Только пары с хорошим спредом"""
+    for opportunity in opportunities:
+        if opportunity.spread < max_spread:
+            yield opportunity
+
+
+def score_opportunities(opportunities: Iterable[SpreadOpportunity], min_profit: float) -> Iterator[SpreadOpportunity]:
+    """Перевод спреда в потенциальную прибыль и отсев ниже порога"""
+    for opportunity in opportunities:
+        opportunity.profit = (0.1 - opportunity.spread) * 10 + 0.5
+        if opportunity.profit >= min_profit:
+            yield opportunity
+
+
+def format_opportunities(opportunities: Iterable[SpreadOpportunity]) -> str:
+    """Текст для Telegram"""
+    lines = [f"• {o.pair}: спред {o.spread:.3f}%" for o in opportunities]
+    return "🔍 **НАЙДЕННЫЕ ВОЗМОЖНОСТИ:**\n\n" + "\n".join(lines)
+
+
 class RailwayBot:
     """Бот для стабильной работы на Railway"""
     
@@ -43,6 +89,14 @@ class RailwayBot:
         self.total_profit = 0.0
         self.is_trading = False
         
+        # Один async клиент MEXC на все методы: keep-alive соединения и рынки загружаются один раз
+        self.mexc = get_shared_client({
+            'timeout': 45000,   # Увеличиваем таймаут до 45 секунд
+            'headers': {
+                'User-Agent': 'Railway-Bot/1.0'
+            }
+        })
+        
         print(f"[{self.get_time()}] Railway бот инициализирован")
         print(f"[{self.get_time()}] Telegram токен: {'✅' if self.telegram_token else '❌'}")
         print(f"[{self.get_time()}] Chat ID: {'✅' if self.telegram_chat_id else '❌'}")
@@ -83,70 +137,45 @@ class RailwayBot:
         
         for attempt in range(max_retries):
             try:
-                import ccxt
-                
-                api_key = os.getenv('MEXC_API_KEY')
-                api_secret = os.getenv('MEXC_API_SECRET')
-                
-                if not api_key or not api_secret:
+                if not self.mexc.has_credentials:
                     return "❌ Нет API ключей MEXC"
                 
-                print(f"[{self.get_time()}] Попытка {attempt + 1} подключения к MEXC...")
-                
-                # Создаем новое подключение с Railway-оптимизированными настройками
-                exchange = ccxt.mexc({
-                    'apiKey': api_key,
-                    'secret': api_secret,
-                    'sandbox': False,
-                    'enableRateLimit': True,
-                    'rateLimit': 3000,  # Увеличиваем для Railway
-                    'timeout': 45000,   # Увеличиваем таймаут до 45 секунд
-                    'options': {
-                        'defaultType': 'spot',
-                        'adjustForTimeDifference': True,
-                    },
-                    'headers': {
-                        'User-Agent': 'Railway-Bot/1.0'
-                    }
-                })
+                print(f"[{self.get_time()}] Попытка {attempt + 1} получения баланса MEXC...")
                 
-                # Проверяем подключение сначала
-                await asyncio.sleep(1)  # Небольшая пауза
+                exchange = await self.mexc.get()
                 
                 # Получаем баланс с повторными попытками
-                balance = exchange.fetch_balance()
+                balance = await exchange.fetch_balance()
                 
                 # Собираем валюты с балансом
-                currencies = []
-                total_usdt = 0
-                
-                for currency, info in balance.items():
-                    if isinstance(info, dict):
-                        free = info.get('free', 0)
-                        if free and free > 0.001:
-                            currencies.append(f"• {currency}: {free:.6f}")
-                            
-                            if currency == 'USDT':
-                                total_usdt += free
-                            else:
-                                # Пробуем оценить в USDT с обработкой ошибок
-                                try:
-                                    await asyncio.sleep(0.5)  # Пауза между запросами
-                                    ticker = exchange.fetch_ticker(f"{currency}/USDT")
-                                    if ticker and ticker.get('last'):
-                                        usdt_value = free * ticker['last']
-                                        total_usdt += usdt_value
-                                        currencies[-1] += f" (≈{usdt_value:.2f} USDT)"
-                                except:
-                                    pass  # Игнорируем ошибки оценки
+                balances = free_balances(balance, min_amount=0.001)
                 
-                if not currencies:
+                if not balances:
                     return "💰 **ОТЧЕТ О БАЛАНСЕ**\n\n❌ Нет доступных средств на MEXC"
                 
+                # Оцениваем весь баланс по одному снимку тикеров
+                try:
+                    tickers = await exchange.fetch_tickers()
+                except Exception as e:
+                    print(f"[{self.get_time()}] Ошибка получения тикеров: {str(e)[:100]}")
+                    tickers = {}  # Оцениваем только USDT
+                
+                valuation = value_portfolio(balances, tickers, 'USDT')
+                
+                currencies = []
+                for asset in valuation.assets:
+                    line = f"• {asset.currency}: {asset.amount:.6f}"
+                    if asset.currency != 'USDT' and asset.value > 0:
+                        line += f" (≈{asset.value:.2f} USDT"
+                        if not asset.is_direct:
+                            line += f" через {' → '.join(asset.path[1:-1])}"
+                        line += ")"
+                    currencies.append(line)
+                
                 # Формируем отчет
                 report = "💰 **ОТЧЕТ О БАЛАНСЕ MEXC**\n\n"
                 report += "\n".join(currencies[:15])  # Максимум 15 валют
-                report += f"\n\n💵 **Общая стоимость:** ≈{total_usdt:.2f} USDT"
+                report += f"\n\n💵 **Общая стоимость:** ≈{valuation.total:.2f} USDT"
                 
                 print(f"[{self.get_time()}] Баланс получен успешно с попытки {attempt + 1}")
                 return report
@@ -165,67 +194,33 @@ class RailwayBot:
                     print(f"[{self.get_time()}] {final_error}")
                     return final_error
     
-    async def find_opportunities(self):
+    async def find_opportunities(self) -> List[SpreadOpportunity]:
         """Поиск возможностей с обработкой ошибок для Railway"""
         max_retries = 2
         
         for attempt in range(max_retries):
             try:
-                import ccxt
-                
-                api_key = os.getenv('MEXC_API_KEY')
-                api_secret = os.getenv('MEXC_API_SECRET')
-                
-                if not api_key or not api_secret:
-                    return None
+                if not self.mexc.has_credentials:
+                    return []
                 
                 print(f"[{self.get_time()}] Поиск возможностей, попытка {attempt + 1}...")
                 
-                exchange = ccxt.mexc({
-                    'apiKey': api_key,
-                    'secret': api_secret,
-                    'sandbox': False,
-                    'enableRateLimit': True,
-                    'rateLimit': 3000,
-                    'timeout': 45000,
-                    'options': {
-                        'defaultType': 'spot',
-                        'adjustForTimeDifference': True,
-                    },
-                    'headers': {
-                        'User-Agent': 'Railway-Bot/1.0'
-                    }
-                })
+                exchange = await self.mexc.get()
                 
                 # Простые пары для проверки
                 pairs = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'ADA/USDT', 'SOL/USDT']
-                opportunities = []
+                # Один запрос тикеров на все пары
+                tickers = await exchange.fetch_tickers(pairs)
                 
-                for pair in pairs:
-                    try:
-                        await asyncio.sleep(0.5)  # Пауза между запросами
-                        ticker = exchange.fetch_ticker(pair)
-                        
-                        # Простая проверка спреда
-                        bid = ticker.get('bid')
-                        ask = ticker.get('ask')
-                        if bid and ask and bid > 0:
-                            spread = ((ask - bid) / bid) * 100
-                            
-                            if spread < 0.3:  # Хороший спред
-                                opportunities.append(f"• {pair}: спред {spread:.3f}%")
-                                
-                    except Exception as e:
-                        print(f"[{self.get_time()}] Ошибка для {pair}: {str(e)[:50]}")
-                        continue  # Пропускаем проблемные пары
+                # Хороший спред < 0.3%
+                opportunities = list(filter_opportunities(iter_spreads(tickers), max_spread=0.3))
                 
                 if opportunities:
-                    result = "🔍 **НАЙДЕННЫЕ ВОЗМОЖНОСТИ:**\n\n" + "\n".join(opportunities)
                     print(f"[{self.get_time()}] Найдено {len(opportunities)} возможностей")
-                    return result
+                    return opportunities
                 else:
                     print(f"[{self.get_time()}] Хороших возможностей не найдено")
-                    return None  # Не отправляем если нет хороших возможностей
+                    return []  # Не отправляем если нет хороших возможностей
                     
             except Exception as e:
                 error_msg = f"Попытка {attempt + 1}: {str(e)[:100]}"
@@ -235,39 +230,20 @@ class RailwayBot:
                     await asyncio.sleep(3)  # Пауза перед повтором
                 else:
                     print(f"[{self.get_time()}] Поиск возможностей не удался после {max_retries} попыток")
-                    return None
+                    return []
     
     async def test_mexc_connection(self):
         """Тест подключения к MEXC при запуске"""
         try:
-            import ccxt
-            
-            api_key = os.getenv('MEXC_API_KEY')
-            api_secret = os.getenv('MEXC_API_SECRET')
-            
-            if not api_key or not api_secret:
+            if not self.mexc.has_credentials:
                 return False, "❌ Нет API ключей MEXC"
             
             print(f"[{self.get_time()}] Тестирование подключения к MEXC...")
             
-            exchange = ccxt.mexc({
-                'apiKey': api_key,
-                'secret': api_secret,
-                'sandbox': False,
-                'enableRateLimit': True,
-                'rateLimit': 3000,
-                'timeout': 45000,
-                'options': {
-                    'defaultType': 'spot',
-                    'adjustForTimeDifference': True,
-                },
-                'headers': {
-                    'User-Agent': 'Railway-Bot/1.0'
-                }
-            })
+            exchange = await self.mexc.get()
             
             # Простой тест - получение информации о бирже
-            exchange_info = exchange.fetch_status()
+            exchange_info = await exchange.fetch_status()
             
             if exchange_info.get('status') == 'ok':
                 print(f"[{self.get_time()}] ✅ MEXC подключение успешно")
@@ -281,7 +257,7 @@ class RailwayBot:
             print(f"[{self.get_time()}] {error_msg}")
             return False, error_msg
     
-    async def execute_arbitrage_opportunity(self, opportunity):
+    async def execute_arbitrage_opportunity(self, opportunity: SpreadOpportunity):
         """Исполнение арбитражной возможности"""
         if self.is_trading:
             return False
@@ -289,8 +265,8 @@ class RailwayBot:
         self.is_trading = True
         
         try:
-            pair = opportunity.get('pair', 'Unknown')
-            profit = opportunity.get('profit', 0)
+            pair = opportunity.pair
+            profit = opportunity.profit
             
             print(f"[{self.get_time()}] 🚀 Исполнение арбитража: {pair}")
             
@@ -440,7 +416,8 @@ class RailwayBot:
                     print(f"[{current_time}] Получение баланса...")
                     
                     try:
-                        balance_report = await self.get_mexc_balance()
+                        with reporting_priority():
+                            balance_report = await self.get_mexc_balance()
                         
                         # Проверяем, что это не ошибка
                         if not balance_report.startswith("❌"):
@@ -471,42 +448,20 @@ class RailwayBot:
                         opportunities = await self.find_opportunities()
                         
                         if opportunities:
-                            # Парсим возможности
-                            lines = opportunities.split('\n')
-                            best_opportunities = []
-                            
-                            for line in lines:
-                                if '• ' in line and 'спред' in line:
-                                    try:
-                                        parts = line.split(':')
-                                        if len(parts) >= 2:
-                                            pair = parts[0].replace('• ', '').strip()
-                                            spread_part = parts[1].split('%')[0].strip()
-                                            spread = float(spread_part.replace('спред ', ''))
-                                            
-                                            # Конвертируем спред в потенциальную прибыль
-                                            potential_profit = (0.1 - spread) * 10 + 0.5
-                                            
-                                            if potential_profit >= self.min_profit_threshold:
-                                                best_opportunities.append({
-                                                    'pair': pair,
-                                                    'profit': potential_profit,
-                                                    'spread': spread
-                                                })
-                                    except:
-                                        continue
+                            # Конвертируем спред в потенциальную прибыль
+                            best_opportunities = list(score_opportunities(opportunities, self.min_profit_threshold))
                             
                             if best_opportunities and self.auto_trading:
                                 # Берем лучшую возможность
-                                best_opp = max(best_opportunities, key=lambda x: x['profit'])
+                                best_opp = max(best_opportunities, key=lambda x: x.profit)
                                 
-                                print(f"[{current_time}] 💎 Лучшая возможность: {best_opp['pair']} - {best_opp['profit']:.3f}%")
+                                print(f"[{current_time}] 💎 Лучшая возможность: {best_opp.pair} - {best_opp.profit:.3f}%")
                                 
                                 # Исполняем арбитраж
                                 await self.execute_arbitrage_opportunity(best_opp)
                             
                             else:
-                                opp_msg = opportunities + f"\n\n⏰ Время: {current_time}"
+                                opp_msg = format_opportunities(opportunities) + f"\n\n⏰ Время: {current_time}"
                                 await self.send_telegram(opp_msg)
                                 print(f"[{current_time}] Возможности найдены и отправлены")
                         else:
@@ -531,6 +486,8 @@ class RailwayBot:
                 await self.handle_error(e, "Главный цикл")
                 print(f"[{self.get_time()}] Пауза 60 секунд после ошибки...")
                 await asyncio.sleep(60)  # Пауза при критической ошибке
+        
+        await self.mexc.close()
 
 async def main():
     """Главная функция для Railway"""
@@ -559,6 +516,8 @@ async def main():
             await bot.send_telegram(f"💥 **КРИТИЧЕСКАЯ ОШИБКА БОТА**\n\n❌ {str(e)[:300]}\n\n🔄 Попытка перезапуска...")
         except:
             pass
+    finally:
+        await bot.mexc.close()
 
 if __name__ == "__main__":
     # Для Railway важно правильно обрабатывать сигналы
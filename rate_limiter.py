@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Менеджер лимитов запросов MEXC
+Отдельные token bucket для публичных данных, приватного аккаунта и выставления ордеров,
+веса эндпоинтов MEXC, приоритет ордеров над отчетами и адаптация к ответам 429/418
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше - важнее
+PRIORITY_ORDER = 0      # выставление/отмена ордеров
+PRIORITY_TRADING = 1    # данные для торгового цикла
+PRIORITY_REPORT = 2     # отчеты о балансе, статистика
+
+PUBLIC = 'public'
+PRIVATE = 'private'
+ORDER = 'order'
+
+# Вес вызовов ccxt по правилам MEXC spot v3: метод -> (класс эндпоинта, вес)
+ENDPOINT_WEIGHTS: Dict[str, Tuple[str, int]] = {
+    'load_markets': (PUBLIC, 10),           # exchangeInfo
+    'fetch_markets': (PUBLIC, 10),
+    'fetch_status': (PUBLIC, 1),            # ping
+    'fetch_time': (PUBLIC, 1),
+    'fetch_ticker': (PUBLIC, 1),            # ticker/24hr с symbol
+    'fetch_tickers': (PUBLIC, 40),          # ticker/24hr без symbol
+    'fetch_bids_asks': (PUBLIC, 2),         # ticker/bookTicker
+    'fetch_order_book': (PUBLIC, 1),        # depth
+    'fetch_trades': (PUBLIC, 5),
+    'fetch_ohlcv': (PUBLIC, 1),
+    'fetch_balance': (PRIVATE, 10),         # account
+    'fetch_order': (PRIVATE, 2),
+    'fetch_open_orders': (PRIVATE, 3),
+    'fetch_orders': (PRIVATE, 10),
+    'fetch_my_trades': (PRIVATE, 10),
+    'create_order': (ORDER, 1),
+    'create_market_buy_order': (ORDER, 1),
+    'create_market_sell_order': (ORDER, 1),
+    'create_limit_buy_order': (ORDER, 1),
+    'create_limit_sell_order': (ORDER, 1),
+    'cancel_order': (ORDER, 1),
+    'cancel_all_orders': (ORDER, 1),
+}
+
+# Лимиты по умолчанию: (токенов, за секунд)
+DEFAULT_LIMITS = {
+    PUBLIC: (500, 10.0),    # IP лимит 500 веса за 10 секунд
+    PRIVATE: (500, 10.0),   # UID лимит 500 веса за 10 секунд
+    ORDER: (5, 1.0),        # выставление ордеров
+}
+
+_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('rate_limit_priority', default=None)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    """Приоритет всех запросов внутри блока (наследуется созданными задачами)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def reporting_priority():
+    """Запросы для отчетов уступают торговым"""
+    return request_priority(PRIORITY_REPORT)
+
+
+def _error_kind(error: Exception) -> Optional[str]:
+    """
+    429 -> RateLimitExceeded, 418 -> DDoSProtection (иерархия ccxt.base.errors).
+    Проверяем по именам классов, чтобы не тянуть ccxt в модуль.
+    """
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if 'RateLimitExceeded' in names:
+        return 'RateLimitExceeded'
+    if 'DDoSProtection' in names:
+        return 'DDoSProtection'
+    return None
+
+
+def _parse_limit(value: str, default: Tuple[int, float]) -> Tuple[int, float]:
+    try:
+        tokens, seconds = value.split('/')
+        return int(tokens), float(seconds)
+    except Exception:
+        return default
+
+
+class TokenBucket:
+    """Token bucket с очередью ожидающих по приоритету"""
+
+    def __init__(self, name: str, capacity: int, period: float, min_rate_fraction: float = 0.1,
+                 recover_after: float = 30.0):
+        self.name = name
+        self.capacity = float(capacity)
+        self.base_rate = capacity / period
+        self.rate = self.base_rate
+        self.min_rate = self.base_rate * min_rate_fraction
+        self.recover_after = recover_after
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_penalty = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        # Постепенно возвращаем скорость после штрафа
+        if self.rate < self.base_rate and now - self.last_penalty >= self.recover_after:
+            self.rate = min(self.base_rate, self.rate * 1.5)
+            self.last_penalty = now
+        if now > self.paused_until:
+            start = max(self.updated, self.paused_until)
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = now
+        return now
+
+    def _wait_time(self, weight: float) -> float:
+        now = time.monotonic()
+        pause = max(0.0, self.paused_until - now)
+        return pause + max(0.0, weight - self.tokens) / self.rate
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def utilization(self) -> float:
+        """Доля израсходованной емкости (1.0 - корзина пуста)"""
+        self._refill()
+        return 1.0 - self.tokens / self.capacity
+
+    async def acquire(self, weight: float = 1, priority: int = PRIORITY_TRADING):
+        weight = min(float(weight), self.capacity)
+        cond = self._condition()
+        entry = (priority, next(self._seq))
+        async with cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = self._refill()
+                    is_first = self._waiters[0] == entry
+                    if is_first and now >= self.paused_until and self.tokens >= weight:
+                        heapq.heappop(self._waiters)
+                        self.tokens -= weight
+                        cond.notify_all()
+                        return
+                    timeout = self._wait_time(weight) if is_first else None
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    cond.notify_all()
+                raise
+
+    def penalize(self, pause: float):
+        """Ответ 429/418: снижаем скорость вдвое, обнуляем корзину и делаем паузу"""
+        now = time.monotonic()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        self.updated = now
+        self.last_penalty = now
+        self.paused_until = max(self.paused_until, now + pause)
+
+
+class RateLimitManager:
+    """Общие для всех корутин лимиты по классам эндпоинтов"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, float]]] = None):
+        limits = limits or {
+            PUBLIC: _parse_limit(os.getenv('RATE_LIMIT_PUBLIC', ''), DEFAULT_LIMITS[PUBLIC]),
+            PRIVATE: _parse_limit(os.getenv('RATE_LIMIT_PRIVATE', ''), DEFAULT_LIMITS[PRIVATE]),
+            ORDER: _parse_limit(os.getenv('RATE_LIMIT_ORDER', ''), DEFAULT_LIMITS[ORDER]),
+        }
+        self.buckets = {name: TokenBucket(name, capacity, period) for name, (capacity, period) in limits.items()}
+        self.hits = {name: 0 for name in self.buckets}
+
+    @staticmethod
+    def classify(method: str) -> Tuple[str, int]:
+        if method in ENDPOINT_WEIGHTS:
+            return ENDPOINT_WEIGHTS[method]
+        if method.startswith(('create_', 'cancel_', 'edit_')):
+            return ORDER, 1
+        if method.startswith('fetch_') and ('order' in method or 'trade' in method or 'balance' in method):
+            return PRIVATE, 5
+        return PUBLIC, 1
+
+    async def acquire(self, endpoint: str, weight: float = 1, priority: Optional[int] = None):
+        if priority is None:
+            priority = _priority.get()
+        if priority is None:
+            priority = PRIORITY_ORDER if endpoint == ORDER else PRIORITY_TRADING
+        await self.buckets[endpoint].acquire(weight, priority)
+
+    def record_error(self, endpoint: str, error: Exception, retry_after: Optional[float] = None):
+        """Учет ответов биржи о превышении лимитов"""
+        kind = _error_kind(error)
+        if kind == 'RateLimitExceeded':
+            pause = retry_after if retry_after is not None else 1.0
+        elif kind == 'DDoSProtection':
+            # 418 - IP заблокирован, ждем дольше
+            pause = retry_after if retry_after is not None else 60.0
+        else:
+            return
+        self.hits[endpoint] += 1
+        self.buckets[endpoint].penalize(pause)
+        logger.warning("🚦 Лимит %s превышен (%s), скорость снижена до %.1f/с, пауза %.0fс",
+                       endpoint, kind, self.buckets[endpoint].rate, pause)
+
+    def is_saturated(self, endpoint: str = PUBLIC, threshold: float = 0.8) -> bool:
+        """Корзина почти пуста или есть очередь ожидающих"""
+        bucket = self.buckets[endpoint]
+        return bucket.queued > 0 or bucket.utilization() >= threshold
+
+    async def call(self, exchange, method: str, *args, **kwargs):
+        endpoint, weight = self.classify(method)
+        await self.acquire(endpoint, weight)
+        try:
+            return await getattr(exchange, method)(*args, **kwargs)
+        except Exception as e:
+            self.record_error(endpoint, e)
+            raise
+
+
+class RateLimitedExchange:
+    """
+    Обертка над ccxt клиентом: каждый сетевой вызов сначала получает токены
+    из общего менеджера. Остальные атрибуты (markets, amount_to_precision, ...) проксируются.
+    """
+
+    def __init__(self, exchange, limiter: 'RateLimitManager'):
+        self._exchange = exchange
+        self._limiter = limiter
+
+    @property
+    def raw(self):
+        return self._exchange
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if name.startswith(('fetch_', 'create_', 'cancel_', 'edit_', 'load_markets')) and callable(attr):
+            async def limited(*args, **kwargs):
+                return await self._limiter.call(self._exchange, name, *args, **kwargs)
+            return limited
+        return attr
+
+
+_manager: Optional[RateLimitManager] = None
+
+
+def get_rate_limiter() -> RateLimitManager:
+    """Общий менеджер лимитов процесса"""
+    global _manager
+    if _manager is None:
+        _manager = RateLimitManager()
+    return _manager
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Быстрая перепроверка треугольника перед первой ногой
+Пересчет прибыли по самому свежему стакану (проход по уровням глубины) без сетевых вызовов.
+Треугольники и циклы из N ног считаются одинаково - по сторонам ног.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+Levels = Sequence[Tuple[float, float]]  # [(цена, объем)]
+
+# Комиссия трех сделок, как в сканере (3 x 0.2%)
+TRIANGLE_FEE_RATE = 0.006
+
+ABORT_STALE = 'stale'
+ABORT_DEPTH = 'depth'
+ABORT_EDGE = 'edge'
+
+
+@dataclass
+class RevalidationResult:
+    """Итог перепроверки"""
+    ok: bool
+    net_profit_percent: float
+    final_amount: float
+    reason: Optional[str] = None  # причина отказа: stale / depth / edge
+    elapsed_us: float = 0.0
+
+
+def spend_on_asks(asks: Levels, quote_amount: float) -> Optional[float]:
+    """Купить base на quote_amount, проходя по ask; None - глубины не хватило"""
+    remaining = quote_amount
+    bought = 0.0
+    for price, size in asks:
+        if price <= 0:
+            continue
+        cost = price * size
+        if cost >= remaining:
+            return bought + remaining / price
+        bought += size
+        remaining -= cost
+    return None
+
+
+def sell_on_bids(bids: Levels, base_amount: float) -> Optional[float]:
+    """Продать base_amount по bid; None - глубины не хватило"""
+    remaining = base_amount
+    received = 0.0
+    for price, size in bids:
+        if price <= 0:
+            continue
+        if size >= remaining:
+            return received + remaining * price
+        received += size * price
+        remaining -= size
+    return None
+
+
+def simulate_cycle(books: Sequence[Tuple[Levels, Levels]], sides: Sequence[str], initial_amount: float) -> Optional[float]:
+    """
+    Итоговая сумма в стартовой валюте после всех ног по стаканам.
+    books - [(bids, asks)] по ногам, sides - buy (тратим quote по ask) / sell (продаем base по bid).
+    """
+    amount = initial_amount
+    for (bids, asks), side in zip(books, sides):
+        amount = spend_on_asks(asks, amount) if side == 'buy' else sell_on_bids(bids, amount)
+        if amount is None:
+            return None
+    return amount
+
+
+def simulate_triangle(books: Sequence[Tuple[Levels, Levels]], direct: bool, initial_amount: float) -> Optional[float]:
+    """
+    Итоговая сумма в базовой валюте после трех ног по стаканам.
+    books - [(bids, asks)] для pair1, pair2, pair3; во второй ноге direct продает crypto1,
+    reverse покупает crypto2.
+    """
+    return simulate_cycle(books, ('buy', 'sell' if direct else 'buy', 'sell'), initial_amount)
+
+
+def revalidate(books: Sequence[Tuple[Levels, Levels]], book_ages_ms: Sequence[float], direct: bool,
+               initial_amount: float, min_profit_percent: float, max_age_ms: float = 0.0,
+               fee_rate: float = TRIANGLE_FEE_RATE, sides: Optional[Sequence[str]] = None) -> RevalidationResult:
+    """
+    Пересчитать прибыль треугольника по стаканам и решить, исполнять ли его.
+    sides задает стороны ног цикла из N ног (тогда direct не используется).
+    """
+    start = time.perf_counter()
+
+    def result(ok, net_percent=0.0, final=0.0, reason=None):
+        return RevalidationResult(ok, net_percent, final, reason, (time.perf_counter() - start) * 1e6)
+
+    if max_age_ms > 0 and max(book_ages_ms) > max_age_ms:
+        return result(False, reason=ABORT_STALE)
+
+    if sides is not None:
+        final_amount = simulate_cycle(books, sides, initial_amount)
+    else:
+        final_amount = simulate_triangle(books, direct, initial_amount)
+    if final_amount is None:
+        return result(False, reason=ABORT_DEPTH)
+
+    net_profit = final_amount - initial_amount - initial_amount * fee_rate
+    net_percent = net_profit / initial_amount * 100
+    if net_percent < min_profit_percent:
+        return result(False, net_percent, final_amount, ABORT_EDGE)
+    return result(True, net_percent, final_amount)
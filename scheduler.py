@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Приоритетное расписание треугольников по истории
+Для каждого треугольника копится, как часто он пересекал порог прибыли и сколько реально
+принес. При ограниченном бюджете (только REST, лимит запросов почти исчерпан) сканируются
+лучшие по UCB треугольники и те, что слишком долго не проверялись, - остальные ждут.
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TriangleStats:
+    """Дисконтированная статистика одного треугольника"""
+
+    __slots__ = ('scans', 'hits', 'reward', 'trades', 'realized', 'last_scan')
+
+    def __init__(self, scans: float = 0.0, hits: float = 0.0, reward: float = 0.0,
+                 trades: int = 0, realized: float = 0.0, last_scan: int = -1):
+        self.scans = scans          # сколько раз оценен (с затуханием)
+        self.hits = hits            # сколько раз был выше порога (с затуханием)
+        self.reward = reward        # сумма прибыли в % при пересечениях с поправкой на факт
+        self.trades = trades
+        self.realized = realized    # сумма фактической прибыли сделок в %
+        self.last_scan = last_scan  # номер скана последней оценки
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.scans if self.scans else 0.0
+
+    @property
+    def mean_reward(self) -> float:
+        return self.reward / self.scans if self.scans else 0.0
+
+
+class TriangleScheduler:
+    """
+    Бандит UCB1 поверх списка треугольников.
+    Награда скана - чистая прибыль в % при пересечении порога (0 - не пересек); после сделки
+    ожидаемая прибыль заменяется фактической, поэтому треугольники с фантомной прибылью
+    теряют приоритет. Затухание decay позволяет забывать старые режимы рынка.
+    """
+
+    def __init__(self, budget: int = 50, max_skip: int = 20, exploration: float = 0.5,
+                 decay: float = 0.995, path: Optional[str] = None):
+        self.budget = budget
+        self.max_skip = max_skip
+        self.exploration = exploration
+        self.decay = decay
+        self.path = path if path is not None else os.getenv('TRIANGLE_SCHEDULER_PATH', 'triangle_scheduler.json')
+        self.stats: Dict[Hashable, TriangleStats] = {}
+        self.scan = 0
+        self.total_scans = 0.0
+
+    def score(self, key: Hashable) -> float:
+        """Верхняя доверительная граница награды; неоцененные - первыми"""
+        stats = self.stats.get(key)
+        if stats is None or stats.scans <= 0:
+            return math.inf
+        bonus = self.exploration * math.sqrt(math.log(max(self.total_scans, 1.0) + 1) / stats.scans)
+        return stats.mean_reward + bonus
+
+    def is_overdue(self, key: Hashable) -> bool:
+        stats = self.stats.get(key)
+        return stats is None or self.scan - stats.last_scan >= self.max_skip
+
+    def pick(self, entries: Sequence, key=lambda entry: entry.triangle) -> List:
+        """
+        Треугольники для ограниченного скана: budget лучших по UCB и все просроченные.
+        Порядок исходного списка сохраняется.
+        """
+        if self.budget <= 0 or len(entries) <= self.budget:
+            return list(entries)
+        keys = [key(entry) for entry in entries]
+        ranked = sorted(range(len(entries)), key=lambda i: self.score(keys[i]), reverse=True)
+        chosen = set(ranked[:self.budget])
+        chosen.update(i for i in ranked[self.budget:] if self.is_overdue(keys[i]))
+        return [entries[i] for i in sorted(chosen)]
+
+    def record_scan(self, keys: Iterable[Hashable], hits: Mapping[Hashable, float]):
+        """Учесть оценку треугольников; hits - чистая прибыль в % у пересекших порог"""
+        self.scan += 1
+        decay = self.decay
+        scanned = 0
+        for key in keys:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = TriangleStats()
+            stats.scans = stats.scans * decay + 1
+            stats.hits *= decay
+            stats.reward *= decay
+            profit = hits.get(key)
+            if profit is not None:
+                stats.hits += 1
+                stats.reward += max(profit, 0.0)
+            stats.last_scan = self.scan
+            scanned += 1
+        self.total_scans = self.total_scans * decay + scanned
+
+    def record_trade(self, key: Hashable, expected_percent: float, realized_percent: float):
+        """Заменить ожидаемую прибыль пересечения фактической"""
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = TriangleStats()
+        stats.trades += 1
+        stats.realized += realized_percent
+        stats.reward += realized_percent - max(expected_percent, 0.0)
+
+    def top(self, limit: int = 5) -> List[Tuple[Hashable, TriangleStats]]:
+        """Треугольники с наибольшей средней наградой"""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].mean_reward, reverse=True)
+        return [(key, stats) for key, stats in ranked[:limit] if stats.hits > 0]
+
+    def save(self):
+        """Сохранить статистику: после рестарта приоритеты не обучаются заново"""
+        if not self.path:
+            return
+        state = {
+            'scan': self.scan,
+            'total_scans': self.total_scans,
+            'triangles': [
+                {'key': list(key), 'scans': s.scans, 'hits': s.hits, 'reward': s.reward,
+                 'trades': s.trades, 'realized': s.realized, 'last_scan': s.last_scan}
+                for key, s in self.stats.items()
+            ],
+        }
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("⚠️ Не удалось сохранить статистику расписания: %s", e)
+
+    def load(self) -> int:
+        """Восстановить статистику; возвращает число треугольников"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.scan = int(state.get('scan', 0))
+            self.total_scans = float(state.get('total_scans', 0.0))
+            for entry in state.get('triangles', []):
+                self.stats[tuple(entry['key'])] = TriangleStats(
+                    entry['scans'], entry['hits'], entry['reward'],
+                    entry.get('trades', 0), entry.get('realized', 0.0), entry.get('last_scan', -1))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("⚠️ Статистика расписания не загружена: %s", e)
+            return 0
+        return len(self.stats)
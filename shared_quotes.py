@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Котировки из процессов-воркеров через общую память
+Подписки на стаканы MEXC шардируются по символу между процессами: разбор JSON из WebSocket
+идет в воркерах (каждый раскладывает свои символы по соединениям WsSupervisor), а лучшие цены пишутся в таблицу multiprocessing.shared_memory.
+Сканер читает колонки таблицы напрямую, без копирования, как обычный QuoteStore.
+
+Каждую строку пишет ровно один процесс (seqlock): счетчик версии нечетный, пока идет запись,
+и увеличивается еще раз после нее. Читатель, которому нужна согласованная котировка целиком,
+повторяет чтение, пока версия до и после совпадает и четная.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from quote_store import QuoteStore
+from ws_supervisor import WsSupervisor, mexc_exchange
+
+logger = logging.getLogger(__name__)
+
+# Колонки таблицы после счетчика версий; порядок совпадает с QuoteStore.read()
+COLUMNS = ('bid', 'ask', 'bid_size', 'ask_size', 'timestamp', 'received')
+
+# Попыток согласованного чтения, пока строку переписывает воркер
+READ_RETRIES = 100
+
+
+class SharedQuoteTable(QuoteStore):
+    """
+    QuoteStore фиксированной емкости в общей памяти.
+    Id символов выдает только процесс сканера; воркеры получают готовые (символ, id).
+    Символы из owned пишут воркеры - запись из процесса сканера (REST тикеры,
+    локальный BookFeed) для них пропускается, чтобы у строки был один писатель.
+    """
+
+    __slots__ = ('capacity', 'seq', 'owned', '_shm', '_owner')
+
+    def __init__(self, capacity: int = 4096, name: Optional[str] = None, symbols: Iterable[str] = ()):
+        create = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=capacity * 8 * (len(COLUMNS) + 1))
+        self._owner = create
+        self.capacity = capacity
+        buf = self._shm.buf
+        self.seq = buf[:capacity * 8].cast('q')
+        for n, column in enumerate(COLUMNS, 1):
+            setattr(self, column, buf[n * capacity * 8:(n + 1) * capacity * 8].cast('d'))
+        self.ids: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.owned = set()
+        for symbol in symbols:
+            self.symbol_id(symbol)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> 'SharedQuoteTable':
+        """Подключиться к таблице, созданной процессом сканера"""
+        return cls(capacity, name)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def symbol_id(self, symbol: str) -> int:
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            if len(self.symbols) >= self.capacity:
+                raise ValueError(f"Таблица котировок заполнена ({self.capacity} символов), увеличьте QUOTE_TABLE_CAPACITY")
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def update_from_tickers(self, tickers: Mapping[str, Mapping], received: Optional[float] = None) -> int:
+        """Как у QuoteStore; новые символы сверх емкости пропускаются с предупреждением"""
+        room = self.capacity - len(self.symbols)
+        new = [symbol for symbol in tickers if symbol not in self.ids]
+        if len(new) > room:
+            skipped = set(new[max(room, 0):])
+            logger.warning("⚠️ Таблица котировок заполнена (%d символов): пропущено %d тикеров, "
+                           "увеличьте QUOTE_TABLE_CAPACITY", self.capacity, len(skipped))
+            tickers = {symbol: ticker for symbol, ticker in tickers.items() if symbol not in skipped}
+        return super().update_from_tickers(tickers, received)
+
+    def reset_seq(self, symbol_id: int):
+        """
+        Вернуть версии строки четность: прежний писатель мог умереть между двумя инкрементами,
+        и с нечетным счетчиком читатели путали бы идущую запись с законченной
+        """
+        self.seq[symbol_id] += self.seq[symbol_id] & 1
+
+    def register(self, symbol: str, symbol_id: int):
+        """Принять id символа, выданный процессом сканера (на стороне воркера)"""
+        self.reset_seq(symbol_id)
+        self.ids[symbol] = symbol_id
+        if len(self.symbols) <= symbol_id:
+            self.symbols.extend([''] * (symbol_id + 1 - len(self.symbols)))
+        self.symbols[symbol_id] = symbol
+
+    def update(self, symbol: str, bid: Optional[float], ask: Optional[float],
+               bid_size: Optional[float] = None, ask_size: Optional[float] = None,
+               timestamp: Optional[float] = None, received: Optional[float] = None) -> int:
+        i = self.symbol_id(symbol)
+        if symbol in self.owned:
+            return i  # строку пишет воркер
+        seq = self.seq
+        seq[i] += 1
+        super().update(symbol, bid, ask, bid_size, ask_size, timestamp, received)
+        seq[i] += 1
+        return i
+
+    def mark_stale(self, symbols: Iterable[str]) -> int:
+        marked = 0
+        seq = self.seq
+        for symbol in symbols:
+            i = self.ids.get(symbol)
+            if i is None or symbol in self.owned:
+                continue
+            seq[i] += 1
+            self.received[i] = 0.0
+            self.timestamp[i] = 0.0
+            seq[i] += 1
+            marked += 1
+        return marked
+
+    def read(self, i: int) -> Tuple[float, float, float, float, float, float]:
+        """Согласованная котировка: повторяем, пока строку не перестанут переписывать"""
+        seq = self.seq
+        quote = super().read(i)
+        for _ in range(READ_RETRIES):
+            before = seq[i]
+            if before & 1:
+                continue
+            quote = super().read(i)
+            if seq[i] == before:
+                return quote
+        # Воркер умер посреди записи - отдаем последнее прочитанное
+        return quote
+
+    def close(self):
+        """Освободить отображение; создатель таблицы удаляет сегмент"""
+        for view in (self.seq,) + tuple(getattr(self, column) for column in COLUMNS):
+            view.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def shard_of(symbol: str, workers: int) -> int:
+    """Номер воркера символа; crc32 стабилен между запусками в отличие от hash()"""
+    return zlib.crc32(symbol.encode()) % workers
+
+
+def run_quote_worker(name: str, capacity: int, commands, depth: int = 10,
+                     exchange_factory: Callable = mexc_exchange):
+    """Точка входа процесса-воркера"""
+    asyncio.run(_worker_main(name, capacity, commands, depth, exchange_factory))
+
+
+async def _worker_main(name: str, capacity: int, commands, depth: int, exchange_factory: Callable):
+    table = SharedQuoteTable.attach(name, capacity)
+    # Внутри воркера символы тоже делятся по соединениям с надзором за молчащими
+    feed = WsSupervisor(exchange_factory, table, depth)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            command, payload = await loop.run_in_executor(None, commands.get)
+            if command == 'watch':
+                for symbol, symbol_id in payload:
+                    table.register(symbol, symbol_id)
+                feed.watch(symbol for symbol, _symbol_id in payload)
+            elif command == 'unwatch':
+                feed.unwatch(payload)
+            elif command == 'stop':
+                break
+    finally:
+        await feed.stop()
+        table.close()
+
+
+class SharedQuoteFeed:
+    """
+    Процессы-воркеры со стаканами, шардированными по символу.
+    Упавший воркер перезапускается в ensure_running() и заново подписывается на свой шард.
+    """
+
+    def __init__(self, table: SharedQuoteTable, workers: int = 2, depth: int = 10,
+                 exchange_factory: Callable = mexc_exchange):
+        self.table = table
+        self.workers = workers
+        self.depth = depth
+        self.exchange_factory = exchange_factory
+        self.watched: Dict[str, int] = {}  # символ -> воркер
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._queues = [self._context.Queue() for _ in range(workers)]
+
+    def _spawn(self, shard: int):
+        process = self._context.Process(
+            target=run_quote_worker,
+            args=(self.table.name, self.table.capacity, self._queues[shard], self.depth, self.exchange_factory),
+            name=f'quotes-{shard}',
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard] = process
+
+    def start(self):
+        for shard in range(self.workers):
+            self._spawn(shard)
+        logger.info("🧵 Запущено %d процессов котировок, таблица %s на %d символов",
+                    self.workers, self.table.name, self.table.capacity)
+
+    def alive(self) -> int:
+        return sum(1 for process in self._processes if process is not None and process.is_alive())
+
+    def watch(self, symbols: Iterable[str]) -> int:
+        """Подписать новые символы; возвращает число добавленных"""
+        by_shard: Dict[int, List[Tuple[str, int]]] = {}
+        skipped = 0
+        for symbol in symbols:
+            if symbol in self.watched:
+                continue
+            try:
+                symbol_id = self.table.symbol_id(symbol)
+            except ValueError:
+                skipped += 1
+                continue
+            shard = shard_of(symbol, self.workers)
+            self.watched[symbol] = shard
+            by_shard.setdefault(shard, []).append((symbol, symbol_id))
+            self.table.owned.add(symbol)
+        if skipped:
+            logger.warning("⚠️ Таблица котировок заполнена (%d символов): %d символов не подписано, "
+                           "увеличьте QUOTE_TABLE_CAPACITY", self.table.capacity, skipped)
+        for shard, pairs in by_shard.items():
+            self._queues[shard].put(('watch', pairs))
+        return sum(len(pairs) for pairs in by_shard.values())
+
+    def unwatch(self, symbols: Iterable[str]):
+        by_shard: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            shard = self.watched.pop(symbol, None)
+            if shard is None:
+                continue
+            by_shard.setdefault(shard, []).append(symbol)
+            self.table.owned.discard(symbol)
+        for shard, shard_symbols in by_shard.items():
+            self._queues[shard].put(('unwatch', shard_symbols))
+
+    def ensure_running(self) -> int:
+        """Перезапустить упавшие воркеры; возвращает число перезапущенных"""
+        restarted = 0
+        for shard, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            logger.warning("⚠️ Процесс котировок %d завершился (код %s), перезапуск", shard, process.exitcode)
+            # Очередь могла остаться с недочитанными командами - начинаем с чистой
+            self._queues[shard] = self._context.Queue()
+            self._spawn(shard)
+            pairs = [(symbol, self.table.ids[symbol]) for symbol, owner in self.watched.items() if owner == shard]
+            for _symbol, symbol_id in pairs:
+                self.table.reset_seq(symbol_id)
+            if pairs:
+                self._queues[shard].put(('watch', pairs))
+            restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def stop(self, timeout: float = 5.0):
+        """Остановить воркеры (блокирующий вызов - из asyncio через to_thread)"""
+        for shard, process in enumerate(self._processes):
+            if process is not None and process.is_alive():
+                self._queues[shard].put(('stop', None))
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(1.0)
+        self._processes = [None] * self.workers
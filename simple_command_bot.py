@@ -13,6 +13,10 @@ from datetime import datetime
 from telegram import Update
 from telegram.ext import Application, MessageHandler, ContextTypes, filters, CommandHandler
 
+from latency import format_latency_summary
+from opportunity_analytics import format_lifetime_summary
+from slippage import format_slippage_summary
+
 # Загружаем переменные окружения
 try:
     from dotenv import load_dotenv
@@ -201,6 +205,13 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(text, parse_mode='Markdown')
 
+def markdown_block(text: str) -> str:
+    """
+    Моноширинный блок для parse_mode='Markdown': внутри него подчеркивания в именах
+    интервалов (md_to_scan, leg1_ack) не читаются как курсив и не ломают разбор сообщения
+    """
+    return "```\n" + text.replace('`', "'") + "\n```"
+
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /stats"""
     uptime = "Система управления"
@@ -215,6 +226,12 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if settings['total_trades'] > 0:
         success_rate = (settings['successful_trades'] / settings['total_trades']) * 100
     
+    # Задержки пишет работающий арбитраж - читаем свежие из файла
+    current = load_settings()
+    latency = current.get('latency', {})
+    lifetimes = current.get('opportunity_lifetimes', {})
+    slippage = current.get('slippage', {})
+    
     text = f"""
 📈 **СТАТИСТИКА ТРЕУГОЛЬНОГО АРБИТРАЖА**
 
@@ -227,6 +244,15 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Процент успеха: {success_rate:.1f}%
 • Общая прибыль: ${settings['total_profit']:.2f}
 
+⏱️ **Задержки tick-to-trade (p50 / p99 / p99.9):**
+{markdown_block(format_latency_summary(latency))}
+
+⌛ **Жизнь возможностей выше порога:**
+{markdown_block(format_lifetime_summary(lifetimes))}
+
+📉 **Проскальзывание (худшие символы, EWMA):**
+{markdown_block(format_slippage_summary(slippage))}
+
 🔺 **Только треугольные возможности на MEXC**
     """
     
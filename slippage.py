@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Журнал проскальзывания по ногам
+Каждое исполнение сравнивается с ценой, по которой нога была оценена сканером.
+Проскальзывание, комиссия и задержка пишутся в JSONL журнал, а скользящие модели
+по символам отдают ожидаемое проскальзывание, которое сканер вычитает из прибыли.
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LegFill:
+    """Исполнение одной ноги"""
+    path: str
+    leg: int
+    symbol: str
+    side: str  # buy/sell
+    expected_price: float
+    fill_price: float
+    amount: float
+    fee_cost: float
+    fee_currency: str
+    latency_ms: float
+    slippage_bps: float
+    order_id: str = ''
+    timestamp: str = ''
+
+
+def slippage_bps(side: str, expected_price: float, fill_price: float) -> float:
+    """Проскальзывание в б.п.: положительное - исполнение хуже ожидаемого"""
+    if expected_price <= 0 or fill_price <= 0:
+        return 0.0
+    if side == 'buy':
+        return (fill_price - expected_price) / expected_price * 1e4
+    return (expected_price - fill_price) / expected_price * 1e4
+
+
+def order_fee(order: Mapping) -> Tuple[float, str]:
+    """Комиссия из ответа ccxt (fee или список fees)"""
+    fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+    cost = 0.0
+    currency = ''
+    for fee in fees:
+        if not fee:
+            continue
+        cost += fee.get('cost') or 0.0
+        currency = currency or fee.get('currency') or ''
+    return cost, currency
+
+
+class SlippageModel:
+    """Скользящее проскальзывание одного символа и стороны"""
+
+    __slots__ = ('values', 'ewma', 'alpha')
+
+    def __init__(self, window: int = 50, alpha: float = 0.2):
+        self.values: Deque[float] = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.alpha = alpha
+
+    def add(self, value: float):
+        self.values.append(value)
+        self.ewma = value if self.ewma is None else self.alpha * value + (1 - self.alpha) * self.ewma
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def mean(self) -> float:
+        return sum(self.values) / len(self.values) if self.values else 0.0
+
+
+class SlippageLedger:
+    """Журнал исполнений и модели проскальзывания по (символ, сторона)"""
+
+    def __init__(self, path: Optional[str] = None, window: int = 50, min_samples: int = 3):
+        self.path = path if path is not None else os.getenv('SLIPPAGE_LEDGER_PATH', 'slippage_ledger.jsonl')
+        self.window = window
+        self.min_samples = min_samples
+        self.models: Dict[Tuple[str, str], SlippageModel] = {}
+
+    def _model(self, symbol: str, side: str) -> SlippageModel:
+        model = self.models.get((symbol, side))
+        if model is None:
+            model = self.models[(symbol, side)] = SlippageModel(self.window)
+        return model
+
+    def load(self) -> int:
+        """Восстановить модели из журнала после рестарта"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        loaded = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._model(entry['symbol'], entry['side']).add(float(entry['slippage_bps']))
+                    loaded += 1
+                except (ValueError, KeyError):
+                    continue
+        return loaded
+
+    def record_fill(self, path: str, leg: int, symbol: str, side: str, expected_price: float,
+                    order: Mapping, latency_ms: float) -> LegFill:
+        """Записать исполнение ноги по ответу биржи"""
+        fill_price = order.get('average') or order.get('price') or 0.0
+        fee_cost, fee_currency = order_fee(order)
+        fill = LegFill(
+            path=path,
+            leg=leg,
+            symbol=symbol,
+            side=side,
+            expected_price=expected_price,
+            fill_price=fill_price,
+            amount=order.get('filled') or 0.0,
+            fee_cost=fee_cost,
+            fee_currency=fee_currency,
+            latency_ms=round(latency_ms, 3),
+            slippage_bps=round(slippage_bps(side, expected_price, fill_price), 3),
+            order_id=str(order.get('id') or ''),
+            timestamp=datetime.now().isoformat(timespec='seconds'),
+        )
+        self.add(fill)
+        return fill
+
+    def add(self, fill: LegFill):
+        self._model(fill.symbol, fill.side).add(fill.slippage_bps)
+        if self.path:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(fill), ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.warning("⚠️ Не удалось записать журнал проскальзывания: %s", e)
+
+    def expected_bps(self, symbol: str, side: str) -> float:
+        """Ожидаемое проскальзывание (EWMA); улучшение цены не засчитывается"""
+        model = self.models.get((symbol, side))
+        if model is None or model.count < self.min_samples:
+            return 0.0
+        return max(0.0, model.ewma)
+
+    def penalty_percent(self, symbols: Iterable[str], sides: Iterable[str]) -> float:
+        """Суммарное ожидаемое проскальзывание ног в процентах"""
+        if not self.models:
+            return 0.0
+        return sum(self.expected_bps(symbol, side) for symbol, side in zip(symbols, sides)) / 100.0
+
+    def worst(self, limit: int = 5) -> List[Tuple[str, str, float, int]]:
+        """Символы с наибольшим ожидаемым проскальзыванием"""
+        ranked = [(symbol, side, model.ewma, model.count)
+                  for (symbol, side), model in self.models.items() if model.ewma is not None]
+        ranked.sort(key=lambda item: item[2], reverse=True)
+        return ranked[:limit]
+
+    def summary(self, limit: int = 5) -> Dict:
+        """Сводка для файла настроек: худшие символы и средние по ногам"""
+        return {
+            'symbols': len(self.models),
+            'worst': [
+                {'symbol': symbol, 'side': side, 'ewma_bps': round(ewma, 2), 'count': count}
+                for symbol, side, ewma, count in self.worst(limit)
+            ],
+        }
+
+
+def format_slippage_summary(summary: Mapping) -> str:
+    """Текст для Telegram и логов"""
+    if not summary or not summary.get('worst'):
+        return "нет данных"
+    lines = [f"Символов с исполнениями: {summary.get('symbols', 0)}"]
+    for entry in summary['worst']:
+        lines.append(f"• {entry['side'].upper()} {entry['symbol']}: {entry['ewma_bps']:+.1f} б.п. (n={entry['count']})")
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Тест планировщика конвертации в базовую валюту
+"""
+
+import asyncio
+
+from conversion import conversion_symbols, execute_conversions, plan_conversions
+
+MARKETS = {
+    'BTC/USDT': {'limits': {'amount': {'min': 0.00001}, 'cost': {'min': 5.0}}},
+    'ETH/USDT': {'limits': {'amount': {'min': 0.0001}, 'cost': {'min': 5.0}}},
+    'USDT/BRL': {'limits': {'amount': {'min': 1.0}, 'cost': {'min': 5.0}}},
+}
+
+TICKERS = {
+    'BTC/USDT': {'bid': 60000.0, 'ask': 60010.0},
+    'ETH/USDT': {'bid': 3000.0, 'ask': 3001.0},
+    'USDT/BRL': {'bid': 5.0, 'ask': 5.1},
+}
+
+
+class FakeExchange:
+    """Биржа-заглушка с задержкой исполнения"""
+
+    def __init__(self, tickers):
+        self.tickers = tickers
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.orders = []
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{amount:.8f}"
+
+    async def _order(self, symbol, side, amount):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.orders.append((symbol, side, amount))
+        price = self.tickers[symbol]['bid' if side == 'sell' else 'ask']
+        return {'status': 'closed', 'filled': amount, 'average': price}
+
+    async def create_market_sell_order(self, symbol, amount):
+        return await self._order(symbol, 'sell', amount)
+
+    async def create_market_buy_order(self, symbol, amount):
+        return await self._order(symbol, 'buy', amount)
+
+
+def test_plan_filters_dust():
+    """Тест отсева пыли и выбора направления"""
+    balances = {'USDT': 20.0, 'BTC': 0.001, 'ETH': 0.001, 'BRL': 100.0, 'XYZ': 5.0}
+    symbols = conversion_symbols(balances, MARKETS, 'USDT')
+    assert set(symbols) == {'BTC/USDT', 'ETH/USDT', 'USDT/BRL'}
+
+    plan, dust = plan_conversions(balances, TICKERS, MARKETS, 'USDT')
+    by_currency = {o.currency: o for o in plan}
+
+    assert by_currency['BTC'].side == 'sell'
+    assert abs(by_currency['BTC'].expected - 60.0) < 1e-9
+    assert by_currency['BRL'].side == 'buy'
+    assert abs(by_currency['BRL'].amount - 100.0 / 5.1) < 1e-9
+    # ETH на 3 USDT ниже минимального объема 5 USDT
+    assert dust == ['ETH']
+    assert 'XYZ' not in by_currency
+    print("✅ План конвертации построен, пыль отсеяна")
+
+
+def test_execute_runs_concurrently():
+    """Тест параллельной отправки с ограничением конкурентности"""
+    balances = {f'C{i}': 1.0 for i in range(6)}
+    markets = {f'C{i}/USDT': {'limits': {}} for i in range(6)}
+    tickers = {f'C{i}/USDT': {'bid': 10.0, 'ask': 10.1} for i in range(6)}
+
+    plan, dust = plan_conversions(balances, tickers, markets, 'USDT')
+    exchange = FakeExchange(tickers)
+    results = asyncio.run(execute_conversions(exchange, plan, max_concurrency=3))
+
+    assert not dust
+    assert len(results) == 6
+    assert all(r.success for r in results)
+    assert abs(sum(r.converted for r in results) - 60.0) < 1e-9
+    assert exchange.max_in_flight == 3
+    print("✅ Ордера отправлены параллельно (не более 3 одновременно)")
+
+
+if __name__ == "__main__":
+    print("💱 ТЕСТ КОНВЕРТАЦИИ")
+    print("=" * 40)
+    test_plan_filters_dust()
+    test_execute_runs_concurrently()
+    print("🔺 Тест завершен")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест поиска циклов из 4-5 ног
+"""
+
+from array import array
+
+from cycles import CycleSearch, build_currency_graph, cycle_key, cycle_path
+from opportunity_analytics import cycle_depth
+from quote_store import QuoteStore, compile_cycles
+from revalidation import simulate_cycle, simulate_triangle
+
+QUOTES = {
+    'BTC/USDT': (60000.0, 60001.0),
+    'ETH/USDT': (3000.0, 3000.5),
+    'ETH/BTC': (0.05, 0.05001),
+    'USDC/USDT': (1.0, 1.0001),
+    'BTC/USDC': (61000.0, 61001.0),   # BTC дороже в USDC - петля через стейблкоин
+    'ETH/USDC': (3000.0, 3000.3),
+    'SOL/USDT': (150.0, 150.02),
+    'SOL/BTC': (0.0025, 0.0025001),
+    'SOL/USDC': (150.0, 150.02),
+    'DOGE/USDT': (0.1, 0.2),          # широкий спред - ветки через DOGE отсекаются
+    'DOGE/USDC': (0.1, 0.2),
+    'DOGE/BTC': (0.000001, 0.000002),
+}
+
+
+def make_store():
+    store = QuoteStore()
+    for symbol, (bid, ask) in QUOTES.items():
+        store.update(symbol, bid, ask, 10.0, 10.0)
+    return store
+
+
+def test_cycle_search_and_pruning():
+    """Петля USDT -> BTC -> USDC -> ... находится, ветки с широким спредом отсекаются"""
+    store = make_store()
+    graph = build_currency_graph({symbol: {} for symbol in QUOTES})
+    assert ('BTC', 'BTC/USDT', 'buy') in graph['USDT']
+    assert ('USDT', 'BTC/USDT', 'sell') in graph['BTC']
+
+    search = CycleSearch(max_legs=5, slack_percent=0.5)
+    cycles = search.find(graph, ['USDT'], store.bid, store.ask, store.ids, min_profit_percent=0.3)
+    paths = [cycle_path(cycle) for cycle in cycles]
+    print(paths[:3], search.visited, search.pruned)
+
+    assert paths[0] == "USDT → BTC → USDC → ETH → USDT"
+    assert all(len(cycle) >= 4 for cycle in cycles)
+    assert not any('DOGE' in path for path in paths)
+    assert search.pruned > 0
+
+    # Без отсечения DOGE тоже перебирается, но в кандидаты не попадает
+    unpruned = CycleSearch(max_legs=5, slack_percent=1000.0)
+    unpruned.find(graph, ['USDT'], store.bid, store.ask, store.ids, min_profit_percent=0.3)
+    assert unpruned.visited > search.visited
+    capped = CycleSearch(max_legs=5, max_cycles=2).find(graph, ['USDT'], store.bid, store.ask, store.ids)
+    assert len(capped) == 2
+    print("✅ Циклы находятся, лишние ветки отсекаются")
+
+
+def test_compiled_cycle_scoring():
+    """Скомпилированный цикл считается по тем же массивам, что и треугольники"""
+    store = make_store()
+    cycle = (('BTC/USDT', 'buy'), ('BTC/USDC', 'sell'), ('ETH/USDC', 'buy'), ('ETH/USDT', 'sell'))
+    compiled = compile_cycles([cycle], store)[0]
+    assert compiled.triangle == cycle_key(cycle) == ('BTC/USDT', 'BTC/USDC', 'ETH/USDC', 'ETH/USDT', 'cycle')
+    assert compiled.buys == (True, False, True, False)
+
+    amount = 100.0
+    for i, buy in zip(compiled.legs, compiled.buys):
+        amount = amount / store.ask[i] if buy else amount * store.bid[i]
+    books = [([(store.bid[i], 1e9)], [(store.ask[i], 1e9)]) for i in compiled.legs]
+    assert abs(simulate_cycle(books, compiled.sides, 100.0) - amount) < 1e-9
+    assert amount > 101.5
+
+    # Треугольник - частный случай цикла
+    tri_books = [books[0], ([(0.05, 1e9)], [(0.05001, 1e9)]), ([(3000.0, 1e9)], [(3000.5, 1e9)])]
+    assert simulate_triangle(tri_books, False, 100.0) == simulate_cycle(tri_books, ('buy', 'buy', 'sell'), 100.0)
+
+    bid, ask = array('d', [2.0, 0.5]), array('d', [2.0, 0.5])
+    bid_size, ask_size = array('d', [10.0, 100.0]), array('d', [10.0, 100.0])
+    # Купить 10 X по 2 (20 в старте), продать X за Y: 100 X по цене 0.5 => 200 в старте
+    assert cycle_depth(bid, ask, bid_size, ask_size, (0, 1), (True, False)) == 20.0
+    print("✅ Цикл оценивается как треугольник")
+
+
+if __name__ == "__main__":
+    test_cycle_search_and_pruning()
+    test_compiled_cycle_scoring()
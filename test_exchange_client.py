@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тест общего клиента MEXC без сети: заглушка вместо ccxt и HTTP сессии
+"""
+
+import asyncio
+
+import exchange_client
+from exchange_client import ExchangeClient
+
+
+class StubSession:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class StubExchange:
+    """Клиент ccxt: рынки грузятся с задержкой, чтобы первые вызовы пересеклись"""
+
+    def __init__(self, config):
+        self.config = config
+        self.markets = {}
+        self.load_calls = 0
+        self.closed = False
+
+    async def load_markets(self):
+        self.load_calls += 1
+        await asyncio.sleep(0.01)
+        self.markets = {'BTC/USDT': {}, 'ETH/USDT': {}}
+        return self.markets
+
+    async def fetch_balance(self):
+        return {'USDT': {'free': 100.0, 'used': 0.0, 'total': 100.0}, 'free': {'USDT': 100.0}}
+
+    async def fetch_tickers(self, symbols=None):
+        tickers = {'BTC/USDT': {'bid': 60000.0, 'ask': 60010.0}, 'ETH/USDT': {'bid': 3000.0, 'ask': 3001.0}}
+        return {symbol: tickers[symbol] for symbol in symbols or tickers if symbol in tickers}
+
+    async def close(self):
+        self.closed = True
+
+
+class StubClient(ExchangeClient):
+    """Общий клиент, который создает заглушки и считает их"""
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.created = []
+
+    def _create_session(self):
+        return StubSession()
+
+    def _create_exchange(self, config):
+        exchange = StubExchange(config)
+        self.created.append(exchange)
+        return exchange
+
+
+def test_single_instance():
+    """Повторные вызовы получают тот же клиент, рынки грузятся один раз"""
+    async def scenario():
+        client = StubClient({'timeout': 1000})
+        first = await client.get()
+        second = await client.get()
+        assert first is second and len(client.created) == 1
+        assert client.created[0].load_calls == 1
+        assert client.created[0].config['timeout'] == 1000
+        assert client.created[0].config['session'] is client.session
+        assert len(first.markets) == 2  # атрибуты проксируются через RateLimitedExchange
+
+    asyncio.run(scenario())
+    print("✅ Один клиент на все вызовы")
+
+
+def test_concurrent_first_calls():
+    """Одновременные первые вызовы не создают второй клиент"""
+    async def scenario():
+        client = StubClient()
+        exchanges = await asyncio.gather(*(client.get() for _ in range(10)))
+        assert all(exchange is exchanges[0] for exchange in exchanges)
+        assert len(client.created) == 1 and client.created[0].load_calls == 1
+
+    asyncio.run(scenario())
+    print("✅ Конкурентные вызовы под блокировкой")
+
+
+def test_close_resets_state():
+    """После close следующий вызов создает новый клиент и снова грузит рынки"""
+    async def scenario():
+        client = StubClient()
+        await client.get()
+        stub, session = client.created[0], client.session
+        await client.close()
+        assert stub.closed and session.closed
+        assert client.exchange is None and client.session is None and not client._markets_loaded
+
+        await client.get()
+        assert len(client.created) == 2 and client.created[1].load_calls == 1
+        await client.close()
+
+    asyncio.run(scenario())
+    print("✅ close сбрасывает состояние")
+
+
+def test_railway_bot_reuses_shared_client():
+    """Методы RailwayBot берут общий клиент процесса"""
+    from railway_bot import RailwayBot
+
+    async def scenario():
+        previous = exchange_client._shared_client
+        client = exchange_client._shared_client = StubClient({'apiKey': 'key', 'secret': 'secret'})
+        try:
+            bot = RailwayBot()
+            assert bot.mexc is client
+            assert 'USDT' in await bot.get_mexc_balance()
+            opportunities = await bot.find_opportunities()
+            assert [o.pair for o in opportunities] == ['BTC/USDT', 'ETH/USDT']
+            assert len(client.created) == 1 and client.created[0].load_calls == 1
+            await client.close()
+        finally:
+            exchange_client._shared_client = previous
+
+    asyncio.run(scenario())
+    print("✅ RailwayBot переиспользует общий клиент")
+
+
+if __name__ == "__main__":
+    test_single_instance()
+    test_concurrent_first_calls()
+    test_close_resets_state()
+    test_railway_bot_reuses_shared_client()
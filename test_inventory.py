@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест резервов баланса и выбора треугольников для параллельного исполнения
+"""
+
+import asyncio
+
+from inventory import CONFLICT_BALANCE, CONFLICT_LEG, InventoryLedger, plan_batch
+
+
+def test_balance_reservation():
+    """Два треугольника не тратят один остаток; снятый резерв освобождает баланс"""
+    ledger = InventoryLedger({'USDT': 100.0, 'BTC': 0.01})
+    first = ledger.reserve('USDT → BTC → ETH', {'USDT': 60.0}, ['BTC/USDT', 'ETH/BTC', 'ETH/USDT'])
+    assert first is not None and ledger.available('USDT') == 40.0
+    assert ledger.reserve('USDT → SOL → XRP', {'USDT': 60.0}, ['SOL/USDT', 'XRP/SOL', 'XRP/USDT']) is None
+    assert ledger.last_conflict == CONFLICT_BALANCE
+    # Другая стартовая валюта резервируется независимо
+    assert ledger.reserve('BTC → SOL → ETH', {'BTC': 0.01}, ['SOL/BTC', 'SOL/ETH', 'ETH/BTC']) is None
+    assert ledger.last_conflict == CONFLICT_LEG  # ETH/BTC уже торгуется
+    assert ledger.reserve('BTC → SOL → XRP', {'BTC': 0.01}, ['SOL/BTC', 'XRP/SOL', 'XRP/BTC']) is not None
+
+    ledger.release(first)
+    assert ledger.available('USDT') == 100.0 and 'ETH/BTC' not in ledger.busy_symbols
+    ledger.release(first)  # повторное снятие ничего не ломает
+    assert ledger.available('USDT') == 100.0 and len(ledger) == 1
+    print("✅ Резервы баланса не пересекаются")
+
+
+def test_unknown_balance_checks_legs_only():
+    ledger = InventoryLedger()
+    assert ledger.reserve('a', {'USDT': 1e9}, ['BTC/USDT']) is not None
+    assert ledger.reserve('b', {'USDT': 1e9}, ['BTC/USDT']) is None
+    assert ledger.last_conflict == CONFLICT_LEG
+    print("✅ Без баланса конфликтуют только общие ноги")
+
+
+def test_plan_batch():
+    """Жадно берутся лучшие кандидаты без конфликтов, не больше лимита"""
+    ledger = InventoryLedger({'USDT': 100.0, 'BTC': 1.0})
+    candidates = [
+        ('t1', {'USDT': 50.0}, ['BTC/USDT', 'ETH/BTC', 'ETH/USDT']),
+        ('t2', {'USDT': 50.0}, ['BTC/USDT', 'SOL/BTC', 'SOL/USDT']),   # общая нога с t1
+        ('t3', {'USDT': 50.0}, ['XRP/USDT', 'XRP/ETH', 'ETH/USDT']),   # общая нога с t1
+        ('t4', {'USDT': 50.0}, ['DOGE/USDT', 'DOGE/TRX', 'TRX/USDT']),
+        ('t5', {'USDT': 50.0}, ['ADA/USDT', 'ADA/BNB', 'BNB/USDT']),    # баланса не осталось
+        ('t6', {'BTC': 0.5}, ['LTC/BTC', 'LTC/DOT', 'DOT/BTC']),
+    ]
+    batch, conflicts = plan_batch(ledger, candidates, limit=5)
+    assert [n for n, _reservation in batch] == [0, 3, 5]
+    assert conflicts == {CONFLICT_LEG: 2, CONFLICT_BALANCE: 1}
+    assert ledger.available('USDT') == 0.0
+
+    for _n, reservation in batch:
+        ledger.release(reservation)
+    batch, conflicts = plan_batch(ledger, candidates, limit=1)
+    assert [n for n, _reservation in batch] == [0] and not conflicts
+    print("✅ Пачка без общих ног и в пределах баланса")
+
+
+def test_concurrent_execution_releases():
+    """Параллельные исполнения держат резервы до завершения и снимают их даже при ошибке"""
+    async def scenario():
+        ledger = InventoryLedger({'USDT': 100.0})
+        candidates = [(f't{n}', {'USDT': 40.0}, [f'C{n}/USDT']) for n in range(3)]
+        batch, _conflicts = plan_batch(ledger, candidates, limit=3)
+        assert len(batch) == 2
+        inflight = []
+
+        async def execute(n, reservation):
+            try:
+                inflight.append(len(ledger))
+                await asyncio.sleep(0.01)
+                if n == 1:
+                    raise RuntimeError("нога не исполнена")
+            finally:
+                ledger.release(reservation)
+
+        await asyncio.gather(*(execute(n, r) for n, r in batch), return_exceptions=True)
+        assert inflight == [2, 2] and len(ledger) == 0 and ledger.available('USDT') == 100.0
+
+    asyncio.run(scenario())
+    print("✅ Резервы снимаются после параллельного исполнения")
+
+
+if __name__ == "__main__":
+    test_balance_reservation()
+    test_unknown_balance_checks_legs_only()
+    test_plan_batch()
+    test_concurrent_execution_releases()
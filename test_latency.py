@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Тест поэтапных задержек tick-to-trade
+"""
+
+from latency import HdrHistogram, LatencyTrace, LatencyTracker, format_latency_summary
+
+
+def test_hdr_histogram_percentiles():
+    """Тест точности перцентилей HDR гистограммы"""
+    histogram = HdrHistogram()
+    for value in range(1, 10001):
+        histogram.record(value)
+
+    p50 = histogram.percentile(50)
+    p99 = histogram.percentile(99)
+    p999 = histogram.percentile(99.9)
+    print(f"p50={p50} p99={p99} p99.9={p999}")
+
+    # Относительная ошибка не больше ширины корзины (~0.8%)
+    assert abs(p50 - 5000) / 5000 < 0.01
+    assert abs(p99 - 9900) / 9900 < 0.01
+    assert abs(p999 - 9990) / 9990 < 0.01
+    assert histogram.percentile(100) == 10000
+    assert histogram.min_value == 1
+    print("✅ Перцентили в пределах точности")
+
+
+def test_trace_intervals():
+    """Тест интервалов между этапами"""
+    trace = LatencyTrace('USDT → BTC → ETH → USDT (direct)')
+    base = 1_000_000_000
+    trace.mark('md_recv', base)
+    trace.mark('scan_start', base + 100_000)
+    trace.mark('scan_end', base + 600_000)
+    trace.mark('decision', base + 700_000)
+    for leg in (1, 2, 3):
+        start = base + leg * 10_000_000
+        trace.mark(f'leg{leg}_submit', start)
+        trace.mark(f'leg{leg}_ack', start + 3_000_000)
+        trace.mark(f'leg{leg}_fill', start + 3_000_000)
+        trace.mark('last_fill', start + 3_000_000)
+    trace.mark('notify', base + 50_000_000)
+
+    intervals = dict(trace.intervals())
+    assert intervals['scan'] == 500
+    assert intervals['tick_to_trade'] == 10_000
+    assert intervals['leg2_fill'] == 3_000
+    assert intervals['legs_total'] == 23_000
+    assert intervals['total'] == 50_000
+
+    tracker = LatencyTracker()
+    tracker.record(trace)
+    summary = tracker.summary()
+    assert summary['scan']['p50'] == 0.5
+    assert summary['total']['count'] == 1
+    assert tracker.summary(trace.key)['legs_total']['p99'] == 23.0
+    print(format_latency_summary(summary))
+    print("✅ Интервалы рассчитаны корректно")
+
+
+if __name__ == "__main__":
+    print("⏱️ ТЕСТ ЗАДЕРЖЕК TICK-TO-TRADE")
+    print("=" * 40)
+    test_hdr_histogram_percentiles()
+    test_trace_intervals()
+    print("🔺 Тест завершен")
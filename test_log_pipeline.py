@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Тест асинхронного логирования с ротацией
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import log_pipeline
+
+
+def test_async_json_logging():
+    """Тест записи JSON через фоновый поток и ротации по размеру"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, 'bot.log')
+        os.environ['LOG_MAX_BYTES'] = '2000'
+        os.environ['LOG_BACKUP_COUNT'] = '2'
+        os.environ['LOG_FORMAT'] = 'json'
+        try:
+            log_pipeline.setup_async_logging(log_file)
+            logger = logging.getLogger('test_log_pipeline')
+
+            for i in range(100):
+                logger.info("🔄 Цикл %d", i, extra={'path': 'USDT → BTC → ETH → USDT'})
+        finally:
+            log_pipeline.shutdown_logging()
+            for name in ('LOG_MAX_BYTES', 'LOG_BACKUP_COUNT', 'LOG_FORMAT'):
+                os.environ.pop(name, None)
+
+        files = sorted(os.listdir(tmp))
+        print(f"📁 Файлы: {files}")
+        assert 'bot.log' in files
+        assert 'bot.log.1' in files
+        assert 'bot.log.3' not in files
+
+        with open(log_file, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        assert records[-1]['msg'] == '🔄 Цикл 99'
+        assert records[-1]['path'] == 'USDT → BTC → ETH → USDT'
+        assert records[-1]['level'] == 'INFO'
+        print("✅ JSON записи и ротация работают")
+
+
+def test_lazy_queue_handler_does_not_format():
+    """Тест что сообщение не форматируется в вызывающем потоке"""
+    import queue
+
+    class Explosive:
+        def __str__(self):
+            raise AssertionError("форматирование в вызывающем потоке")
+
+    handler = log_pipeline.LazyQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger('test_lazy')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("значение %s", Explosive())
+        logger.warning("переполнение")
+    finally:
+        logger.removeHandler(handler)
+
+    record = handler.queue.get_nowait()
+    assert record.msg == "значение %s"
+    assert handler.dropped == 1
+    print("✅ Форматирование отложено, переполнение не блокирует")
+
+
+if __name__ == "__main__":
+    print("📝 ТЕСТ ЛОГИРОВАНИЯ")
+    print("=" * 40)
+    test_async_json_logging()
+    test_lazy_queue_handler_does_not_format()
+    print("🔺 Тест завершен")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Тест лаунчера main.py
+"""
+
+import sys
+
+import main
+
+
+def test_modes_point_to_modules():
+    """Каждый режим указывает на существующий файл с функцией запуска"""
+    import os
+    for mode, (module_name, entry_name) in main.MODES.items():
+        path = f"{module_name}.py"
+        assert os.path.exists(path), path
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        assert f"def {entry_name}(" in source, mode
+    for parts in main.COMBINED_MODES.values():
+        assert all(part in main.MODES for part in parts)
+    # По умолчанию вместе с движком запускается бот управления - иначе арбитраж не включить
+    assert main.DEFAULT_MODE in main.COMBINED_MODES
+    assert 'control' in main.COMBINED_MODES[main.DEFAULT_MODE]
+    print(f"✅ Режимов: {len(main.MODES)}")
+
+
+def test_supervise_stops_siblings():
+    """Завершился один процесс группы - остальные останавливаются, код выхода ненулевой"""
+    import subprocess
+    sleeper = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    crashed = subprocess.Popen([sys.executable, '-c', 'raise SystemExit(3)'])
+    assert main.supervise({'control': sleeper, 'triangular': crashed}, poll_interval=0.05) == 3
+    assert sleeper.poll() is not None
+
+    finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+    assert main.supervise({'triangular': finished}, poll_interval=0.05) == 1
+    print("✅ Группа режимов останавливается целиком")
+
+
+def test_import_mode_reports_new_modules():
+    """Импорт режима возвращает функцию запуска и список новых модулей"""
+    main.MODES['_test'] = ('latency', 'format_latency_summary')
+    sys.modules.pop('latency', None)
+    try:
+        entry, elapsed, new_modules = main.import_mode('_test')
+    finally:
+        del main.MODES['_test']
+    assert callable(entry)
+    assert elapsed >= 0
+    assert 'latency' in new_modules
+    assert main.loaded_packages(['ccxt', 'ccxt.base', 'telegram.ext']) == {'ccxt': 2, 'telegram': 1}
+    print(f"✅ Импорт за {elapsed * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    test_modes_point_to_modules()
+    test_import_mode_reports_new_modules()
+    test_supervise_stops_siblings()
+    print("🎉 Все тесты лаунчера пройдены")
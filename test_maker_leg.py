@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Тест мейкер-ноги: цена post-only ордера, перестановка за стаканом и IOC остальных ног
+"""
+
+import asyncio
+import itertools
+
+from maker_leg import (MAKER_EDGE, MAKER_FILLED, MAKER_TIMEOUT, MakerLegStrategy, choose_maker_leg,
+                       leg_currencies, leg_order, maker_limit_price, maker_quote, resting_price)
+
+# USDT -> BTC -> ETH -> USDT: покупка BTC/USDT, покупка ETH/BTC, продажа ETH/USDT
+SYMBOLS = ('BTC/USDT', 'ETH/BTC', 'ETH/USDT')
+SIDES = ('buy', 'buy', 'sell')
+
+
+def books(eth_btc_bid=0.04990, eth_btc_ask=0.05010):
+    return [
+        ([(60000.0, 5.0)], [(60001.0, 5.0)]),
+        ([(eth_btc_bid, 0.5)], [(eth_btc_ask, 0.5)]),   # тонкий стакан
+        ([(3030.0, 50.0)], [(3030.5, 50.0)]),
+    ]
+
+
+class FakeExchange:
+    """Post-only ордера висят, пока тест их не исполнит; IOC исполняются по цене ордера"""
+
+    has = {'watchOrders': True}
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.orders = {}
+        self.created = []
+        self.canceled = []
+        self.updates = asyncio.Queue()
+
+    async def create_order(self, symbol, type, side, amount, price, params=None):
+        order = {'id': str(next(self.ids)), 'symbol': symbol, 'side': side, 'amount': amount, 'price': price,
+                 'params': params or {}, 'status': 'open', 'filled': 0.0, 'cost': 0.0, 'average': price}
+        if order['params'].get('timeInForce') == 'IOC':
+            order.update(status='closed', filled=amount, cost=amount * price)
+        self.orders[order['id']] = order
+        self.created.append(dict(order))
+        return dict(order)
+
+    def fill(self, order_id, share=1.0):
+        order = self.orders[order_id]
+        order['filled'] = order['amount'] * share
+        order['cost'] = order['filled'] * order['price']
+        order['status'] = 'closed' if share >= 1.0 else 'open'
+        self.updates.put_nowait(dict(order))
+
+    async def watch_orders(self, symbol=None):
+        return [await self.updates.get()]
+
+    async def cancel_order(self, order_id, symbol=None):
+        self.canceled.append(order_id)
+        self.orders[order_id]['status'] = 'canceled'
+
+    async def fetch_order(self, order_id, symbol=None):
+        return dict(self.orders[order_id])
+
+
+def test_pricing():
+    """Предел цены мейкер-ноги дает ровно min_profit; post-only не переходит через спред"""
+    assert leg_currencies('ETH/BTC', 'buy') == ('BTC', 'ETH')
+    assert leg_currencies('ETH/BTC', 'sell') == ('ETH', 'BTC')
+    assert leg_order(3, 1) == [1, 2, 0]
+    assert choose_maker_leg(books(), SIDES, 50.0) == 1
+
+    limit = maker_limit_price('buy', [1 / 60001.0, 3030.0], 0.002, 0.0, 0.3)
+    final = 1 / 60001.0 * 0.998 / limit * 3030.0 * 0.998
+    assert abs(final - 1.003) < 1e-9
+    # Предел выше лучшего bid - встаем в bid; ниже - по пределу, глубже в стакане
+    assert resting_price('buy', limit, 0.04990, 0.05010) == 0.04990
+    assert resting_price('buy', 0.0498, 0.04990, 0.05010) == 0.0498
+    assert resting_price('sell', 0.0502, 0.04990, 0.05010) == 0.0502
+    assert resting_price('sell', 0.0499, 0.0499, 0.0501) == 0.0501
+    assert resting_price('buy', 0.0, 0.0499, 0.0501) is None
+    assert resting_price('buy', 0.0498, 0.04990, 0.05010, max_depth_bps=10) is None
+
+    # Тейкер по ask ETH/BTC (0.0501) не проходит порог 0.3%, мейкер в bid - проходит
+    price = maker_quote(books(), SIDES, 1, 0.002, 0.0, 0.3)
+    assert price == 0.04990
+    # Порог выше - предел глубже лучшего bid, ордер стоит по нему
+    assert maker_quote(books(), SIDES, 1, 0.002, 0.0, 1.0) < 0.04990
+    assert maker_quote([books()[0], books()[1], ([], [])], SIDES, 1, 0.002, 0.0, 0.3) is None
+    print("✅ Цена мейкер-ноги")
+
+
+def test_fill_then_ioc():
+    """После исполнения мейкер-ноги остальные ноги уходят IOC, цикл возвращается в BTC"""
+    async def scenario():
+        exchange = FakeExchange()
+        current = books()
+        strategy = MakerLegStrategy(exchange, min_profit_percent=0.3, reprice_bps=5, timeout=5,
+                                    check_interval=0.02, ioc_slippage_bps=10)
+        task = asyncio.create_task(strategy.execute(SYMBOLS, SIDES, 1, 0.001, lambda: current))
+        await asyncio.sleep(0.05)
+        maker = exchange.created[0]
+        assert maker['params'] == {'postOnly': True} and maker['price'] == 0.04990
+        assert abs(maker['amount'] - 0.001 / 0.04990) < 1e-12
+
+        # Стакан сдвинулся на 10 б.п. - ордер переставляется
+        current[1] = ([(0.04985, 0.5)], [(0.05000, 0.5)])
+        await asyncio.sleep(0.1)
+        assert exchange.canceled == [maker['id']]
+        replaced = exchange.created[1]
+        assert replaced['price'] == 0.04985
+
+        exchange.fill(replaced['id'])
+        result = await task
+        assert result.status == MAKER_FILLED and result.reprices == 1 and result.error is None
+        assert [n for n, _order in result.orders] == [1, 2, 0]
+        sell, buy = exchange.created[2], exchange.created[3]
+        assert sell['symbol'] == 'ETH/USDT' and sell['params'] == {'timeInForce': 'IOC'}
+        assert abs(sell['price'] - 3030.0 * 0.999) < 1e-9
+        assert buy['symbol'] == 'BTC/USDT' and abs(buy['price'] - 60001.0 * 1.001) < 1e-9
+        assert abs(result.spent - 0.001) < 1e-12 and result.final_amount == buy['amount']
+        assert result.profit > 0
+
+    asyncio.run(scenario())
+    print("✅ Мейкер-нога исполнена, такер-ноги IOC")
+
+
+def test_edge_and_timeout():
+    """Цикл перестал сходиться - ордер снимается; частичное исполнение хеджируется"""
+    async def scenario():
+        exchange = FakeExchange()
+        current = books()
+        strategy = MakerLegStrategy(exchange, min_profit_percent=0.3, timeout=5, check_interval=0.02)
+        task = asyncio.create_task(strategy.execute(SYMBOLS, SIDES, 1, 0.001, lambda: current))
+        await asyncio.sleep(0.05)
+        maker = exchange.created[0]
+        exchange.fill(maker['id'], 0.5)
+        await asyncio.sleep(0.05)
+        current[2] = ([(2900.0, 50.0)], [(2900.5, 50.0)])  # ETH/USDT просел - прибыли нет
+        result = await task
+        assert result.status == MAKER_EDGE and exchange.canceled == [maker['id']]
+        assert abs(result.spent - 0.0005) < 1e-12
+        assert [order['symbol'] for order in exchange.created[1:]] == ['ETH/USDT', 'BTC/USDT']
+
+        # Ни одного исполнения за отведенное время - такер-ноги не отправляются
+        exchange = FakeExchange()
+        strategy = MakerLegStrategy(exchange, min_profit_percent=0.3, timeout=0.1, check_interval=0.02)
+        result = await strategy.execute(SYMBOLS, SIDES, 1, 0.001, books)
+        assert result.status == MAKER_TIMEOUT and result.spent == 0 and len(exchange.created) == 1
+        assert exchange.canceled == [exchange.created[0]['id']]
+
+    asyncio.run(scenario())
+    print("✅ Ордер снимается, частичное исполнение хеджируется")
+
+
+if __name__ == "__main__":
+    test_pricing()
+    test_fill_then_ioc()
+    test_edge_and_timeout()
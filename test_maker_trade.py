@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тест сделки с мейкер-ногой в боте: уведомление сопоставляет план и исполнение по номеру ноги
+"""
+
+import asyncio
+
+from latency import LatencyTrace
+from triangular_arbitrage_bot import TriangularArbitrageBot, TriangularOpportunity
+
+TRIANGLE = ('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')
+SIDES = ('buy', 'buy', 'sell')
+QUOTES = {'BTC/USDT': (60000.0, 60001.0), 'ETH/BTC': (0.0499, 0.0501), 'ETH/USDT': (3030.0, 3030.5)}
+
+
+class FillingExchange:
+    """Любой ордер исполняется сразу по цене ордера"""
+
+    has = {}
+
+    def __init__(self):
+        self.orders = {}
+
+    async def create_order(self, symbol, type, side, amount, price, params=None):
+        order = {'id': str(len(self.orders) + 1), 'symbol': symbol, 'side': side, 'amount': amount,
+                 'price': price, 'status': 'closed', 'filled': amount, 'cost': amount * price,
+                 'average': price, 'fee': None}
+        self.orders[order['id']] = order
+        return dict(order)
+
+    async def fetch_order(self, order_id, symbol=None):
+        return dict(self.orders[order_id])
+
+    async def cancel_order(self, order_id, symbol=None):
+        pass
+
+
+def make_bot():
+    bot = TriangularArbitrageBot()
+    bot.exchange = FillingExchange()
+    bot.slippage.path = ''
+    bot.min_profit = 0.3
+    bot.max_position = 50.0
+    bot.update_stats_to_control = lambda: None
+    for symbol, (bid, ask) in QUOTES.items():
+        bot.quotes.update(symbol, bid, ask, 100.0, 100.0)
+    return bot
+
+
+def test_maker_trade_planned_prices():
+    """Мейкер-нога 2: у нее нет плана, у такер-ног план своей ноги, а не соседней"""
+    async def scenario():
+        bot = make_bot()
+        sent = []
+
+        async def send_telegram(message):
+            sent.append(message)
+
+        bot.send_telegram = send_telegram
+        leg_prices = (QUOTES['BTC/USDT'][1], QUOTES['ETH/BTC'][1], QUOTES['ETH/USDT'][0])
+        opportunity = TriangularOpportunity(
+            path='USDT → BTC → ETH → USDT', triangle=TRIANGLE, profit_percent=1.0, profit_usd=0.5,
+            net_profit_percent=0.8, net_profit_usd=0.4, fees_usd=0.1,
+            legs=tuple(bot.quotes.ids[symbol] for symbol in TRIANGLE[:3]), leg_prices=leg_prices,
+            sides=SIDES, maker_leg=1,
+        )
+        assert await bot.execute_maker_trade(opportunity, LatencyTrace(opportunity.path))
+        message = sent[-1]
+
+        # Сделки в порядке исполнения: ETH/BTC (мейкер), ETH/USDT, BTC/USDT
+        details = message.split('Детали сделок')[1].split('Общая статистика')[0]
+        blocks = [block for block in details.split('\n\n') if '`' in block]
+        planned = {}
+        for block in blocks:
+            symbol = block.split('`')[1]
+            planned[symbol] = block.split('план `$')[1].split('`')[0] if 'план' in block else None
+        assert planned == {'ETH/BTC': None, 'ETH/USDT': f"{leg_prices[2]:.6f}", 'BTC/USDT': f"{leg_prices[0]:.6f}"}
+
+    asyncio.run(scenario())
+    print("✅ План цены по номеру ноги")
+
+
+if __name__ == "__main__":
+    test_maker_trade_planned_prices()
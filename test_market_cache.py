@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Тест дискового кэша рынков
+"""
+
+import os
+import tempfile
+import time
+
+from market_cache import MarketCache, compact_markets, diff_markets, markets_hash, triangles_config_key
+
+MARKETS = {
+    'BTC/USDT': {'id': 'BTCUSDT', 'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT',
+                 'limits': {'amount': {'min': 0.0001}}, 'info': {'raw': 'x' * 100}},
+    'ETH/USDT': {'id': 'ETHUSDT', 'symbol': 'ETH/USDT', 'base': 'ETH', 'quote': 'USDT',
+                 'limits': {'amount': {'min': 0.001}}, 'info': {}},
+    'ETH/BTC': {'id': 'ETHBTC', 'symbol': 'ETH/BTC', 'base': 'ETH', 'quote': 'BTC',
+                'limits': {'amount': {'min': 0.001}}, 'info': {}},
+}
+TRIANGLES = [('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')]
+
+
+def _cache(ttl=3600):
+    directory = tempfile.mkdtemp()
+    return MarketCache(os.path.join(directory, 'market_cache.bin'), ttl=ttl)
+
+
+def test_roundtrip():
+    """Сохранение и загрузка без поля info"""
+    cache = _cache()
+    key = triangles_config_key(['USDT'], ['BTC', 'ETH'])
+    cache.save(MARKETS, TRIANGLES, key)
+
+    cached = cache.load(key)
+    assert cached is not None
+    assert cached.triangles == TRIANGLES
+    assert cached.markets == compact_markets(MARKETS)
+    assert 'info' not in cached.markets['BTC/USDT']
+    assert cached.markets_hash == markets_hash(MARKETS)
+    assert cache.is_fresh(cached)
+    print(f"✅ Кэш прочитан: {len(cached.markets)} пар")
+
+
+def test_ttl_and_config_key():
+    """Устаревший кэш читается, но не свежий; другие настройки - промах"""
+    cache = _cache(ttl=0.01)
+    cache.save(MARKETS, TRIANGLES, 'a')
+    time.sleep(0.02)
+    cached = cache.load('a')
+    assert cached is not None and not cache.is_fresh(cached)
+    assert cache.load('b') is None
+    print("✅ TTL и ключ настроек учитываются")
+
+
+def test_corrupted_file():
+    """Поврежденный файл не используется"""
+    cache = _cache()
+    cache.save(MARKETS, TRIANGLES)
+    with open(cache.path, 'r+b') as f:
+        f.seek(-5, os.SEEK_END)
+        f.write(b'\x00\x00\x00\x00\x00')
+    assert cache.load() is None
+    assert _cache().load() is None  # файла нет
+    print("✅ Поврежденный кэш отбрасывается")
+
+
+def test_touch_resets_age():
+    """Подтвержденные биржей рынки продлевают кэш без перезаписи содержимого"""
+    cache = _cache(ttl=0.05)
+    cache.save(MARKETS, TRIANGLES, 'a')
+    time.sleep(0.06)
+    assert not cache.is_fresh(cache.load('a'))
+    assert cache.touch()
+    cached = cache.load('a')
+    assert cached is not None and cache.is_fresh(cached) and cached.triangles == TRIANGLES
+    assert not _cache().touch()  # файла нет - нужен полный save
+    print("✅ Время кэша обновляется без перезаписи")
+
+
+def test_hash_ignores_order_and_info():
+    """Хэш не зависит от порядка ключей и сырого ответа биржи"""
+    reordered = {symbol: dict(reversed(list(market.items()))) for symbol, market in reversed(list(MARKETS.items()))}
+    reordered['BTC/USDT']['info'] = {'other': 1}
+    assert markets_hash(reordered) == markets_hash(MARKETS)
+
+    changed = dict(MARKETS)
+    changed['SOL/USDT'] = {'id': 'SOLUSDT', 'symbol': 'SOL/USDT'}
+    assert markets_hash(changed) != markets_hash(MARKETS)
+    print("✅ Хэш содержимого стабилен")
+
+
+def test_diff_markets():
+    """Новые, приостановленные и измененные пары"""
+    new = {symbol: dict(market) for symbol, market in MARKETS.items()}
+    new['SOL/USDT'] = {'id': 'SOLUSDT', 'symbol': 'SOL/USDT'}
+    new['ETH/BTC']['active'] = False
+    new['BTC/USDT']['limits'] = {'amount': {'min': 0.001}}
+    new['ETH/USDT']['info'] = {'changed': True}
+
+    diff = diff_markets(MARKETS, new)
+    assert diff.added == ['SOL/USDT']
+    assert diff.removed == ['ETH/BTC']
+    assert diff.changed == ['BTC/USDT']
+    assert not diff_markets(MARKETS, MARKETS)
+    print("✅ Разница рынков определена")
+
+
+if __name__ == "__main__":
+    test_roundtrip()
+    test_ttl_and_config_key()
+    test_corrupted_file()
+    test_touch_resets_age()
+    test_hash_ignores_order_and_info()
+    test_diff_markets()
+    print("🎉 Все тесты кэша рынков пройдены")
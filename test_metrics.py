@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Тест метрик Prometheus и эндпоинта /metrics
+"""
+
+import asyncio
+
+from metrics import ArbitrageMetrics, MetricsServer
+
+
+def test_render_metrics():
+    """Тест формата экспозиции"""
+    metrics = ArbitrageMetrics()
+    metrics.triangles_evaluated.inc(42)
+    metrics.rate_limit_hits.inc(endpoint='order')
+    metrics.telegram_queue_depth.set(3)
+    metrics.scan_duration.observe(0.02)
+    metrics.scan_duration.observe(7.0)
+    metrics.leg_fill_latency.observe(0.15, leg='1')
+
+    text = metrics.registry.render()
+    print(text)
+
+    assert '# TYPE arbitrage_triangles_evaluated_total counter' in text
+    assert 'arbitrage_triangles_evaluated_total 42' in text
+    assert 'arbitrage_rate_limit_hits_total{endpoint="order"} 1' in text
+    assert 'arbitrage_telegram_queue_depth 3' in text
+    assert 'arbitrage_scan_duration_seconds_bucket{le="0.025"} 1' in text
+    assert 'arbitrage_scan_duration_seconds_bucket{le="+Inf"} 2' in text
+    assert 'arbitrage_scan_duration_seconds_count 2' in text
+    assert 'arbitrage_leg_fill_latency_seconds_bucket{leg="1",le="0.25"} 1' in text
+    print("✅ Формат метрик корректен")
+
+
+def test_metrics_endpoint():
+    """Тест HTTP эндпоинта /metrics"""
+
+    async def scenario():
+        metrics = ArbitrageMetrics()
+        metrics.ws_reconnects.inc()
+        server = MetricsServer(metrics.registry, host='127.0.0.1', port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            response = (await reader.read()).decode('utf-8')
+            writer.close()
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(b"GET /other HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            not_found = (await reader.read()).decode('utf-8')
+            writer.close()
+        finally:
+            await server.stop()
+        return response, not_found
+
+    response, not_found = asyncio.run(scenario())
+
+    assert response.startswith('HTTP/1.1 200 OK')
+    assert 'arbitrage_ws_reconnects_total 1' in response
+    assert not_found.startswith('HTTP/1.1 404')
+    print("✅ Эндпоинт /metrics отвечает")
+
+
+if __name__ == "__main__":
+    print("📈 ТЕСТ МЕТРИК")
+    print("=" * 40)
+    test_render_metrics()
+    test_metrics_endpoint()
+    print("🔺 Тест завершен")
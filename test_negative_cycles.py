@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тест поиска отрицательных циклов (SPFA) на графе курсов
+"""
+
+from cycles import cycle_path
+from negative_cycles import NegativeCycleDetector, RateGraph
+from quote_store import QuoteStore
+
+QUOTES = {
+    'BTC/USDT': (60000.0, 60001.0),
+    'ETH/USDT': (3000.0, 3000.5),
+    'ETH/BTC': (0.05, 0.05001),
+    'USDC/USDT': (1.0, 1.0001),
+    'BTC/USDC': (60000.0, 60001.0),
+    'ETH/USDC': (3000.0, 3000.3),
+    'SOL/USDT': (150.0, 150.02),
+    'SOL/BTC': (0.0025, 0.0025001),
+}
+
+
+def make_graph():
+    store = QuoteStore()
+    for symbol, (bid, ask) in QUOTES.items():
+        store.update(symbol, bid, ask, 1.0, 1.0)
+    return store, RateGraph({symbol: {} for symbol in QUOTES}, store)
+
+
+def test_no_cycle_then_incremental_detection():
+    """Без перекоса циклов нет; перекос BTC/USDC находится инкрементальным запуском"""
+    store, graph = make_graph()
+    detector = NegativeCycleDetector(graph)
+    decreased, increased = graph.sync()
+    assert len(decreased) == 2 * len(QUOTES) and not increased
+    assert detector.detect(['USDT', 'BTC'], decreased, increased) == []
+    full = detector.relaxations
+
+    # Без изменений котировок - ничего не пересчитывается
+    assert graph.sync() == ([], [])
+    assert detector.detect(['USDT', 'BTC']) == [] and detector.relaxations == 0
+
+    store.update('BTC/USDC', 61000.0, 61001.0, 1.0, 1.0)
+    decreased, increased = graph.sync()
+    assert len(decreased) == 1 and len(increased) == 1
+    found = detector.detect(['USDT', 'BTC'], decreased, increased)
+    paths = [cycle_path(c.legs) for c in found]
+    print(paths, full, detector.relaxations)
+
+    assert found and found[0].profit_percent > 1.0
+    assert paths[0] == "USDT → BTC → USDC → USDT"
+    assert all(c.start in ('USDT', 'BTC') for c in found)
+    assert len(found) > 1  # после выключения ребра находятся и другие циклы
+    print("✅ Отрицательные циклы находятся")
+
+
+def test_cycle_leg_limit():
+    """Циклы длиннее max_legs не возвращаются"""
+    store, graph = make_graph()
+    store.update('BTC/USDC', 61000.0, 61001.0, 1.0, 1.0)
+    detector = NegativeCycleDetector(graph, max_legs=2)
+    assert detector.detect(['USDT'], *graph.sync()) == []
+    # Найдены только отвергнутые циклы - расстояния сохраняются для инкрементального запуска
+    store, graph = make_graph()
+    store.update('BTC/USDC', 61000.0, 61001.0, 1.0, 1.0)
+    detector = NegativeCycleDetector(graph, max_legs=2, max_rounds=8)
+    assert detector.detect(['USDT'], *graph.sync()) == []
+    assert graph.node_ids['USDT'] in detector._state
+    assert detector.detect(['USDT'], *graph.sync()) == [] and detector.relaxations == 0
+    print("✅ Ограничение числа ног работает")
+
+
+if __name__ == "__main__":
+    test_no_cycle_then_incremental_detection()
+    test_cycle_leg_limit()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Тест аналитики жизни возможностей
+"""
+
+from array import array
+
+from opportunity_analytics import (LifetimeSampler, OpportunityAnalytics, format_lifetime_summary,
+                                   net_edge_percent, triangle_depth)
+from quote_store import QuoteStore, compile_triangles
+
+A = "USDT → BTC → ETH → USDT (reverse)"
+B = "BTC → ETH → SOL → BTC (direct)"
+
+
+def test_episode_lifecycle():
+    """Эпизод открывается, обновляет пик и закрывается при выходе из снимка"""
+    analytics = OpportunityAnalytics()
+    analytics.update({A: ('USDT', 0.8, 100.0)}, now=0.0)
+    analytics.update({A: ('USDT', 1.2, 40.0), B: ('BTC', 0.9, 5.0)}, now=2.0)
+    closed = analytics.update({B: ('BTC', 0.9, 5.0)}, now=4.0)
+
+    assert [e.key for e in closed] == [A]
+    episode = closed[0]
+    assert episode.lifetime == 4.0
+    assert episode.peak_edge == 1.2 and episode.peak_depth == 40.0
+    assert episode.observations == 2
+    assert list(analytics.open) == [B]
+
+    analytics.update({}, now=10.0)
+    summary = analytics.summary()
+    assert summary['by_base']['USDT']['count'] == 1
+    assert abs(summary['by_base']['USDT']['p50'] - 4.0) < 0.05
+    assert abs(summary['by_base']['BTC']['p50'] - 8.0) < 0.05
+    assert summary['open'] == 0
+    assert summary['resolution_s'] > 0
+    print(format_lifetime_summary(summary))
+    print("✅ Эпизоды учитываются")
+
+
+def test_triangle_depth():
+    """Глубина - минимум по ногам в базовой валюте"""
+    bid = array('d', [59990.0, 0.0499, 3000.0])
+    ask = array('d', [60000.0, 0.05, 3001.0])
+    bid_size = array('d', [1.0, 10.0, 0.02])
+    ask_size = array('d', [0.01, 2.0, 1.0])
+    depth = triangle_depth(bid, ask, bid_size, ask_size, (0, 1, 2), direct=False)
+    assert depth == 3000.0 * 0.02  # третья нога самая мелкая
+
+    ask_size[0] = 0.0
+    assert triangle_depth(bid, ask, bid_size, ask_size, (0, 1, 2), direct=False) == 0.0
+    print("✅ Глубина треугольника")
+
+
+def test_partial_update():
+    """Частичный снимок закрывает только пересчитанные эпизоды"""
+    analytics = OpportunityAnalytics()
+    analytics.update({A: ('USDT', 0.8, 1.0), B: ('BTC', 0.9, 1.0)}, now=0.0)
+    closed = analytics.update({}, now=1.0, scored=[A])
+    assert [e.key for e in closed] == [A] and list(analytics.open) == [B]
+    print("✅ Частичный снимок")
+
+
+def test_sampler_follows_stream():
+    """Обновление ноги пересчитывает ее треугольники без полного скана"""
+    quotes = QuoteStore()
+    triangle = ('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')
+    compiled = compile_triangles([triangle], quotes)
+    key = f"{compiled[0].path} (reverse)"
+    analytics = OpportunityAnalytics()
+    sampler = LifetimeSampler(analytics, quotes)
+
+    def fee_rate(legs):
+        return 0.0005 * legs
+
+    quotes.update('BTC/USDT', 59990.0, 60000.0, 1.0, 1.0, received=1.0)
+    quotes.update('ETH/BTC', 0.0499, 0.05, 10.0, 10.0, received=1.0)
+    quotes.update('ETH/USDT', 3030.0, 3031.0, 1.0, 1.0, received=1.0)
+    assert sampler.sample(compiled, [], fee_rate, 0.3, now=1.0) == 1
+    edge = net_edge_percent([60000.0, 0.05, 3030.0], [True, True, False], 0.0015)
+    assert abs(analytics.open[key].peak_edge - edge) < 1e-9
+
+    # Без новых котировок пересчитывать нечего
+    assert sampler.sample(compiled, [], fee_rate, 0.3, now=1.5) == 0
+    # ETH/USDT упал - эпизод закрывается по обновлению одной ноги
+    quotes.update('ETH/USDT', 3000.0, 3001.0, 1.0, 1.0, received=2.0)
+    assert sampler.sample(compiled, [], fee_rate, 0.3, now=2.0) == 1
+    assert not analytics.open and analytics.closed[0].lifetime == 1.0
+    print("✅ Эпизоды по потоковым котировкам")
+
+
+if __name__ == "__main__":
+    test_episode_lifecycle()
+    test_triangle_depth()
+    test_partial_update()
+    test_sampler_follows_stream()
+    print("🎉 Все тесты аналитики пройдены")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Тест хранилища котировок
+"""
+
+from quote_store import QuoteStore, compile_triangles, freshness_score
+
+TICKERS = {
+    'BTC/USDT': {'bid': 60000.0, 'ask': 60010.0, 'bidVolume': 1.5, 'askVolume': 2.0, 'timestamp': 1700000000000,
+                 'high': 61000.0, 'low': 59000.0, 'info': {}},
+    'ETH/BTC': {'bid': 0.05, 'ask': 0.0501, 'timestamp': 1700000000100},
+    'ETH/USDT': {'bid': 3000.0, 'ask': None},
+}
+
+
+def test_update_from_tickers():
+    """Цены попадают в массивы, отсутствующие значения - нули"""
+    store = QuoteStore()
+    assert store.update_from_tickers(TICKERS) == 3
+    i = store.ids['BTC/USDT']
+    assert store.bid[i] == 60000.0 and store.ask[i] == 60010.0
+    assert store.bid_size[i] == 1.5 and store.ask_size[i] == 2.0
+    assert store.timestamp[i] == 1700000000000
+    assert store.has_quote(i)
+    assert not store.has_quote(store.ids['ETH/USDT'])
+    assert store.quote('ETH/BTC') == (0.05, 0.0501)
+    assert store.quote('XRP/USDT') is None
+    print(f"✅ Символов в хранилище: {len(store)}")
+
+
+def test_ids_are_stable():
+    """Повторное обновление не меняет id, новые символы добавляются в конец"""
+    store = QuoteStore(['ETH/USDT'])
+    first = store.ids['ETH/USDT']
+    store.update_from_tickers(TICKERS)
+    assert store.ids['ETH/USDT'] == first == 0
+    assert store.symbol_id('SOL/USDT') == 3
+    assert len(store.bid) == len(store.ask) == len(store.timestamp) == 4
+    print("✅ Id символов стабильны")
+
+
+def test_compile_triangles():
+    """Треугольник компилируется в id ног"""
+    store = QuoteStore()
+    store.update_from_tickers(TICKERS)
+    compiled = compile_triangles([('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')], store)
+    triangle = compiled[0]
+    assert triangle.legs == (store.ids['BTC/USDT'], store.ids['ETH/BTC'], store.ids['ETH/USDT'])
+    assert not triangle.direct
+    assert triangle.path == "USDT → BTC → ETH → USDT"
+    assert not hasattr(triangle, '__dict__')
+    print("✅ Треугольник скомпилирован")
+
+
+def test_quote_age():
+    """Возраст - больший из возраста на бирже и с момента получения"""
+    store = QuoteStore(['NEW/USDT'])
+    store.update('BTC/USDT', 1.0, 1.1, timestamp=100_000, received=50.0)
+    store.update('ETH/USDT', 1.0, 1.1, received=59.0)
+    now_ms, now_mono = 160_000, 60.0
+
+    assert store.age_ms(store.ids['BTC/USDT'], now_ms, now_mono) == 60_000  # старая котировка биржи
+    assert store.age_ms(store.ids['ETH/USDT'], now_ms, now_mono) == 1_000   # только время получения
+    assert store.age_ms(store.ids['NEW/USDT'], now_ms, now_mono) == float('inf')
+
+    ages = store.ages_ms(now_ms, now_mono)
+    assert list(ages) == [float('inf'), 60_000, 1_000]
+    print("✅ Возраст котировок считается верно")
+
+
+def test_freshness_score():
+    assert freshness_score([0, 0, 0], 10_000) == 1.0
+    assert freshness_score([1_000, 5_000, 2_000], 10_000) == 0.5
+    assert freshness_score([20_000], 10_000) == 0.0
+    assert freshness_score([20_000], 0) == 1.0
+    print("✅ Оценка свежести")
+
+
+if __name__ == "__main__":
+    test_update_from_tickers()
+    test_ids_are_stable()
+    test_compile_triangles()
+    test_quote_age()
+    test_freshness_score()
+    print("🎉 Все тесты хранилища котировок пройдены")
@@ -4,7 +4,53 @@
 """
 
 import asyncio
-from railway_bot import RailwayBot
+from railway_bot import (RailwayBot, SpreadOpportunity, filter_opportunities, format_opportunities, iter_spreads,
+                         score_opportunities)
+
+TICKERS = {
+    'BTC/USDT': {'bid': 60000.0, 'ask': 60030.0},   # 0.05%
+    'ETH/USDT': {'bid': 3000.0, 'ask': 3003.0},     # 0.1%
+    'DOGE/USDT': {'bid': 0.1, 'ask': 0.1005},       # 0.5%
+    'NEW/USDT': {'bid': None, 'ask': 1.0},          # нет стакана
+    'DEAD/USDT': {'bid': 0.0, 'ask': 0.0},
+}
+
+
+def test_iter_spreads():
+    """Спред из тикеров; пары без стакана пропускаются"""
+    spreads = list(iter_spreads(TICKERS))
+    assert [o.pair for o in spreads] == ['BTC/USDT', 'ETH/USDT', 'DOGE/USDT']
+    btc = spreads[0]
+    assert (btc.bid, btc.ask, btc.profit) == (60000.0, 60030.0, 0.0)
+    assert abs(btc.spread - 0.05) < 1e-9
+    print("✅ Спреды по тикерам")
+
+
+def test_filter_and_score():
+    """Порог спреда, затем прибыль и отсев ниже min_profit в порядке тикеров"""
+    good = list(filter_opportunities(iter_spreads(TICKERS), max_spread=0.3))
+    assert [o.pair for o in good] == ['BTC/USDT', 'ETH/USDT']
+
+    scored = list(score_opportunities(iter_spreads(TICKERS), min_profit=0.0))
+    assert [o.pair for o in scored] == ['BTC/USDT', 'ETH/USDT']  # DOGE: (0.1 - 0.5) * 10 + 0.5 < 0
+    assert abs(scored[0].profit - 1.0) < 1e-9 and abs(scored[1].profit - 0.5) < 1e-9
+    assert scored[0].profit > scored[1].profit  # чем уже спред, тем выше оценка
+
+    # Стадии соединяются в конвейер генераторов
+    stages = score_opportunities(filter_opportunities(iter_spreads(TICKERS), 0.3), min_profit=0.75)
+    assert [o.pair for o in stages] == ['BTC/USDT']
+    print("✅ Фильтр и оценка")
+
+
+def test_format_opportunities():
+    """Markdown для Telegram: заголовок и строка на пару"""
+    text = format_opportunities([SpreadOpportunity('BTC/USDT', 60000.0, 60030.0, 0.05),
+                                 SpreadOpportunity('ETH/USDT', 3000.0, 3003.0, 0.1)])
+    assert text == ("🔍 **НАЙДЕННЫЕ ВОЗМОЖНОСТИ:**\n\n"
+                    "• BTC/USDT: спред 0.050%\n"
+                    "• ETH/USDT: спред 0.100%")
+    assert format_opportunities([]).endswith("\n\n")
+    print("✅ Форматирование возможностей")
 
 async def test_railway_bot():
     """Тест Railway бота"""
@@ -25,7 +71,7 @@ async def test_railway_bot():
         print("🔍 Тест поиска возможностей...")
         opportunities = await bot.find_opportunities()
         if opportunities:
-            print(f"Возможности: {opportunities[:100]}...")
+            print(f"Возможности: {format_opportunities(opportunities)[:100]}...")
         else:
             print("Возможности: Не найдены (это нормально)")
         
@@ -45,4 +91,7 @@ async def test_railway_bot():
     print("🔺 Тест завершен")
 
 if __name__ == "__main__":
+    test_iter_spreads()
+    test_filter_and_score()
+    test_format_opportunities()
     asyncio.run(test_railway_bot())
\ No newline at end of file
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Тест менеджера лимитов запросов
+"""
+
+import asyncio
+import time
+
+from rate_limiter import (ORDER, PRIORITY_ORDER, PRIORITY_REPORT, PRIVATE, PUBLIC, RateLimitedExchange,
+                          RateLimitManager, TokenBucket, reporting_priority)
+
+
+class DDoSProtection(Exception):
+    """Имена как в ccxt.base.errors"""
+
+
+class RateLimitExceeded(DDoSProtection):
+    pass
+
+
+class FakeExchange:
+    def __init__(self):
+        self.calls = []
+        self.markets = {'BTC/USDT': {}}
+
+    async def fetch_tickers(self, symbols=None):
+        self.calls.append('fetch_tickers')
+        return {}
+
+    async def create_market_buy_order(self, symbol, amount):
+        self.calls.append('create_market_buy_order')
+        return {'status': 'closed'}
+
+    async def fetch_balance(self):
+        self.calls.append('fetch_balance')
+        raise RateLimitExceeded('429')
+
+
+def test_classify_weights():
+    """Веса эндпоинтов MEXC"""
+    assert RateLimitManager.classify('fetch_tickers') == (PUBLIC, 40)
+    assert RateLimitManager.classify('fetch_ticker') == (PUBLIC, 1)
+    assert RateLimitManager.classify('fetch_balance') == (PRIVATE, 10)
+    assert RateLimitManager.classify('create_market_sell_order') == (ORDER, 1)
+    assert RateLimitManager.classify('cancel_orders') == (ORDER, 1)
+    print("✅ Веса эндпоинтов корректны")
+
+
+def test_bucket_consumes_weight():
+    """Вес расходует токены, повторный запрос ждет пополнения"""
+    async def scenario():
+        bucket = TokenBucket('public', capacity=10, period=0.1)  # 100 токенов/с
+        await bucket.acquire(10)
+        assert bucket.tokens < 1
+        start = time.monotonic()
+        await bucket.acquire(5)
+        return time.monotonic() - start
+
+    waited = asyncio.run(scenario())
+    assert 0.03 <= waited < 0.5
+    print(f"✅ Ожидание пополнения: {waited * 1000:.0f}мс")
+
+
+def test_priority_order_first():
+    """Ордер обслуживается раньше отчета, вставшего в очередь первым"""
+    async def scenario():
+        bucket = TokenBucket('private', capacity=1, period=0.05)
+        await bucket.acquire(1)
+        served = []
+
+        async def request(name, priority):
+            await bucket.acquire(1, priority)
+            served.append(name)
+
+        report = asyncio.create_task(request('report', PRIORITY_REPORT))
+        await asyncio.sleep(0)
+        order = asyncio.create_task(request('order', PRIORITY_ORDER))
+        await asyncio.gather(report, order)
+        return served
+
+    served = asyncio.run(scenario())
+    assert served == ['order', 'report']
+    print("✅ Ордера имеют приоритет над отчетами")
+
+
+def test_penalty_on_429():
+    """429 снижает скорость и опустошает корзину"""
+    async def scenario():
+        manager = RateLimitManager({PUBLIC: (100, 1.0), PRIVATE: (100, 1.0), ORDER: (5, 1.0)})
+        exchange = RateLimitedExchange(FakeExchange(), manager)
+        assert exchange.markets == {'BTC/USDT': {}}
+        await exchange.fetch_tickers()
+        try:
+            await exchange.fetch_balance()
+        except RateLimitExceeded:
+            pass
+        return manager
+
+    manager = asyncio.run(scenario())
+    bucket = manager.buckets[PRIVATE]
+    assert manager.hits[PRIVATE] == 1
+    assert bucket.rate == bucket.base_rate / 2
+    assert bucket.tokens == 0
+    assert manager.buckets[PUBLIC].tokens <= 100 - 40 + 1
+    print("✅ Адаптация к 429 работает")
+
+
+def test_reporting_priority_context():
+    """Приоритет отчета наследуется вызовами внутри блока"""
+    async def scenario():
+        manager = RateLimitManager({PUBLIC: (1, 0.05), PRIVATE: (1, 0.05), ORDER: (1, 0.05)})
+        bucket = manager.buckets[PUBLIC]
+        await bucket.acquire(1)
+        served = []
+
+        async def report():
+            with reporting_priority():
+                await manager.acquire(PUBLIC)
+            served.append('report')
+
+        async def trading():
+            await manager.acquire(PUBLIC)
+            served.append('trading')
+
+        first = asyncio.create_task(report())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(trading())
+        await asyncio.gather(first, second)
+        return served
+
+    assert asyncio.run(scenario()) == ['trading', 'report']
+    print("✅ reporting_priority понижает приоритет")
+
+
+if __name__ == "__main__":
+    test_classify_weights()
+    test_bucket_consumes_weight()
+    test_priority_order_first()
+    test_penalty_on_429()
+    test_reporting_priority_context()
+    print("🎉 Все тесты лимитов пройдены")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Тест перепроверки треугольника по стаканам
+"""
+
+import asyncio
+
+from book_feed import BOOK_LIVE, BOOK_RESYNC, BookFeed
+from quote_store import QuoteStore
+from revalidation import ABORT_DEPTH, ABORT_EDGE, ABORT_STALE, revalidate, sell_on_bids, spend_on_asks, simulate_triangle
+
+# USDT -> BTC -> ETH -> USDT (ETH/BTC, reverse): прибыль ~1.6% до комиссий
+BOOKS = [
+    ([(59990.0, 1.0)], [(60000.0, 0.001), (60100.0, 1.0)]),   # BTC/USDT
+    ([(0.0499, 10.0)], [(0.05, 10.0)]),                       # ETH/BTC
+    ([(3050.0, 0.5), (3040.0, 10.0)], [(3051.0, 1.0)]),        # ETH/USDT
+]
+
+
+def test_walk_levels():
+    """Проход по уровням глубины"""
+    assert spend_on_asks([(10.0, 1.0), (20.0, 1.0)], 30.0) == 2.0
+    assert spend_on_asks([(10.0, 1.0)], 30.0) is None
+    assert sell_on_bids([(10.0, 1.0), (5.0, 2.0)], 2.0) == 15.0
+    assert sell_on_bids([(10.0, 1.0)], 2.0) is None
+    print("✅ Проход по стакану")
+
+
+def test_revalidate_accepts_and_rejects():
+    """Прибыль пересчитывается по глубине, отказы по причинам"""
+    final = simulate_triangle(BOOKS, direct=False, initial_amount=100.0)
+    assert final is not None and final > 100.0
+
+    ok = revalidate(BOOKS, [10, 10, 10], False, 100.0, min_profit_percent=0.5, max_age_ms=1000)
+    assert ok.ok and ok.reason is None and ok.net_profit_percent > 0.5
+    assert ok.elapsed_us < 10_000
+
+    edge = revalidate(BOOKS, [10, 10, 10], False, 100.0, min_profit_percent=5.0, max_age_ms=1000)
+    assert not edge.ok and edge.reason == ABORT_EDGE
+
+    stale = revalidate(BOOKS, [10, 5000, 10], False, 100.0, min_profit_percent=0.5, max_age_ms=1000)
+    assert not stale.ok and stale.reason == ABORT_STALE
+
+    depth = revalidate(BOOKS, [10, 10, 10], False, 1_000_000.0, min_profit_percent=0.5, max_age_ms=1000)
+    assert not depth.ok and depth.reason == ABORT_DEPTH
+    print(f"✅ Перепроверка: {ok.net_profit_percent:.3f}% за {ok.elapsed_us:.0f} мкс")
+
+
+class FakeStreamingExchange:
+    has = {'watchOrderBook': True}
+
+    def __init__(self):
+        self.subscribed = []
+
+    async def watch_order_book(self, symbol, limit=None):
+        if symbol not in self.subscribed:
+            self.subscribed.append(symbol)
+        await asyncio.sleep(0.001)
+        return {'bids': [[100.0, 1.0, 0], [99.0, 2.0, 0]], 'asks': [[101.0, 3.0, 0]], 'timestamp': None}
+
+
+def test_book_feed():
+    """Стакан попадает в BookFeed и в QuoteStore, старые подписки вытесняются"""
+    async def scenario():
+        quotes = QuoteStore()
+        feed = BookFeed(FakeStreamingExchange(), quotes, depth=5, max_symbols=2)
+        feed.watch(['A/USDT', 'B/USDT'])
+        assert await feed.wait_ready(['A/USDT', 'B/USDT'], timeout=1.0)
+        feed.watch(['C/USDT'])
+        await feed.stop()
+        return feed, quotes
+
+    feed, quotes = asyncio.run(scenario())
+    assert feed.supported
+    top = feed.book('B/USDT')
+    assert top.bids == [(100.0, 1.0), (99.0, 2.0)] and top.asks == [(101.0, 3.0)]
+    assert feed.book('A/USDT') is None  # вытеснен
+    assert quotes.quote('B/USDT') == (100.0, 101.0)
+    assert quotes.ask_size[quotes.ids['B/USDT']] == 3.0
+    print("✅ Потоковые стаканы")
+
+
+class ScriptedExchange:
+    """Поток стаканов по сценарию; REST снимок отдается с задержкой"""
+
+    has = {'watchOrderBook': True}
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.orderbooks = {'A/USDT': object()}
+        self.snapshots = 0
+
+    async def watch_order_book(self, symbol, limit=None):
+        await asyncio.sleep(0.002)
+        if not self.script:
+            await asyncio.sleep(3600)
+        nonce, bid, ask = self.script.pop(0)
+        return {'bids': [[bid, 1.0]], 'asks': [[ask, 1.0]], 'timestamp': None, 'nonce': nonce}
+
+    async def fetch_order_book(self, symbol, limit=None):
+        self.snapshots += 1
+        await asyncio.sleep(0.02)
+        return {'bids': [[100.0, 5.0]], 'asks': [[100.5, 5.0]], 'timestamp': None, 'nonce': 10}
+
+
+def test_book_resync():
+    """Номер обновления пошел назад или стакан пересекся - снимок по REST и свежий буфер"""
+    async def scenario(script):
+        quotes = QuoteStore()
+        reasons = []
+        exchange = ScriptedExchange(script)
+        feed = BookFeed(exchange, quotes, depth=5, on_resync=reasons.append)
+        feed.watch(['A/USDT'])
+        states = []
+        for _ in range(60):
+            await asyncio.sleep(0.002)
+            states.append(feed.health['A/USDT'])
+            if BOOK_RESYNC in states and states[-1] == BOOK_LIVE:
+                break
+        await feed.stop()
+        return feed, quotes, exchange, reasons, states
+
+    # 1, 2, 3, затем 2 - последовательность сломана; 9 старее снимка, 11 и 12 - новее
+    script = [(1, 99.0, 99.5), (2, 99.1, 99.6), (3, 99.2, 99.7), (2, 99.0, 99.5),
+              (9, 1.0, 2.0), (11, 100.1, 100.6), (12, 100.2, 100.7)]
+    feed, quotes, exchange, reasons, states = asyncio.run(scenario(script))
+    assert reasons == ['sequence'] and feed.resyncs == 1
+    assert BOOK_RESYNC in states and feed.health['A/USDT'] == BOOK_LIVE
+    assert exchange.snapshots == 1 and 'A/USDT' not in exchange.orderbooks
+    assert feed.nonces['A/USDT'] == 12
+    assert quotes.quote('A/USDT') == (100.2, 100.7)
+
+    # Пересеченный стакан; в буфере ничего нового - берется снимок
+    feed, quotes, exchange, reasons, states = asyncio.run(scenario([(1, 99.0, 99.5), (2, 99.8, 99.6)]))
+    assert reasons == ['crossed']
+    assert feed.nonces['A/USDT'] == 10 and quotes.quote('A/USDT') == (100.0, 100.5)
+    print("✅ Испорченный стакан восстанавливается по снимку")
+
+
+def test_unhealthy_book_hidden():
+    feed = BookFeed(ScriptedExchange([]), QuoteStore())
+    feed.health['A/USDT'] = BOOK_RESYNC
+    feed.books['A/USDT'] = object()
+    assert feed.book('A/USDT') is None
+    assert feed.unhealthy_symbols() == {'A/USDT'}
+    print("✅ Стакан в пересинхронизации не отдается")
+
+
+if __name__ == "__main__":
+    test_walk_levels()
+    test_revalidate_accepts_and_rejects()
+    test_book_feed()
+    test_book_resync()
+    test_unhealthy_book_hidden()
+    print("🎉 Все тесты перепроверки пройдены")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Тест приоритетного расписания треугольников
+"""
+
+import os
+import tempfile
+from types import SimpleNamespace
+
+from scheduler import TriangleScheduler
+
+HOT = ('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')
+COLD = [(f'X{i}/USDT', f'X{i}/BTC', 'BTC/USDT', 'direct') for i in range(10)]
+
+
+def entries(keys):
+    return [SimpleNamespace(triangle=key) for key in keys]
+
+
+def test_hot_triangles_scanned_more_often():
+    """Пересекающий порог треугольник попадает в каждый скан, холодные - по очереди"""
+    scheduler = TriangleScheduler(budget=3, max_skip=5, exploration=0.1, path='')
+    items = entries([HOT] + COLD)
+    counts = {}
+    for _ in range(50):
+        picked = scheduler.pick(items)
+        for entry in picked:
+            counts[entry.triangle] = counts.get(entry.triangle, 0) + 1
+        scheduler.record_scan((entry.triangle for entry in picked), {HOT: 0.8})
+
+    assert counts[HOT] == 50
+    # Каждый холодный проверялся не реже чем раз в max_skip сканов
+    assert all(counts[key] >= 50 // 5 - 1 for key in COLD)
+    assert max(counts[key] for key in COLD) < counts[HOT]
+    assert scheduler.stats[HOT].hit_rate > 0.9
+    assert scheduler.top(1)[0][0] == HOT
+
+    # Без ограничения бюджета сканируется все и в исходном порядке
+    assert TriangleScheduler(budget=0, path='').pick(items) == items
+    print("✅ Горячие треугольники сканируются чаще")
+
+
+def test_realized_pnl_lowers_priority():
+    """Фантомная прибыль: после убыточной сделки треугольник уступает место"""
+    scheduler = TriangleScheduler(budget=1, exploration=0.0, path='')
+    phantom, real = COLD[0], COLD[1]
+    for _ in range(5):
+        scheduler.record_scan([phantom, real], {phantom: 1.0, real: 0.5})
+    assert scheduler.score(phantom) > scheduler.score(real)
+    for _ in range(3):
+        scheduler.record_trade(phantom, 1.0, -0.4)
+    assert scheduler.score(phantom) < scheduler.score(real)
+    assert scheduler.pick(entries([phantom, real]))[0].triangle == real
+    print("✅ Фактическая прибыль меняет приоритет")
+
+
+def test_save_and_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scheduler.json')
+        scheduler = TriangleScheduler(path=path)
+        scheduler.record_scan([HOT], {HOT: 1.2})
+        scheduler.record_trade(HOT, 1.2, 0.9)
+        scheduler.save()
+
+        restored = TriangleScheduler(path=path)
+        assert restored.load() == 1
+        assert restored.scan == 1
+        stats = restored.stats[HOT]
+        assert stats.trades == 1 and abs(stats.reward - 0.9) < 1e-9
+        assert abs(restored.score(HOT) - scheduler.score(HOT)) < 1e-9
+    print("✅ Статистика расписания переживает рестарт")
+
+
+if __name__ == "__main__":
+    test_hot_triangles_scanned_more_often()
+    test_realized_pnl_lowers_priority()
+    test_save_and_load()
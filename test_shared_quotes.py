@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Тест таблицы котировок в общей памяти и процессов-воркеров
+"""
+
+import asyncio
+import time
+
+from shared_quotes import SharedQuoteFeed, SharedQuoteTable, shard_of
+
+
+class FakeStreamExchange:
+    """Стакан, который обновляется каждые 5 мс: bid растет, ask = bid + 1"""
+
+    has = {'watchOrderBook': True}
+
+    def __init__(self):
+        self.prices = {}
+
+    async def watch_order_book(self, symbol, limit=None):
+        await asyncio.sleep(0.005)
+        price = self.prices.get(symbol, 100.0) + 1
+        self.prices[symbol] = price
+        return {'bids': [[price, 2.0]], 'asks': [[price + 1, 3.0]], 'timestamp': time.time() * 1000}
+
+
+def fake_exchange():
+    return FakeStreamExchange()
+
+
+def test_table_seqlock():
+    """Версия строки четная после записи, id выдает только создатель, owned не переписывается"""
+    table = SharedQuoteTable(capacity=4)
+    try:
+        i = table.update('BTC/USDT', 60000.0, 60001.0, 1.0, 2.0)
+        assert table.seq[i] == 2
+        assert table.read(i)[:4] == (60000.0, 60001.0, 1.0, 2.0)
+        assert table.ages_ms()[i] < 1000 and len(table.ages_ms()) == 1
+
+        # Воркер видит ту же память по имени и пишет по выданному id
+        worker = SharedQuoteTable.attach(table.name, 4)
+        worker.register('ETH/USDT', table.symbol_id('ETH/USDT'))
+        worker.update('ETH/USDT', 3000.0, 3000.5)
+        assert table.quote('ETH/USDT') == (3000.0, 3000.5)
+        worker.close()
+
+        # Символ воркера процесс сканера не переписывает (один писатель на строку)
+        table.owned.add('ETH/USDT')
+        table.update_from_tickers({'ETH/USDT': {'bid': 1.0, 'ask': 2.0}})
+        assert table.quote('ETH/USDT') == (3000.0, 3000.5)
+
+        # Запись оборвалась на середине - чтение не зависает
+        table.seq[i] += 1
+        assert table.read(i)[0] == 60000.0
+        table.seq[i] += 1
+
+        # Воркер умер посреди записи ETH/USDT: новый воркер при регистрации выравнивает версию
+        j = table.ids['ETH/USDT']
+        table.seq[j] += 1
+        worker = SharedQuoteTable.attach(table.name, 4)
+        worker.register('ETH/USDT', j)
+        assert table.seq[j] % 2 == 0
+        worker.update('ETH/USDT', 3100.0, 3100.5, 1.0, 1.0)
+        worker.close()
+        assert table.seq[j] % 2 == 0 and table.read(j)[:2] == (3100.0, 3100.5)
+
+        table.symbol_id('SOL/USDT')
+        table.symbol_id('XRP/USDT')
+        try:
+            table.symbol_id('DOGE/USDT')
+            assert False, "таблица переполнена"
+        except ValueError:
+            pass
+        # Тикеры и подписки сверх емкости пропускаются, а не роняют скан
+        assert table.update_from_tickers({'XRP/USDT': {'bid': 0.5, 'ask': 0.6}, 'DOGE/USDT': {'bid': 0.1}}) == 1
+        assert 'DOGE/USDT' not in table and table.quote('XRP/USDT') == (0.5, 0.6)
+        feed = SharedQuoteFeed(table, workers=1)
+        assert feed.watch(['SOL/USDT', 'DOGE/USDT']) == 1 and 'DOGE/USDT' not in feed.watched
+        assert 'DOGE/USDT' not in table.owned
+    finally:
+        table.close()
+    print("✅ Таблица в общей памяти с seqlock")
+
+
+def test_workers_stream_into_table():
+    """Воркеры пишут стаканы своих шардов, сканер видит их без копирования"""
+    symbols = ['BTC/USDT', 'ETH/USDT', 'ETH/BTC', 'SOL/USDT']
+    assert {shard_of(symbol, 2) for symbol in symbols} <= {0, 1}
+    assert shard_of('BTC/USDT', 2) == shard_of('BTC/USDT', 2)
+
+    table = SharedQuoteTable(capacity=16)
+    feed = SharedQuoteFeed(table, workers=2, depth=5, exchange_factory=fake_exchange)
+    feed.start()
+    try:
+        assert feed.watch(symbols) == 4
+        assert feed.watch(symbols) == 0
+        bid = table.bid
+        deadline = time.time() + 20
+        while time.time() < deadline and not all(bid[table.ids[s]] > 101 for s in symbols):
+            time.sleep(0.05)
+        for symbol in symbols:
+            quote = table.read(table.ids[symbol])
+            assert quote[1] == quote[0] + 1, quote
+            assert quote[2] == 2.0 and quote[3] == 3.0
+        assert feed.alive() == 2
+
+        # Упавший воркер перезапускается и снова подписывается на свой шард
+        shard = feed.watched['BTC/USDT']
+        feed._processes[shard].kill()
+        feed._processes[shard].join(5)
+        assert feed.ensure_running() == 1
+        before = bid[table.ids['BTC/USDT']]
+        deadline = time.time() + 20
+        while time.time() < deadline and bid[table.ids['BTC/USDT']] == before:
+            time.sleep(0.05)
+        assert bid[table.ids['BTC/USDT']] != before
+        feed.unwatch(['SOL/USDT'])
+        assert 'SOL/USDT' not in table.owned
+    finally:
+        feed.stop()
+        table.close()
+    assert feed.alive() == 0
+    print("✅ Воркеры пишут котировки в общую память")
+
+
+if __name__ == "__main__":
+    test_table_seqlock()
+    test_workers_stream_into_table()
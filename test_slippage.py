@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Тест журнала проскальзывания по ногам
+"""
+
+import os
+import tempfile
+
+from slippage import SlippageLedger, format_slippage_summary, order_fee, slippage_bps
+from triangles import triangle_sides
+
+PATH = "USDT → BTC → ETH → USDT"
+
+
+def test_slippage_sign():
+    """Положительное проскальзывание - исполнение хуже цены сканера"""
+    assert abs(slippage_bps('buy', 100.0, 100.1) - 10.0) < 1e-9
+    assert abs(slippage_bps('sell', 100.0, 99.9) - 10.0) < 1e-9
+    assert slippage_bps('sell', 100.0, 100.2) < 0
+    assert slippage_bps('buy', 0.0, 100.0) == 0.0
+    assert triangle_sides('direct') == ('buy', 'sell', 'sell')
+    assert triangle_sides('reverse') == ('buy', 'buy', 'sell')
+    assert order_fee({'fee': {'cost': 0.1, 'currency': 'USDT'}}) == (0.1, 'USDT')
+    assert abs(order_fee({'fees': [{'cost': 0.1, 'currency': 'BTC'}, {'cost': 0.2, 'currency': 'BTC'}]})[0] - 0.3) < 1e-12
+    print("✅ Знак и комиссия считаются верно")
+
+
+def test_ledger_models_and_restore():
+    """Модели копятся по символу и стороне, переживают рестарт и дают штраф сканеру"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ledger.jsonl')
+        ledger = SlippageLedger(path, min_samples=3)
+
+        for _ in range(3):
+            fill = ledger.record_fill(PATH, 3, 'ETH/USDT', 'sell', 2000.0,
+                                      {'average': 1998.0, 'filled': 0.5, 'id': 'x',
+                                       'fee': {'cost': 0.2, 'currency': 'USDT'}}, 12.5)
+        assert abs(fill.slippage_bps - 10.0) < 1e-6
+        assert fill.fee_cost == 0.2 and fill.latency_ms == 12.5
+
+        # Улучшение цены в штраф не идет, мало исполнений - тоже
+        ledger.record_fill(PATH, 1, 'BTC/USDT', 'buy', 100.0, {'average': 99.0, 'filled': 1.0}, 5.0)
+        for _ in range(3):
+            ledger.record_fill(PATH, 2, 'ETH/BTC', 'sell', 0.05, {'average': 0.0501, 'filled': 1.0}, 5.0)
+
+        penalty = ledger.penalty_percent(('BTC/USDT', 'ETH/BTC', 'ETH/USDT'), triangle_sides('direct'))
+        assert abs(penalty - 0.1) < 1e-6
+
+        restored = SlippageLedger(path, min_samples=3)
+        assert restored.load() == 7
+        assert abs(restored.expected_bps('ETH/USDT', 'sell') - 10.0) < 1e-6
+
+        summary = restored.summary()
+        assert summary['worst'][0]['symbol'] == 'ETH/USDT'
+        print(format_slippage_summary(summary))
+    print("✅ Модели проскальзывания работают")
+
+
+if __name__ == "__main__":
+    test_slippage_sign()
+    test_ledger_models_and_restore()
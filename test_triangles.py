@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Тест построения треугольников
+"""
+
+from triangles import TriangleIndex, build_triangles, triangle_path
+
+MARKETS = {symbol: {} for symbol in [
+    'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'ETH/BTC', 'SOL/BTC', 'XYZ/USDT', 'XYZ/BTC',
+]}
+
+
+def test_build_triangles():
+    """Треугольники только из разрешенных валют и существующих пар"""
+    triangles = build_triangles(MARKETS, ['USDT'], ['BTC', 'ETH', 'SOL'])
+    assert ('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse') in triangles
+    assert ('BTC/USDT', 'SOL/BTC', 'SOL/USDT', 'reverse') in triangles
+    assert not any('XYZ/USDT' in t for t in triangles)
+    assert len(triangles) == 2
+    print(f"✅ Найдено треугольников: {len(triangles)}")
+
+
+def test_triangle_path():
+    assert triangle_path(('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse')) == "USDT → BTC → ETH → USDT"
+    print("✅ Путь треугольника")
+
+
+def test_incremental_matches_full_build():
+    """Инкрементальное добавление/удаление дает тот же набор, что и полная перестройка"""
+    bases, cryptos = ['USDT', 'BTC'], None
+    old = dict(MARKETS)
+    new = dict(MARKETS)
+    new.update({symbol: {} for symbol in ['NEW/USDT', 'NEW/BTC', 'NEW/ETH', 'SOL/ETH']})
+    new['XYZ/BTC'] = {'active': False}  # приостановлена
+    del new['ETH/BTC']                  # делистинг
+
+    index = TriangleIndex(build_triangles(old, bases, cryptos))
+    removed = index.remove_symbols(['ETH/BTC', 'XYZ/BTC'])
+    added = index.add_symbols(new, ['NEW/USDT', 'NEW/BTC', 'NEW/ETH', 'SOL/ETH'], bases, cryptos)
+
+    assert removed and added
+    assert sorted(index.triangles) == sorted(build_triangles(new, bases, cryptos))
+    assert all('ETH/BTC' not in t for t in index.triangles)
+    assert 'ETH/BTC' not in index.by_symbol
+    print(f"✅ Инкрементально: +{len(added)} / -{len(removed)}, всего {len(index)}")
+
+
+if __name__ == "__main__":
+    test_build_triangles()
+    test_triangle_path()
+    test_incremental_matches_full_build()
+    print("🎉 Все тесты треугольников пройдены")
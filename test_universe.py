@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тест торговой вселенной по ликвидности
+"""
+
+from triangles import build_triangles, triangle_currencies
+from universe import UniverseManager, pair_liquidity, usd_rates
+
+TICKERS = {
+    'BTC/USDT': {'bid': 60000.0, 'ask': 60001.0, 'quoteVolume': 50_000_000.0},
+    'ETH/USDT': {'bid': 3000.0, 'ask': 3000.5, 'quoteVolume': 20_000_000.0},
+    'ETH/BTC': {'bid': 0.05, 'ask': 0.05001, 'quoteVolume': 200.0},          # 200 BTC = 12 млн USDT
+    'SOL/USDT': {'bid': 150.0, 'ask': 150.02, 'quoteVolume': 5_000_000.0},
+    'SOL/BTC': {'bid': 0.0025, 'ask': 0.0025001, 'quoteVolume': 0.1},         # 0.1 BTC - слишком мало
+    'SOL/ETH': {'bid': 0.05, 'ask': 0.05001, 'quoteVolume': 1000.0},
+    'FTM/USDT': {'bid': 0.0, 'ask': 0.0, 'quoteVolume': 0.0},                 # делистинг
+    'FTM/BTC': {'bid': 0.00001, 'ask': 0.0000101, 'quoteVolume': 0.0},
+    'DOGE/USDT': {'bid': 0.1, 'ask': 0.11, 'quoteVolume': 3_000_000.0},       # спред ~950 б.п.
+}
+MARKETS = {symbol: {'active': True} for symbol in TICKERS}
+
+
+def test_pair_liquidity():
+    """Объем пересчитывается в USDT, пары без котировки или объема - мертвые"""
+    rates = usd_rates(TICKERS)
+    assert rates['USDT'] == 1.0
+    assert abs(rates['BTC'] - 60000.5) < 1e-9
+    assert 'FTM' not in rates
+
+    pair = pair_liquidity('ETH/BTC', TICKERS['ETH/BTC'], rates)
+    assert abs(pair.volume_usd - 200 * 60000.5) < 1e-6
+    assert abs(pair.spread_bps - 2.0) < 0.01
+    assert pair.depth_usd == 0.0
+
+    assert pair_liquidity('FTM/USDT', TICKERS['FTM/USDT'], rates) is None
+    assert pair_liquidity('FTM/BTC', TICKERS['FTM/BTC'], rates) is None
+    assert pair_liquidity('XYZ/ABC', {'bid': 1.0, 'ask': 1.1, 'quoteVolume': 1e9}, rates) is None
+
+    # Без quoteVolume объем считается из baseVolume
+    pair = pair_liquidity('SOL/USDT', {'bid': 150.0, 'ask': 150.0, 'baseVolume': 100.0}, rates)
+    assert pair.volume_usd == 15000.0
+    print("✅ Ликвидность пар считается")
+
+
+def test_rank_and_select():
+    """Фильтр пар, порядок валют, лучшие и вытесненные треугольники"""
+    manager = UniverseManager(max_triangles=2, min_volume_usd=50_000, max_spread_bps=50,
+                              min_depth_usd=1000)
+    live = manager.rank_pairs(TICKERS, MARKETS)
+    assert set(live) == {'BTC/USDT', 'ETH/USDT', 'ETH/BTC', 'SOL/USDT', 'SOL/ETH'}
+
+    # Глубина проверяется, только если тикер отдал объемы лучших уровней
+    shallow = dict(TICKERS, **{'SOL/ETH': dict(TICKERS['SOL/ETH'], bidVolume=0.1, askVolume=0.1)})
+    assert 'SOL/ETH' not in manager.rank_pairs(shallow, MARKETS)
+
+    assert manager.select_currencies(live) == ['BTC', 'ETH', 'SOL']
+
+    triangles = build_triangles(MARKETS, ['USDT'], None)
+    universe = manager.refresh(TICKERS, MARKETS, triangles)
+    assert len(universe.triangles) == 2
+    # BTC-ETH: самая слабая нога 12 млн, ETH-SOL: 3 млн
+    assert universe.triangles[0][:3] == ('BTC/USDT', 'ETH/BTC', 'ETH/USDT')
+    assert all('FTM/USDT' in t or 'SOL/BTC' in t for t in universe.evicted)
+    assert any('FTM/USDT' in t for t in universe.evicted)
+    assert manager.triangle_score(universe.triangles[0]) > manager.triangle_score(universe.triangles[1])
+    assert not manager.is_due(900)
+
+    # Пара умерла - в следующем пересчете она в dead_symbols
+    dead = dict(TICKERS, **{'SOL/ETH': {'bid': 0.0, 'ask': 0.0}})
+    universe = manager.refresh(dead, MARKETS, triangles)
+    assert universe.dead_symbols == {'SOL/ETH'}
+    assert all('SOL/ETH' not in t for t in universe.triangles)
+
+    # Без снимка тикеров отбор ничего не вытесняет
+    assert UniverseManager().select(triangles) == (triangles, [])
+    print("✅ Вселенная отбирает ликвидные треугольники")
+
+
+def test_triangle_currencies():
+    triangles = [('BTC/USDT', 'ETH/BTC', 'ETH/USDT', 'reverse'), ('SOL/USDT', 'SOL/ETH', 'ETH/USDT', 'direct')]
+    assert triangle_currencies(triangles) == ['BTC', 'ETH', 'SOL']
+    print("✅ Валюты треугольников")
+
+
+if __name__ == "__main__":
+    test_pair_liquidity()
+    test_rank_and_select()
+    test_triangle_currencies()
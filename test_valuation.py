@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Тест оценки портфеля по одному снимку тикеров
+"""
+
+from valuation import free_balances, value_portfolio
+
+
+TICKERS = {
+    'BTC/USDT': {'bid': 60000.0, 'ask': 60010.0, 'last': 60005.0},
+    'ETH/USDT': {'bid': 3000.0, 'ask': 3001.0, 'last': 3000.5},
+    'ETH/BTC': {'bid': 0.0502, 'ask': 0.0503, 'last': 0.05025},
+    'XYZ/BTC': {'bid': 0.0001, 'ask': 0.00011, 'last': 0.000105},
+    'ABC/ETH': {'bid': None, 'ask': None, 'last': 0.5},
+}
+
+
+def test_free_balances_skips_service_keys():
+    """Тест разбора ответа fetch_balance"""
+    balance = {
+        'info': {'balances': []},
+        'timestamp': None,
+        'datetime': None,
+        'free': {'USDT': 10.0},
+        'total': {'USDT': 10.0},
+        'USDT': {'free': 10.0, 'used': 0.0, 'total': 10.0},
+        'DUST': {'free': 0.0001, 'used': 0.0, 'total': 0.0001},
+    }
+    assert free_balances(balance, min_amount=0.001) == {'USDT': 10.0}
+    print("✅ Служебные ключи пропущены")
+
+
+def test_value_portfolio_routes_through_cheapest_path():
+    """Тест оценки монет без прямой пары /USDT"""
+    balances = {'USDT': 100.0, 'BTC': 0.01, 'XYZ': 1000.0, 'ABC': 10.0, 'NOPE': 5.0}
+    valuation = value_portfolio(balances, TICKERS, 'USDT')
+
+    values = {a.currency: a for a in valuation.assets}
+    # BTC напрямую по bid
+    assert abs(values['BTC'].value - 600.0) < 1e-9
+    assert values['BTC'].path == ['BTC', 'USDT']
+    # XYZ через BTC
+    assert abs(values['XYZ'].value - 1000 * 0.0001 * 60000) < 1e-6
+    assert values['XYZ'].path == ['XYZ', 'BTC', 'USDT']
+    assert not values['XYZ'].is_direct
+    # ABC без стакана оценивается по last, ETH выгоднее продать через BTC (0.0502 * 60000 > 3000)
+    assert abs(values['ABC'].value - 10 * 0.5 * 0.0502 * 60000) < 1e-6
+    assert values['ABC'].path == ['ABC', 'ETH', 'BTC', 'USDT']
+    assert valuation.unpriced == ['NOPE']
+    assert abs(valuation.total - sum(a.value for a in valuation.assets)) < 1e-9
+    print(f"💵 Общая стоимость: {valuation.total:.2f} USDT")
+    print("✅ Оценка через граф рынков работает")
+
+
+if __name__ == "__main__":
+    print("💰 ТЕСТ ОЦЕНКИ ПОРТФЕЛЯ")
+    print("=" * 40)
+    test_free_balances_skips_service_keys()
+    test_value_portfolio_routes_through_cheapest_path()
+    print("🔺 Тест завершен")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Тест шардирования подписок WebSocket и переподключения замолчавших соединений
+"""
+
+import asyncio
+import itertools
+
+from quote_store import QuoteStore
+from ws_supervisor import WsSupervisor
+
+_counter = itertools.count()
+
+
+class FakeConnection:
+    """Одно соединение ccxt.pro: frozen - сокет молча перестал присылать данные"""
+
+    has = {'watchOrderBook': True}
+
+    def __init__(self):
+        self.number = next(_counter)
+        self.frozen = False
+        self.closed = False
+        self.price = 100.0
+
+    async def watch_order_book(self, symbol, limit=None):
+        await asyncio.sleep(0.005)
+        while self.frozen:
+            await asyncio.sleep(1)
+        self.price += 0.01
+        return {'bids': [[self.price, 1.0]], 'asks': [[self.price + 0.1, 1.0]], 'timestamp': 0}
+
+    async def close(self):
+        self.closed = True
+
+
+def test_sharding_and_reconnect():
+    """Символы делятся по соединениям; замолчавшее помечает котировки устаревшими и пересоздается"""
+    async def scenario():
+        quotes = QuoteStore()
+        reconnects = []
+        supervisor = WsSupervisor(FakeConnection, quotes, depth=5, per_connection=2,
+                                  gap_timeout=0.2, check_interval=0.05, backoff_base=0.05,
+                                  on_reconnect=lambda: reconnects.append(1))
+        symbols = ['BTC/USDT', 'ETH/USDT', 'ETH/BTC', 'SOL/USDT', 'SOL/BTC']
+        supervisor.watch(symbols)
+        assert [len(shard.symbols) for shard in supervisor.shards] == [2, 2, 1]
+        assert len({id(shard.exchange) for shard in supervisor.shards}) == 3
+        assert await supervisor.wait_ready(symbols, 2.0)
+        await asyncio.sleep(0.15)
+        assert all(connection['rate'] > 0 for connection in supervisor.stats())
+
+        # Соединение 0 замолчало без ошибки
+        frozen = supervisor.shards[0]
+        old_exchange = frozen.exchange
+        old_exchange.frozen = True
+        await asyncio.sleep(0.3)
+        assert frozen.down or frozen.restarts == 1
+        if frozen.down:
+            # Пока шард лежит, его котировки бесконечно старые, а стаканы недоступны
+            ages = quotes.ages_ms()
+            assert all(ages[quotes.ids[s]] == float('inf') for s in frozen.symbols)
+            assert supervisor.book(frozen.symbols[0]) is None
+        for _ in range(100):
+            if not frozen.down and frozen.restarts == 1:
+                break
+            await asyncio.sleep(0.02)
+        assert frozen.restarts == 1 and reconnects
+        assert old_exchange.closed and frozen.exchange is not old_exchange
+        assert await supervisor.wait_ready(frozen.symbols, 2.0)
+        ages = quotes.ages_ms()
+        assert all(ages[quotes.ids[s]] < 1000 for s in frozen.symbols)
+        # Остальные соединения не трогали
+        assert supervisor.shards[1].restarts == 0
+
+        supervisor.unwatch(['SOL/BTC'])
+        assert supervisor.shards[2].symbols == []
+        await supervisor.stop()
+
+    asyncio.run(scenario())
+    print("✅ Замолчавшее соединение переподключается")
+
+
+def test_connection_limit_evicts_oldest():
+    async def scenario():
+        supervisor = WsSupervisor(FakeConnection, QuoteStore(), per_connection=2, max_connections=1)
+        supervisor.watch(['A/USDT', 'B/USDT'])
+        supervisor.watch(['A/USDT'])            # A снова нужен - вытесняется B
+        supervisor.watch(['C/USDT'])
+        assert list(supervisor.by_symbol) == ['A/USDT', 'C/USDT']
+        assert supervisor.max_symbols == 2
+        await supervisor.stop()
+
+    asyncio.run(scenario())
+    print("✅ При лимите соединений вытесняется давно не нужный символ")
+
+
+def test_backoff_jitter():
+    supervisor = WsSupervisor(FakeConnection, QuoteStore(), backoff_base=1.0, backoff_max=60.0)
+    delays = {round(supervisor.backoff(3), 6) for _ in range(20)}
+    assert len(delays) > 1 and all(4.0 <= d <= 8.0 for d in delays)
+    assert supervisor.backoff(20) <= 60.0
+    print("✅ Пауза переподключения с разбросом")
+
+
+if __name__ == "__main__":
+    test_sharding_and_reconnect()
+    test_connection_limit_evicts_oldest()
+    test_backoff_jitter()
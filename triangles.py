@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Построение треугольников из списка рынков
+Треугольник: (pair1, pair2, pair3, direction) для пути base -> crypto1 -> crypto2 -> base
+"""
+
+import itertools
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+Triangle = Tuple[str, str, str, str]
+
+# Основные валюты для треугольников
+BASE_CURRENCIES = ['USDT', 'BTC', 'ETH']
+
+# Популярные криптовалюты
+CRYPTO_CURRENCIES = [
+    'BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX',
+    'MATIC', 'LINK', 'UNI', 'LTC', 'BCH', 'ATOM', 'FTM', 'NEAR',
+    'ALGO', 'VET', 'ICP', 'SAND', 'MANA', 'CRV', 'AAVE', 'COMP'
+]
+
+
+def is_tradable(market: Mapping) -> bool:
+    """Пара не приостановлена биржей"""
+    return market.get('active') is not False
+
+
+def currencies_for_base(markets: Iterable[str], base: str,
+                        crypto_currencies: Optional[Iterable[str]] = CRYPTO_CURRENCIES) -> List[str]:
+    """Валюты из crypto_currencies (None - любые), торгующиеся к base"""
+    allowed = set(crypto_currencies) if crypto_currencies is not None else None
+    result = []
+    suffix = f'/{base}'
+    for symbol in markets:
+        if '/' in symbol and symbol.endswith(suffix):
+            crypto = symbol.split('/')[0]
+            if (allowed is None or crypto in allowed) and crypto != base:
+                result.append(crypto)
+    return result
+
+
+def _pair_triangles(markets: Mapping[str, Mapping], base: str, crypto1: str, crypto2: str) -> List[Triangle]:
+    """Треугольники base -> crypto1 -> crypto2 -> base"""
+    pair1 = f"{crypto1}/{base}"      # BTC/USDT
+    pair2 = f"{crypto1}/{crypto2}"   # BTC/ETH
+    pair3 = f"{crypto2}/{base}"      # ETH/USDT
+    pair2_alt = f"{crypto2}/{crypto1}"  # ETH/BTC
+
+    triangles = []
+    if pair1 in markets and pair2 in markets and pair3 in markets:
+        triangles.append((pair1, pair2, pair3, 'direct'))
+    if pair1 in markets and pair2_alt in markets and pair3 in markets:
+        triangles.append((pair1, pair2_alt, pair3, 'reverse'))
+    return triangles
+
+
+def build_triangles(markets: Mapping[str, Mapping], base_currencies: Iterable[str] = BASE_CURRENCIES,
+                    crypto_currencies: Optional[Iterable[str]] = CRYPTO_CURRENCIES) -> List[Triangle]:
+    """Все треугольники, для которых существуют три пары"""
+    crypto_currencies = list(crypto_currencies) if crypto_currencies is not None else None
+    markets = {symbol: market for symbol, market in markets.items() if is_tradable(market)}
+    triangles: List[Triangle] = []
+
+    for base in base_currencies:
+        base_pairs = currencies_for_base(markets.keys(), base, crypto_currencies)
+        for crypto1, crypto2 in itertools.combinations(base_pairs, 2):
+            triangles.extend(_pair_triangles(markets, base, crypto1, crypto2))
+
+    return triangles
+
+
+def triangle_path(triangle: Triangle) -> str:
+    """Путь треугольника для логов: USDT → BTC → ETH → USDT"""
+    pair1, _pair2, pair3, _direction = triangle
+    base = pair1.split('/')[1]
+    crypto1 = pair1.split('/')[0]
+    crypto2 = pair3.split('/')[0]
+    return f"{base} → {crypto1} → {crypto2} → {base}"
+
+
+def triangle_currencies(triangles: Iterable[Triangle]) -> List[str]:
+    """Валюты crypto1/crypto2 треугольников в порядке появления"""
+    seen: Dict[str, None] = {}
+    for pair1, _pair2, pair3, _direction in triangles:
+        seen.setdefault(pair1.split('/')[0])
+        seen.setdefault(pair3.split('/')[0])
+    return list(seen)
+
+
+def triangle_sides(direction: str) -> Tuple[str, str, str]:
+    """Стороны ног треугольника: direct продает crypto1 во второй ноге, reverse покупает crypto2"""
+    return ('buy', 'sell' if direction == 'direct' else 'buy', 'sell')
+
+
+class TriangleIndex:
+    """
+    Живой список треугольников с индексом по парам.
+    Изменения рынков применяются инкрементально: удаляются только треугольники
+    с исчезнувшими парами, добавляются только треугольники с новыми парами.
+    Список triangles заменяется целиком, поэтому идущий скан видит согласованную копию.
+    """
+
+    def __init__(self, triangles: Iterable[Triangle] = ()):
+        self.triangles: List[Triangle] = []
+        self.by_symbol: Dict[str, Set[Triangle]] = {}
+        self._add(list(triangles))
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    def __contains__(self, triangle: Triangle) -> bool:
+        return triangle in self.by_symbol.get(triangle[0], ())
+
+    def _add(self, triangles: List[Triangle]):
+        self.triangles = self.triangles + triangles
+        for triangle in triangles:
+            for symbol in triangle[:3]:
+                self.by_symbol.setdefault(symbol, set()).add(triangle)
+
+    def remove_symbols(self, symbols: Iterable[str]) -> List[Triangle]:
+        """Убрать треугольники, содержащие любую из пар"""
+        doomed: Set[Triangle] = set()
+        for symbol in symbols:
+            doomed |= self.by_symbol.get(symbol, set())
+        if not doomed:
+            return []
+        for triangle in doomed:
+            for symbol in triangle[:3]:
+                bucket = self.by_symbol.get(symbol)
+                if bucket is not None:
+                    bucket.discard(triangle)
+                    if not bucket:
+                        del self.by_symbol[symbol]
+        removed = [t for t in self.triangles if t in doomed]
+        self.triangles = [t for t in self.triangles if t not in doomed]
+        return removed
+
+    def add_symbols(self, markets: Mapping[str, Mapping], symbols: Iterable[str],
+                    base_currencies: Iterable[str] = BASE_CURRENCIES,
+                    crypto_currencies: Optional[Iterable[str]] = CRYPTO_CURRENCIES) -> List[Triangle]:
+        """
+        Добавить треугольники, в которые входит хотя бы одна из новых пар.
+        Перебираются только пары валют, затронутые новыми рынками, в том же
+        порядке, что и в build_triangles.
+        """
+        symbols = {s for s in symbols if '/' in s}
+        if not symbols:
+            return []
+        base_currencies = list(base_currencies)
+        crypto_currencies = list(crypto_currencies) if crypto_currencies is not None else None
+        markets = {symbol: market for symbol, market in markets.items() if is_tradable(market)}
+
+        base_pairs = {base: currencies_for_base(markets.keys(), base, crypto_currencies) for base in base_currencies}
+        positions = {base: {crypto: i for i, crypto in enumerate(pairs)} for base, pairs in base_pairs.items()}
+
+        affected: Set[Tuple[str, str, str]] = set()
+        for symbol in symbols:
+            first, second = symbol.split('/', 1)
+            # Новая пара как первая/третья нога: first/base
+            if second in positions and first in positions[second]:
+                for other in base_pairs[second]:
+                    if other != first:
+                        affected.add((second,) + tuple(sorted((first, other), key=positions[second].get)))
+            # Новая пара как средняя нога: first/second при обеих валютах, торгующихся к base
+            for base, pos in positions.items():
+                if first in pos and second in pos:
+                    affected.add((base,) + tuple(sorted((first, second), key=pos.get)))
+
+        added = []
+        for base, crypto1, crypto2 in sorted(affected):
+            for triangle in _pair_triangles(markets, base, crypto1, crypto2):
+                if triangle not in self and triangle not in added:
+                    added.append(triangle)
+        self._add(added)
+        return added
@@ -7,13 +7,35 @@
 import asyncio
 import ccxt.pro as ccxt
 import time
-import itertools
 import os
 import sys
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
 from dataclasses import dataclass
+from ccxt.base.errors import DDoSProtection, RateLimitExceeded
+
+from cycles import STABLE_CURRENCIES, CycleSearch, build_currency_graph
+from inventory import InventoryLedger, plan_batch
+from latency import LatencyTrace, LatencyTracker, format_latency_summary
+from log_pipeline import dropped_records, setup_async_logging
+from maker_leg import MakerLegStrategy, choose_maker_leg, leg_currencies, leg_rate
+from market_cache import MarketCache, MarketDiff, diff_markets, markets_hash, triangles_config_key
+from metrics import ArbitrageMetrics, MetricsServer
+from negative_cycles import NegativeCycleDetector, RateGraph
+from opportunity_analytics import (LifetimeSampler, OpportunityAnalytics, cycle_depth, episode_key,
+                                   format_lifetime_summary, net_edge_percent, triangle_depth)
+from quote_store import QuoteStore, compile_cycles, compile_triangles, freshness_score
+from rate_limiter import PUBLIC, ENDPOINT_WEIGHTS, RateLimitedExchange, get_rate_limiter
+from scheduler import TriangleScheduler
+from shared_quotes import SharedQuoteFeed, SharedQuoteTable
+from ws_supervisor import MEXC_SUBSCRIPTIONS_PER_CONNECTION, WsSupervisor, mexc_exchange
+from revalidation import revalidate
+from slippage import LegFill, SlippageLedger, format_slippage_summary
+from triangles import (BASE_CURRENCIES, CRYPTO_CURRENCIES, TriangleIndex, build_triangles, triangle_currencies,
+                       triangle_path)
+from universe import UniverseManager
+from valuation import free_balances
 
 # Загружаем переменные окружения
 try:
@@ -32,18 +54,37 @@ class Trade:
     price: float
     timestamp: datetime
     order_id: str
+    leg: int = 0  # номер ноги в цикле (с 1): мейкер-стратегия исполняет ноги не по порядку
 
-@dataclass
+@dataclass(slots=True)
 class TriangularOpportunity:
     """Треугольная возможность"""
     path: str
-    triangle: Tuple[str, str, str, str]  # pair1, pair2, pair3, direction
+    triangle: Tuple[str, ...]  # pair1, pair2, pair3, direction; у цикла - пары ног и 'cycle'
     profit_percent: float
     profit_usd: float
     net_profit_percent: float
     net_profit_usd: float
     fees_usd: float
-    prices: Dict[str, Dict[str, float]]
+    legs: Tuple[int, ...]  # id символов в QuoteStore
+    leg_prices: Tuple[float, ...]  # цены исполнения ног: ask для покупки, bid для продажи
+    sides: Tuple[str, ...]  # buy/sell по ногам
+    freshness: float = 1.0  # 1.0 - все котировки новые, 0.0 - на пределе MAX_QUOTE_AGE_MS
+    slippage_percent: float = 0.0  # ожидаемое проскальзывание ног, уже вычтенное из net_profit
+    trace: Optional[LatencyTrace] = None  # метки этапов tick-to-trade
+    maker_leg: Optional[int] = None  # номер ноги с post-only ордером (EXECUTION_STRATEGY=maker)
+    
+    @property
+    def symbols(self) -> Tuple[str, ...]:
+        return self.triangle[:-1]
+    
+    @property
+    def key(self) -> str:
+        return f"{self.path} ({self.triangle[-1]})"
+    
+    @property
+    def start_currency(self) -> str:
+        return self.path.split(' → ')[0]
 
 class TriangularArbitrageBot:
     """Бот треугольного арбитража"""
@@ -54,6 +95,72 @@ class TriangularArbitrageBot:
         self.markets = {}
         self.valid_triangles = []
         
+        # Кэш рынков и треугольников на диске: старт без ожидания load_markets
+        self.market_cache = MarketCache()
+        self.markets_hash = None
+        self.market_refresh_task = None
+        
+        # Котировки в массивах по id символа и треугольники, скомпилированные в индексы ног
+        # QUOTE_WORKERS > 0: стаканы разбирают процессы-воркеры, котировки - в общей памяти
+        self.quote_workers = int(os.getenv('QUOTE_WORKERS', '0'))
+        if self.quote_workers > 0:
+            self.quotes = SharedQuoteTable(int(os.getenv('QUOTE_TABLE_CAPACITY', '4096')))
+        else:
+            self.quotes = QuoteStore()
+        self.quote_feed = None
+        self.max_quote_age_ms = float(os.getenv('MAX_QUOTE_AGE_MS', '10000'))  # 0 - не проверять
+        
+        # Перепроверка лучшего треугольника по потоковому стакану перед первой ногой
+        self.revalidate_enabled = os.getenv('REVALIDATE_BEFORE_TRADE', 'true').lower() == 'true'
+        self.book_depth = int(os.getenv('BOOK_DEPTH', '10'))
+        self.book_wait_ms = float(os.getenv('BOOK_WAIT_MS', '1500'))
+        self.book_feed = None
+        # Стаканы раскладываются по нескольким соединениям; замолчавшее переподключается
+        self.ws_max_connections = int(os.getenv('WS_MAX_CONNECTIONS', '10'))
+        self.ws_per_connection = int(os.getenv('WS_SUBSCRIPTIONS_PER_CONNECTION', str(MEXC_SUBSCRIPTIONS_PER_CONNECTION)))
+        self.ws_gap_timeout = float(os.getenv('WS_GAP_TIMEOUT', '15'))
+        self._compiled_triangles = []
+        self._compiled_source = None
+        
+        # Живой индекс треугольников и фоновая перезагрузка рынков
+        self.triangle_index = TriangleIndex()
+        triangle_currencies = os.getenv('TRIANGLE_CURRENCIES', '')
+        self.triangle_currencies = self.parse_triangle_currencies(triangle_currencies)
+        
+        # Вселенная по ликвидности: сканируются лучшие UNIVERSE_MAX_TRIANGLES живых треугольников,
+        # а при TRIANGLE_CURRENCIES пусто/auto и сами валюты выбираются по объему
+        self.universe_auto = triangle_currencies.strip().lower() in ('', 'auto')
+        self.universe = UniverseManager(
+            max_triangles=int(os.getenv('UNIVERSE_MAX_TRIANGLES', '300')),
+            max_currencies=int(os.getenv('UNIVERSE_MAX_CURRENCIES', '60')),
+            min_volume_usd=float(os.getenv('UNIVERSE_MIN_VOLUME_USD', '50000')),
+            max_spread_bps=float(os.getenv('UNIVERSE_MAX_SPREAD_BPS', '50')),
+            min_depth_usd=float(os.getenv('UNIVERSE_MIN_DEPTH_USD', '0')),
+        )
+        self.universe_refresh_interval = float(os.getenv('UNIVERSE_REFRESH_INTERVAL', '900'))
+        self.market_refresh_interval = float(os.getenv('MARKET_REFRESH_INTERVAL', '600'))
+        self.market_refresh_loop_task = None
+        
+        # Циклы из 4-5 ног (через USDC/USDT, USDT/EUR и т.п.): перебор с отсечением по котировкам
+        self.cycle_max_legs = int(os.getenv('CYCLE_MAX_LEGS', '5'))  # 3 - только треугольники
+        self.cycle_search = CycleSearch(
+            max_legs=self.cycle_max_legs,
+            max_cycles=int(os.getenv('CYCLE_MAX_CANDIDATES', '2000')),
+            slack_percent=float(os.getenv('CYCLE_PRUNE_SLACK', '1.0')),
+        )
+        self.cycle_refresh_interval = float(os.getenv('CYCLE_REFRESH_INTERVAL', '600'))
+        self.cycles = []
+        self._cycles_refreshed = None
+        self._compiled_cycles = []
+        self._compiled_cycles_source = None
+        
+        # Отрицательные циклы на графе курсов всей биржи (SPFA) - без заранее перечисленных циклов
+        self.negative_cycles_enabled = os.getenv('NEGATIVE_CYCLE_DETECTOR', 'true').lower() == 'true'
+        self.negative_cycle_max_legs = int(os.getenv('NEGATIVE_CYCLE_MAX_LEGS', '5'))
+        self.rate_graph = None
+        self.rate_graph_pairs = None  # вселенная, по которой построен граф
+        self.cycle_detector = None
+        
         # Загружаем настройки из файла управления
         self.load_control_settings()
         
@@ -80,6 +187,51 @@ class TriangularArbitrageBot:
             'cycles': 0
         }
         
+        # Метрики Prometheus (эндпоинт /metrics включается через METRICS_PORT)
+        self.metrics = ArbitrageMetrics()
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        self.metrics_server = None
+        self.log_records_dropped = 0  # уже учтено в метрике
+        
+        # Поэтапные задержки tick-to-trade по каждому треугольнику
+        self.latency = LatencyTracker()
+        
+        # Сколько живет возможность выше порога - по треугольникам и базовым валютам
+        self.opportunity_analytics = OpportunityAnalytics()
+        # Между сканами эпизоды ведутся по потоковым котировкам: пересчет треугольников с обновленной ногой
+        self.lifetime_sampler = LifetimeSampler(self.opportunity_analytics, self.quotes)
+        self.lifetime_sample_interval = float(os.getenv('LIFETIME_SAMPLE_MS', '200')) / 1000
+        self.lifetime_task = None
+        
+        # Журнал ожидаемой и фактической цены по каждой ноге; модели вычитаются из прибыли сканера
+        self.slippage = SlippageLedger()
+        self.slippage_adjust = os.getenv('SLIPPAGE_ADJUST', 'true').lower() not in ('0', 'false', 'no')
+        
+        # Приоритет треугольников по истории пересечений порога и фактической прибыли:
+        # при ограниченном бюджете запросов сканируются горячие треугольники и просроченные холодные
+        self.scheduler = TriangleScheduler(
+            budget=int(os.getenv('SCHEDULER_BUDGET', '50')),
+            max_skip=int(os.getenv('SCHEDULER_MAX_SKIP', '20')),
+            exploration=float(os.getenv('SCHEDULER_EXPLORATION', '0.5')),
+        )
+        self.scheduler_mode = os.getenv('SCHEDULER_MODE', 'auto').lower()  # auto / always / off
+        self.rate_limiter = get_rate_limiter()
+        
+        # Пул исполнения: до MAX_CONCURRENT_TRIANGLES треугольников без общих ног одновременно,
+        # каждый резервирует свою позицию из свободного баланса (1 - по одному, как раньше)
+        self.max_concurrent_triangles = int(os.getenv('MAX_CONCURRENT_TRIANGLES', '3'))
+        self.inventory = InventoryLedger()
+        
+        # Стратегия исполнения: taker - все ноги маркет-ордерами, maker - post-only ордер на
+        # наименее ликвидной ноге, остальные IOC после его исполнения. Комиссии - доли за ногу
+        self.execution_strategy = os.getenv('EXECUTION_STRATEGY', 'taker').lower()
+        self.taker_fee = float(os.getenv('TAKER_FEE', '0.002'))
+        self.maker_fee = float(os.getenv('MAKER_FEE', '0.0'))
+        self.maker_reprice_bps = float(os.getenv('MAKER_REPRICE_BPS', '5'))
+        self.maker_timeout = float(os.getenv('MAKER_TIMEOUT', '30'))
+        self.maker_ioc_slippage_bps = float(os.getenv('MAKER_IOC_SLIPPAGE_BPS', '10'))
+        self.maker_max_depth_bps = float(os.getenv('MAKER_MAX_DEPTH_BPS', '20'))
+        
         self.setup_logging()
         self.is_running = False
         
@@ -128,6 +280,19 @@ class TriangularArbitrageBot:
             if hasattr(self, 'logger'):
                 self.logger.warning(f"⚠️ Ошибка загрузки настроек управления: {e}")
     
+    @staticmethod
+    def parse_triangle_currencies(value: str):
+        """
+        TRIANGLE_CURRENCIES: пусто/auto - по ликвидности (до первого пересчета - популярные валюты),
+        all - любые, иначе список через запятую
+        """
+        value = value.strip()
+        if not value or value.lower() == 'auto':
+            return CRYPTO_CURRENCIES
+        if value.lower() == 'all':
+            return None
+        return [currency.strip().upper() for currency in value.split(',') if currency.strip()]
+    
     def update_stats_to_control(self):
         """Обновление статистики в файле управления"""
         try:
@@ -141,6 +306,9 @@ class TriangularArbitrageBot:
                 control_settings['successful_trades'] = self.stats['successful_trades']
                 control_settings['total_profit'] = self.stats['total_profit']
                 control_settings['bot_running'] = self.is_running
+                control_settings['latency'] = self.latency.summary()
+                control_settings['opportunity_lifetimes'] = self.opportunity_analytics.summary()
+                control_settings['slippage'] = self.slippage.summary()
                 
                 with open('triangular_settings.json', 'w', encoding='utf-8') as f:
                     json.dump(control_settings, f, indent=2, ensure_ascii=False)
@@ -148,15 +316,8 @@ class TriangularArbitrageBot:
             self.logger.warning(f"⚠️ Ошибка обновления статистики: {e}")
     
     def setup_logging(self):
-        """Настройка логирования"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('triangular_arbitrage.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Настройка логирования (очередь + фоновая запись с ротацией)"""
+        setup_async_logging('triangular_arbitrage.log')
         self.logger = logging.getLogger(__name__)
     
     async def initialize(self):
@@ -176,18 +337,29 @@ class TriangularArbitrageBot:
             self.logger.warning("⚠️ API ключи кажутся короткими")
         
         try:
-            self.exchange = ccxt.mexc({
+            # Лимиты соблюдает общий менеджер по весам эндпоинтов MEXC, а не фиксированный rateLimit ccxt
+            self.exchange = RateLimitedExchange(ccxt.mexc({
                 'apiKey': api_key,
                 'secret': api_secret,
                 'sandbox': sandbox,
-                'enableRateLimit': True,
-                'rateLimit': 1000,
+                'enableRateLimit': False,
                 'options': {'defaultType': 'spot'}
-            })
+            }), self.rate_limiter)
             
-            # Загружаем рынки
-            self.markets = await self.exchange.load_markets()
-            self.logger.info(f"✅ Загружено {len(self.markets)} торговых пар MEXC")
+            # Рынки из кэша - сразу, из сети - в фоне; без кэша ждем загрузку
+            if not await self.load_markets_from_cache():
+                await self.refresh_markets()
+            
+            fills = self.slippage.load()
+            if fills:
+                self.logger.info("📉 Модели проскальзывания восстановлены из %d исполнений", fills)
+            if self.quote_workers > 0:
+                self.quote_feed = SharedQuoteFeed(self.quotes, self.quote_workers, self.book_depth)
+                self.quote_feed.start()
+            
+            scheduled = self.scheduler.load()
+            if scheduled:
+                self.logger.info("🎯 Статистика расписания восстановлена для %d треугольников", scheduled)
             
             # Инициализация Telegram
             if self.telegram_token and self.telegram_chat_id:
@@ -197,67 +369,125 @@ class TriangularArbitrageBot:
             else:
                 self.logger.warning("⚠️ Telegram не настроен - токен или chat_id отсутствуют")
             
-            # Генерируем треугольники
-            await self.generate_triangles()
-            
             return True
             
         except Exception as e:
             self.logger.error(f"❌ Ошибка инициализации MEXC: {e}")
             return False
     
-    async def generate_triangles(self):
-        """Генерация треугольников"""
-        self.logger.info("🔺 Генерация треугольных возможностей...")
-        
-        # Основные валюты для треугольников
-        base_currencies = ['USDT', 'BTC', 'ETH']
-        
-        # Популярные криптовалюты
-        crypto_currencies = [
-            'BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX',
-            'MATIC', 'LINK', 'UNI', 'LTC', 'BCH', 'ATOM', 'FTM', 'NEAR',
-            'ALGO', 'VET', 'ICP', 'SAND', 'MANA', 'CRV', 'AAVE', 'COMP'
-        ]
+    @property
+    def triangles_config_key(self) -> str:
+        # Валюты вселенной меняются на ходу - в кэше лежат треугольники последнего пересчета
+        return triangles_config_key(BASE_CURRENCIES, ['auto'] if self.universe_auto else self.triangle_currencies)
+    
+    def _set_triangles(self, triangles):
+        self.triangle_index = TriangleIndex(triangles)
+        self._select_scanned()
+    
+    def _select_scanned(self):
+        """Сканируемые треугольники: лучшие живые по ликвидности (до первого пересчета - все)"""
+        if self.universe.max_triangles > 0:
+            self.valid_triangles, _evicted = self.universe.select(self.triangle_index.triangles)
+        else:
+            self.valid_triangles = self.triangle_index.triangles
+        self.metrics.valid_triangles.set(len(self.valid_triangles))
+    
+    async def load_markets_from_cache(self) -> bool:
+        """Рынки и треугольники из дискового кэша; устаревший кэш обновляется в фоне"""
+        cached = self.market_cache.load(self.triangles_config_key)
+        if cached is None:
+            return False
         
-        self.valid_triangles = []
+        self.exchange.set_markets(cached.markets)
+        self.markets = self.exchange.markets
+        self.markets_hash = cached.markets_hash
+        if self.universe_auto and cached.triangles:
+            self.triangle_currencies = triangle_currencies(cached.triangles)
+        self._set_triangles(cached.triangles)
+        self.logger.info("⚡ Из кэша: %d пар, %d треугольников (возраст %.0f мин)",
+                         len(self.markets), len(self.valid_triangles), cached.age / 60)
         
-        for base in base_currencies:
-            # Находим пары с этой базовой валютой
-            base_pairs = []
-            for symbol in self.markets.keys():
-                if '/' in symbol and symbol.endswith(f'/{base}'):
-                    crypto = symbol.split('/')[0]
-                    if crypto in crypto_currencies and crypto != base:
-                        base_pairs.append(crypto)
+        if not self.market_cache.is_fresh(cached):
+            self.market_refresh_task = asyncio.create_task(self.refresh_markets())
+        return True
+    
+    async def refresh_markets(self):
+        """
+        Загрузить рынки с биржи и обновить треугольники: при первой загрузке - полностью,
+        дальше - инкрементально по разнице рынков, не останавливая сканирование
+        """
+        try:
+            markets = await self.exchange.load_markets(True)
+            digest = markets_hash(markets)
+            if digest == self.markets_hash and len(self.triangle_index):
+                self.markets = markets
+                # Рынки подтверждены биржей - кэш снова свежий для следующего рестарта
+                if not self.market_cache.touch():
+                    self.market_cache.save(self.markets, self.triangle_index.triangles,
+                                           self.triangles_config_key, digest)
+                return
             
-            self.logger.info(f"📊 Для {base}: найдено {len(base_pairs)} валют")
+            if self.markets and len(self.triangle_index):
+                self.apply_market_diff(diff_markets(self.markets, markets), markets)
+            else:
+                self.logger.info("✅ Загружено %d торговых пар MEXC", len(markets))
+                self.markets = markets
+                await self.generate_triangles()
+            self.markets_hash = digest
             
-            # Генерируем треугольники
-            for crypto1, crypto2 in itertools.combinations(base_pairs, 2):
-                # Треугольник: base -> crypto1 -> crypto2 -> base
-                pair1 = f"{crypto1}/{base}"  # BTC/USDT
-                pair2 = f"{crypto1}/{crypto2}"  # BTC/ETH
-                pair3 = f"{crypto2}/{base}"  # ETH/USDT
-                pair2_alt = f"{crypto2}/{crypto1}"  # ETH/BTC
-                
-                # Проверяем существование всех пар
-                if all(pair in self.markets for pair in [pair1, pair2, pair3]):
-                    self.valid_triangles.append((pair1, pair2, pair3, 'direct'))
-                
-                if all(pair in self.markets for pair in [pair1, pair2_alt, pair3]):
-                    self.valid_triangles.append((pair1, pair2_alt, pair3, 'reverse'))
+            self.market_cache.save(self.markets, self.triangle_index.triangles, self.triangles_config_key, digest)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.warning("⚠️ Ошибка обновления рынков: %s", e)
+            if not self.markets:
+                raise
+    
+    def apply_market_diff(self, diff: MarketDiff, markets):
+        """Применить изменения рынков к живому индексу треугольников"""
+        removed = self.triangle_index.remove_symbols(diff.removed)
+        self.markets = markets
+        added = self.triangle_index.add_symbols(markets, diff.added, BASE_CURRENCIES, self.triangle_currencies)
+        self._select_scanned()
+        self._cycles_refreshed = None  # граф валют изменился - перебрать циклы заново
+        self.rate_graph = None
+        
+        self.logger.info("🔄 Рынки обновлены: +%d пар, -%d пар, изменено %d; треугольники +%d/-%d (всего %d)",
+                         len(diff.added), len(diff.removed), len(diff.changed),
+                         len(added), len(removed), len(self.triangle_index))
+        for triangle in added[:10]:
+            self.logger.info("   🆕 %s (%s)", triangle_path(triangle), triangle[3])
+        return added, removed
+    
+    async def market_refresh_loop(self):
+        """Периодическая перезагрузка рынков: новые листинги без рестарта"""
+        while True:
+            await asyncio.sleep(self.market_refresh_interval)
+            await self.refresh_markets()
+    
+    async def lifetime_loop(self):
+        """Эпизоды жизни возможностей по обновлениям стаканов (BookFeed или воркеров)"""
+        while True:
+            await asyncio.sleep(self.lifetime_sample_interval)
+            if self.book_feed is None and self.quote_feed is None:
+                continue
+            try:
+                self.lifetime_sampler.sample(self.compiled_triangles(), self._compiled_cycles,
+                                             self.fee_rate, self.min_profit)
+            except Exception as e:
+                self.logger.warning("⚠️ Ошибка учета жизни возможностей: %s", e)
+    
+    async def generate_triangles(self):
+        """Генерация треугольников"""
+        self.logger.info("🔺 Генерация треугольных возможностей...")
+        
+        self._set_triangles(build_triangles(self.markets, BASE_CURRENCIES, self.triangle_currencies))
         
         self.logger.info(f"✅ Сгенерировано {len(self.valid_triangles)} треугольных возможностей")
         
         # Показываем примеры
         for i, triangle in enumerate(self.valid_triangles[:5]):
-            pair1, pair2, pair3, direction = triangle
-            base = pair1.split('/')[1]
-            crypto1 = pair1.split('/')[0]
-            crypto2 = pair3.split('/')[0]
-            path = f"{base} → {crypto1} → {crypto2} → {base}"
-            self.logger.info(f"   {i+1}. {path} ({direction})")
+            self.logger.info(f"   {i+1}. {triangle_path(triangle)} ({triangle[3]})")
     
     async def send_telegram(self, message: str):
         """Отправка сообщения в Telegram"""
@@ -265,6 +495,7 @@ class TriangularArbitrageBot:
             self.logger.warning("⚠️ Telegram токен или chat_id не настроены")
             return
         
+        self.metrics.telegram_queue_depth.inc()
         try:
             if not self.telegram_bot:
                 from telegram import Bot
@@ -287,87 +518,530 @@ class TriangularArbitrageBot:
                 self.logger.info("📱 Telegram сообщение отправлено (без Markdown)")
             except Exception as e2:
                 self.logger.error(f"❌ Критическая ошибка Telegram: {e2}")
+        finally:
+            self.metrics.telegram_queue_depth.dec()
+    
+    def track_exchange_error(self, error: Exception, endpoint: str):
+        """Учет ответов биржи о превышении лимитов в метриках"""
+        if isinstance(error, (RateLimitExceeded, DDoSProtection)):
+            self.metrics.rate_limit_hits.inc(endpoint=endpoint)
+    
+    def create_book_feed(self) -> WsSupervisor:
+        """
+        Потоковые стаканы: отдельные публичные соединения под надзором.
+        С воркерами котировок сканируемые пары уже подписаны в них - основному процессу
+        нужна глубина только ног перепроверяемых сделок, хватает одного соединения.
+        """
+        max_connections = 1 if self.quote_feed else self.ws_max_connections
+        return WsSupervisor(mexc_exchange, self.quotes, self.book_depth,
+                            per_connection=self.ws_per_connection, max_connections=max_connections,
+                            gap_timeout=self.ws_gap_timeout, on_reconnect=self.metrics.ws_reconnects.inc,
+                            on_resync=lambda reason: self.metrics.book_resyncs.inc(reason=reason))
+    
+    def report_dropped_logs(self) -> int:
+        """Записи, отброшенные переполненной очередью логов, - в счетчик метрик"""
+        dropped = dropped_records()
+        if dropped > self.log_records_dropped:
+            self.metrics.log_records_dropped.inc(dropped - self.log_records_dropped)
+            self.log_records_dropped = dropped
+        return dropped
+    
+    def report_ws_connections(self):
+        """Поток сообщений и состояние соединений в метрики"""
+        if not self.book_feed:
+            return
+        down = 0
+        for connection in self.book_feed.stats():
+            self.metrics.ws_message_rate.set(connection['rate'], connection=str(connection['connection']))
+            down += connection['down']
+        self.metrics.ws_connections_down.set(down)
+    
+    def refresh_universe(self, tickers):
+        """
+        Пересчитать ликвидность пар по снимку тикеров: в режиме auto - заново выбрать валюты,
+        дальше - оставить лучшие живые треугольники, отписаться от мертвых пар
+        и заранее подписать стаканы ног лучших треугольников.
+        """
+        universe = self.universe.refresh(tickers, self.markets, self.triangle_index.triangles)
+        self.metrics.universe_live_pairs.set(len(self.universe.live))
+        
+        if self.universe_auto and universe.currencies and set(universe.currencies) != set(self.triangle_currencies):
+            self.triangle_currencies = universe.currencies
+            self._set_triangles(build_triangles(self.markets, BASE_CURRENCIES, self.triangle_currencies))
+            self._cycles_refreshed = None
+            self.market_cache.save(self.markets, self.triangle_index.triangles, self.triangles_config_key,
+                                   self.markets_hash or markets_hash(self.markets))
+        else:
+            self._select_scanned()
+        
+        self.logger.info("🌐 Вселенная: %d живых пар, %d валют, сканируется %d из %d треугольников, "
+                         "вытеснено %d", len(self.universe.live), len(universe.currencies),
+                         len(self.valid_triangles), len(self.triangle_index), len(universe.evicted))
+        
+        if self.book_feed and universe.dead_symbols:
+            self.book_feed.unwatch(universe.dead_symbols)
+        if self.quote_feed:
+            # Воркеры держат все сканируемые пары, без лимита подписок одного процесса
+            self.quote_feed.unwatch(universe.dead_symbols)
+            self.quote_feed.watch(symbol for triangle in self.valid_triangles for symbol in triangle[:3])
+            self.metrics.quote_workers.set(self.quote_feed.alive())
+        # С воркерами основной процесс не дублирует их подписки (ноги подписываются при перепроверке)
+        if self.revalidate_enabled and not self.quote_feed and self.exchange.has.get('watchOrderBook'):
+            if self.book_feed is None:
+                self.book_feed = self.create_book_feed()
+            symbols = []
+            for triangle in self.valid_triangles:
+                symbols.extend(s for s in triangle[:3] if s not in symbols)
+                if len(symbols) >= self.book_feed.max_symbols:
+                    break
+            # Лучшие подписываются последними - их LRU вытесняет в последнюю очередь
+            self.book_feed.watch(reversed(symbols[:self.book_feed.max_symbols]))
+    
+    def compiled_triangles(self):
+        """Треугольники в индексах QuoteStore (перекомпилируются при смене списка)"""
+        if self._compiled_source is not self.valid_triangles:
+            self._compiled_triangles = compile_triangles(self.valid_triangles, self.quotes)
+            self._compiled_source = self.valid_triangles
+        return self._compiled_triangles
+    
+    def refresh_cycles(self):
+        """
+        Перебрать циклы из 4-5 ног по текущим котировкам. Кандидаты - циклы не хуже порога
+        минус CYCLE_PRUNE_SLACK; сканер пересчитывает их каждый цикл вместе с треугольниками.
+        """
+        self._cycles_refreshed = time.monotonic()
+        currencies = None
+        if self.triangle_currencies is not None:
+            currencies = set(BASE_CURRENCIES) | set(self.triangle_currencies) | set(STABLE_CURRENCIES)
+        # Мертвые по ликвидности пары в перебор не попадают
+        markets = self.markets
+        if self.universe.live:
+            markets = {symbol: market for symbol, market in markets.items() if symbol in self.universe.live}
+        graph = build_currency_graph(markets, currencies)
+        search = self.cycle_search
+        self.cycles = search.find(graph, BASE_CURRENCIES, self.quotes.bid, self.quotes.ask,
+                                  self.quotes.ids, self.min_profit)
+        if self.quote_feed:
+            self.quote_feed.watch(symbol for cycle in self.cycles for symbol, _side in cycle)
+        self.logger.info("🔁 Циклы 4-%d ног: %d кандидатов из %d (ребер просмотрено %d, отсечено веток %d) за %.1f мс",
+                         search.max_legs, len(self.cycles), search.found, search.visited,
+                         search.pruned, search.elapsed_ms)
+    
+    def compiled_cycles(self):
+        """Циклы в индексах QuoteStore; перебор повторяется раз в CYCLE_REFRESH_INTERVAL"""
+        if self.cycle_max_legs < 4 or not self.markets:
+            return []
+        if (self._cycles_refreshed is None
+                or time.monotonic() - self._cycles_refreshed >= self.cycle_refresh_interval):
+            self.refresh_cycles()
+        if self._compiled_cycles_source is not self.cycles:
+            self._compiled_cycles = compile_cycles(self.cycles, self.quotes)
+            self._compiled_cycles_source = self.cycles
+        return self._compiled_cycles
+    
+    def detected_cycles(self, known):
+        """
+        Отрицательные циклы из фондированных валют по изменившимся котировкам.
+        known() - пары уже сканируемых треугольников и циклов: такие не дублируются.
+        """
+        if not self.negative_cycles_enabled or not self.markets:
+            return []
+        # Граф только из живых пар: котировки мертвых обновляются редко, и SPFA находил бы
+        # циклы по устаревшим ценам. Новая вселенная - новый граф
+        live = self.universe.live
+        if self.rate_graph is None or self.rate_graph_pairs is not live:
+            markets = self.markets
+            if live:
+                markets = {symbol: market for symbol, market in markets.items() if symbol in live}
+            self.rate_graph = RateGraph(markets, self.quotes)
+            self.rate_graph_pairs = live
+            self.cycle_detector = NegativeCycleDetector(self.rate_graph, self.negative_cycle_max_legs)
+        decreased, increased = self.rate_graph.sync()
+        found = self.cycle_detector.detect(BASE_CURRENCIES, decreased, increased)
+        
+        cycles = []
+        for detected in found:
+            if detected.start not in BASE_CURRENCIES:
+                continue  # цикл достижим, но проходит не через фондированную валюту
+            symbols = tuple(symbol for symbol, _side in detected.legs)
+            if symbols not in known():
+                cycles.append(detected.legs)
+        if found:
+            self.logger.info("🧭 SPFA: %d отрицательных циклов (%d новых), %d релаксаций за %.1f мс",
+                             len(found), len(cycles), self.cycle_detector.relaxations,
+                             self.cycle_detector.elapsed_ms)
+        return compile_cycles(cycles, self.quotes)
+    
+    def fee_rate(self, legs: int) -> float:
+        """Суммарная комиссия цикла из legs ног при текущей стратегии исполнения"""
+        if self.execution_strategy == 'maker':
+            return self.taker_fee * (legs - 1) + self.maker_fee
+        return self.taker_fee * legs
+    
+    def scan_constrained(self) -> bool:
+        """Бюджет ограничен: нет потокового стакана (только REST) или публичный лимит почти исчерпан"""
+        if self.scheduler_mode == 'always':
+            return True
+        if self.scheduler_mode == 'off':
+            return False
+        streaming = self.book_feed is not None or self.quote_feed is not None
+        return not streaming or self.rate_limiter.is_saturated(PUBLIC)
+    
+    async def fetch_scan_tickers(self, entries):
+        """
+        Тикеры для ограниченного скана: только пары выбранных треугольников, если
+        поштучные запросы дешевле по весу, чем все тикеры разом
+        """
+        symbols = list(dict.fromkeys(symbol for entry in entries for symbol in entry.triangle[:-1]))
+        if len(symbols) * ENDPOINT_WEIGHTS['fetch_ticker'][1] >= ENDPOINT_WEIGHTS['fetch_tickers'][1]:
+            return await self.exchange.fetch_tickers()
+        tickers = await asyncio.gather(*(self.exchange.fetch_ticker(symbol) for symbol in symbols))
+        return dict(zip(symbols, tickers))
     
     async def find_triangular_opportunities(self):
-        """Поиск треугольных возможностей"""
+        """Поиск треугольных возможностей и циклов из 4-5 ног"""
+        scan_start = time.perf_counter()
         try:
-            # Получаем тикеры
-            tickers = await self.exchange.fetch_tickers()
+            # Получаем тикеры и сразу переносим их в массивы хранилища котировок.
+            # При ограниченном бюджете обновляются только пары треугольников из расписания
+            constrained = self.scan_constrained()
+            full_refresh = not constrained or self.universe.is_due(self.universe_refresh_interval)
+            if full_refresh:
+                tickers = await self.exchange.fetch_tickers()
+                self.quotes.update_from_tickers(tickers)
+                if self.universe.is_due(self.universe_refresh_interval):
+                    self.refresh_universe(tickers)
+            
+            compiled = self.compiled_triangles()
+            if constrained:
+                compiled = self.scheduler.pick(compiled)
+                self.metrics.scheduled_triangles.set(len(compiled))
+                if not full_refresh:
+                    self.quotes.update_from_tickers(await self.fetch_scan_tickers(compiled))
+            else:
+                self.metrics.scheduled_triangles.set(len(compiled))
+            scan_trace = LatencyTrace()
+            scan_trace.mark('md_recv')
             opportunities = []
             
-            for triangle in self.valid_triangles:
-                pair1, pair2, pair3, direction = triangle
+            cycles = self.compiled_cycles()
+            
+            def known():
+                return {entry.triangle[:-1] for entry in compiled} | {entry.triangle[:-1] for entry in cycles}
+            
+            cycles = cycles + self.detected_cycles(known)
+            scan_trace.mark('scan_start')
+            self.metrics.triangles_evaluated.inc(len(compiled) + len(cycles))
+            bid, ask = self.quotes.bid, self.quotes.ask
+            bid_size, ask_size = self.quotes.bid_size, self.quotes.ask_size
+            min_profit = self.min_profit
+            max_age = self.max_quote_age_ms
+            ages = self.quotes.ages_ms()
+            self.metrics.stale_quotes.set(sum(1 for age in ages if max_age < age < float('inf')))
+            stale_rejected = 0
+            # Ноги с испорченным стаканом не торгуем, пока он не восстановлен по снимку
+            unhealthy = self.book_feed.unhealthy_symbols() if self.book_feed else set()
+            self.metrics.unhealthy_books.set(len(unhealthy))
+            unhealthy_rejected = 0
+            above = {}
+            hits = {}
+            slippage = self.slippage if self.slippage_adjust and self.slippage.models else None
+            initial_amount = self.max_position
+            # Комиссии MEXC по ногам; с мейкер-ногой одна из них по ставке мейкера
+            fees = initial_amount * self.fee_rate(3)
+            # Колонки общей памяти переписывают воркеры без блокировок: скан читает их напрямую,
+            # а прошедший порог кандидат пересчитывается по согласованным котировкам (seqlock)
+            consistent_read = self.quotes.read if isinstance(self.quotes, SharedQuoteTable) else None
+            
+            def consider(entry, legs, leg_prices, final_amount, fees, depth):
+                """Кандидат выше порога до проскальзывания: эпизод, штраф, возраст котировок, возможность"""
+                nonlocal stale_rejected, unhealthy_rejected
+                if consistent_read is not None:
+                    rows = [consistent_read(i) for i in legs]
+                    buys = [side == 'buy' for side in entry.sides]
+                    leg_prices = tuple(row[1] if buy else row[0] for row, buy in zip(rows, buys))
+                    if not all(price > 0 for price in leg_prices):
+                        return
+                    final_amount = initial_amount * (1 + net_edge_percent(leg_prices, buys, 0.0) / 100)
+                    if final_amount - initial_amount - fees < initial_amount * min_profit / 100:
+                        return
+                    
+                    def depth():
+                        return cycle_depth([row[0] for row in rows], [row[1] for row in rows],
+                                           [row[2] for row in rows], [row[3] for row in rows],
+                                           tuple(range(len(rows))), buys)
+                profit = final_amount - initial_amount
+                net_profit = profit - fees
+                net_profit_percent = (net_profit / initial_amount) * 100
+                # Эпизод жизни - до фильтров исполнения: устаревшая или испорченная нога
+                # и проскальзывание не отменяют того, что цены были выше порога
+                above[episode_key(entry)] = (entry.path.split(' → ')[0], net_profit_percent, depth())
                 
-                if not all(pair in tickers for pair in [pair1, pair2, pair3]):
-                    continue
+                # Проскальзывание только ухудшает прибыль - считаем его лишь для прошедших порог
+                slippage_percent = 0.0
+                if slippage is not None:
+                    slippage_percent = slippage.penalty_percent(entry.triangle[:-1], entry.sides)
+                    net_profit_percent -= slippage_percent
+                    net_profit -= initial_amount * slippage_percent / 100
+                    if net_profit_percent < min_profit:
+                        return
+                # Расписание учитывает только прибыль, которая прошла бы порог с учетом проскальзывания
+                hits[entry.triangle] = net_profit_percent
                 
-                t1, t2, t3 = tickers[pair1], tickers[pair2], tickers[pair3]
+                if unhealthy and not unhealthy.isdisjoint(entry.triangle[:-1]):
+                    unhealthy_rejected += 1
+                    return
                 
-                if not all(t['bid'] and t['ask'] for t in [t1, t2, t3]):
-                    continue
+                # Котировки неликвидных пар могут быть минутной давности - такая прибыль фантомная
+                leg_ages = tuple(ages[i] for i in legs)
+                oldest = max(leg_ages)
+                # Бесконечный возраст - соединение ноги упало, цена заморожена: не торгуем и при max_age = 0
+                if (max_age > 0 and oldest > max_age) or oldest == float('inf'):
+                    self.metrics.stale_rejections.inc(leg=str(leg_ages.index(oldest) + 1))
+                    stale_rejected += 1
+                    return
+                
+                opportunities.append(TriangularOpportunity(
+                    path=entry.path,
+                    triangle=entry.triangle,
+                    profit_percent=(profit / initial_amount) * 100,
+                    profit_usd=profit,
+                    net_profit_percent=net_profit_percent,
+                    net_profit_usd=net_profit,
+                    fees_usd=fees,
+                    legs=legs,
+                    leg_prices=leg_prices,
+                    sides=entry.sides,
+                    freshness=freshness_score(leg_ages, max_age),
+                    slippage_percent=slippage_percent,
+                ))
+            
+            # Порог для итоговой суммы: прибыль после комиссий не ниже min_profit
+            threshold = initial_amount * (1 + min_profit / 100) + fees
+            for triangle in compiled:
+                i1, i2, i3 = triangle.leg1, triangle.leg2, triangle.leg3
+                ask1, bid2, ask2, bid3 = ask[i1], bid[i2], ask[i2], bid[i3]
                 
-                # Расчет треугольного арбитража
-                initial_amount = self.max_position
+                if not (ask1 > 0 and bid[i1] > 0 and bid2 > 0 and ask2 > 0 and bid3 > 0 and ask[i3] > 0):
+                    continue
                 
                 # Шаг 1: покупаем первую валюту (base -> crypto1)
-                amount1 = initial_amount / t1['ask']
+                amount1 = initial_amount / ask1
                 
                 # Шаг 2: обмениваем на вторую валюту (crypto1 -> crypto2)
-                if direction == 'direct':
-                    amount2 = amount1 * t2['bid']
+                if triangle.direct:
+                    price2 = bid2
+                    amount2 = amount1 * bid2
                 else:
-                    amount2 = amount1 / t2['ask']
+                    price2 = ask2
+                    amount2 = amount1 / ask2
                 
                 # Шаг 3: продаем за базовую валюту (crypto2 -> base)
-                final_amount = amount2 * t3['bid']
-                
-                # Прибыль
-                profit = final_amount - initial_amount
-                profit_percent = (profit / initial_amount) * 100
-                
-                # Учитываем комиссии MEXC (0.2% за сделку)
-                fees = initial_amount * 0.006  # 3 сделки по 0.2%
-                net_profit = profit - fees
-                net_profit_percent = (net_profit / initial_amount) * 100
+                final_amount = amount2 * bid3
                 
-                if net_profit_percent >= self.min_profit:
-                    base_currency = pair1.split('/')[1]
-                    crypto1 = pair1.split('/')[0]
-                    crypto2 = pair3.split('/')[0]
-                    path = f"{base_currency} → {crypto1} → {crypto2} → {base_currency}"
-                    
-                    opportunity = TriangularOpportunity(
-                        path=path,
-                        triangle=triangle,
-                        profit_percent=profit_percent,
-                        profit_usd=profit,
-                        net_profit_percent=net_profit_percent,
-                        net_profit_usd=net_profit,
-                        fees_usd=fees,
-                        prices={pair1: t1, pair2: t2, pair3: t3}
-                    )
-                    opportunities.append(opportunity)
+                if final_amount >= threshold:
+                    consider(triangle, (i1, i2, i3), (ask1, price2, bid3), final_amount, fees,
+                             lambda: triangle_depth(bid, ask, bid_size, ask_size, (i1, i2, i3), triangle.direct))
+            
+            # Циклы из N ног: тот же расчет по шагам, комиссия за каждую ногу
+            for cycle in cycles:
+                amount = initial_amount
+                prices = []
+                for i, buy in zip(cycle.legs, cycle.buys):
+                    price = ask[i] if buy else bid[i]
+                    if not (price > 0):
+                        break
+                    amount = amount / price if buy else amount * price
+                    prices.append(price)
+                else:
+                    cycle_fees = initial_amount * self.fee_rate(len(cycle.legs))
+                    if amount >= threshold - fees + cycle_fees:
+                        consider(cycle, cycle.legs, tuple(prices), amount, cycle_fees,
+                                 lambda: cycle_depth(bid, ask, bid_size, ask_size, cycle.legs, cycle.buys))
+            
+            scan_trace.mark('scan_end')
+            # Ограниченный скан видит только часть треугольников - остальные эпизоды не закрываются
+            scored = None
+            if constrained:
+                scored = [episode_key(entry) for entries in (compiled, cycles) for entry in entries]
+            self.opportunity_analytics.update(above, scored=scored)
+            self.scheduler.record_scan((triangle.triangle for triangle in compiled), hits)
+            if stale_rejected:
+                self.logger.info("🕒 Отброшено %d возможностей с устаревшими котировками (> %.0f мс)",
+                                 stale_rejected, max_age)
+            if unhealthy_rejected:
+                self.logger.info("🧩 Отброшено %d возможностей со стаканами в пересинхронизации",
+                                 unhealthy_rejected)
+            for opportunity in opportunities:
+                opportunity.trace = scan_trace.fork(opportunity.key)
             
             # Сортируем по чистой прибыли
             opportunities.sort(key=lambda x: x.net_profit_percent, reverse=True)
             self.stats['opportunities_found'] += len(opportunities)
+            self.metrics.opportunities.inc(len(opportunities))
             
             return opportunities
             
         except Exception as e:
-            self.logger.error(f"❌ Ошибка поиска возможностей: {e}")
+            self.track_exchange_error(e, 'public')
+            self.logger.error("❌ Ошибка поиска возможностей: %s", e)
             return []
+        finally:
+            self.metrics.scans.inc()
+            self.metrics.scan_duration.observe(time.perf_counter() - scan_start)
+    
+    def _leg_books(self, opportunity: TriangularOpportunity):
+        """Стаканы ног: потоковые, если есть, иначе лучшая цена из QuoteStore"""
+        books, ages = [], []
+        for symbol, i in zip(opportunity.symbols, opportunity.legs):
+            top = self.book_feed.book(symbol) if self.book_feed else None
+            if top is not None:
+                books.append((top.bids, top.asks))
+                ages.append(top.age_ms())
+                continue
+            # Объем неизвестен - считаем лучший уровень неограниченным.
+            # read() отдает согласованную котировку, даже если ее пишет процесс-воркер
+            bid, ask, bid_size, ask_size, _timestamp, _received = self.quotes.read(i)
+            books.append(([(bid, bid_size or float('inf'))], [(ask, ask_size or float('inf'))]))
+            ages.append(self.quotes.age_ms(i))
+        return books, ages
+    
+    async def revalidate_opportunity(self, opportunity: TriangularOpportunity) -> bool:
+        """
+        Пересчитать лучший треугольник по самому свежему стакану перед первой ногой.
+        Отказ, если котировки устарели, глубины не хватает или прибыль ушла ниже порога.
+        """
+        if not self.revalidate_enabled:
+            return True
+        
+        symbols = opportunity.symbols
+        if self.book_feed is None and self.exchange.has.get('watchOrderBook'):
+            self.book_feed = self.create_book_feed()
+        if self.book_feed:
+            self.book_feed.watch(symbols)
+            await self.book_feed.wait_ready(symbols, self.book_wait_ms / 1000)
+        
+        books, ages = self._leg_books(opportunity)
+        result = revalidate(books, ages, opportunity.triangle[-1] == 'direct', self.max_position,
+                            self.min_profit, self.max_quote_age_ms,
+                            fee_rate=self.fee_rate(len(opportunity.legs)), sides=opportunity.sides)
+        if opportunity.trace:
+            opportunity.trace.mark('revalidate')
+        
+        if not result.ok:
+            self.metrics.revalidation_aborts.inc(reason=result.reason)
+            self.logger.info("🛑 Сделка отменена перепроверкой (%s): %s, прибыль %.3f%% -> %.3f%%",
+                             result.reason, opportunity.path, opportunity.net_profit_percent,
+                             result.net_profit_percent, extra={'path': opportunity.path})
+            return False
+        
+        self.logger.info("✅ Перепроверка пройдена за %.0f мкс: %.3f%% -> %.3f%%",
+                         result.elapsed_us, opportunity.net_profit_percent, result.net_profit_percent)
+        return True
+    
+    async def refresh_inventory(self, batch: bool):
+        """
+        Снимок свободного баланса для резервов перед пачкой сделок.
+        В тестовом режиме, для одиночной сделки и при ошибке баланс неизвестен -
+        резервы ограничивают только общие ноги.
+        """
+        if self.trading_mode == 'test' or not batch:
+            self.inventory.set_balances(None)
+            return
+        try:
+            self.inventory.set_balances(free_balances(await self.exchange.fetch_balance()))
+        except Exception as e:
+            self.track_exchange_error(e, 'balance')
+            self.logger.warning("⚠️ Не удалось получить баланс для резервов: %s", e)
+            self.inventory.set_balances(None)
+    
+    async def execute_opportunities(self, opportunities: List[TriangularOpportunity]) -> int:
+        """
+        Пул исполнения: лучшие возможности без общих ног запускаются одновременно.
+        Каждая резервирует max_position стартовой валюты; треугольник, которому не хватило
+        баланса или чья нога уже торгуется, ждет следующего скана. Возвращает число успешных.
+        """
+        limit = max(1, self.max_concurrent_triangles)
+        # Без снимка баланса параллельные треугольники могли бы потратить один остаток
+        await self.refresh_inventory(limit > 1 and len(opportunities) > 1)
+        if self.inventory.balances is None and self.trading_mode != 'test':
+            limit = 1
+        
+        batch, conflicts = plan_batch(
+            self.inventory,
+            ((o.key, self.reservation_amounts(o), o.symbols) for o in opportunities),
+            limit,
+        )
+        for reason, count in conflicts.items():
+            self.metrics.reservation_conflicts.inc(count, reason=reason)
+        if not batch:
+            self.logger.info("🧺 Нет возможностей со свободным балансом: %s", conflicts)
+            return 0
+        if len(batch) > 1:
+            self.logger.info("🧺 Параллельно исполняется %d треугольников, отложено %d",
+                             len(batch), sum(conflicts.values()))
+        self.metrics.inflight_triangles.set(len(self.inventory))
+        
+        results = await asyncio.gather(*(self.execute_reserved(opportunities[n], reservation)
+                                         for n, reservation in batch))
+        return sum(1 for ok in results if ok)
+    
+    def reservation_amounts(self, opportunity: TriangularOpportunity) -> Dict[str, float]:
+        """Что резервирует сделка: стартовую валюту, а с мейкер-ногой - валюту входа этой ноги"""
+        if self.execution_strategy != 'maker' or self.trading_mode == 'test':
+            return {opportunity.start_currency: self.max_position}
+        books, _ages = self._leg_books(opportunity)
+        opportunity.maker_leg = choose_maker_leg(books, opportunity.sides, self.max_position)
+        amount, _factor = self.maker_leg_amount(opportunity, opportunity.maker_leg)
+        spend, _receive = leg_currencies(opportunity.symbols[opportunity.maker_leg],
+                                         opportunity.sides[opportunity.maker_leg])
+        return {spend: amount}
+    
+    def maker_leg_amount(self, opportunity: TriangularOpportunity, maker_leg: int) -> Tuple[float, float]:
+        """
+        Сумма входа мейкер-ноги, эквивалентная max_position стартовой валюты, и коэффициент
+        пересчета (по ценам сканера ног до нее)
+        """
+        factor = 1.0
+        for side, price in zip(opportunity.sides[:maker_leg], opportunity.leg_prices[:maker_leg]):
+            factor *= leg_rate(side, price)
+        return self.max_position * factor, factor
+    
+    async def execute_reserved(self, opportunity: TriangularOpportunity, reservation) -> bool:
+        """Перепроверка и исполнение одного треугольника; резерв снимается в любом случае"""
+        try:
+            if opportunity.trace:
+                opportunity.trace.mark('decision')
+            if not await self.revalidate_opportunity(opportunity):
+                return False
+            return bool(await self.execute_triangular_trade(opportunity))
+        except Exception as e:
+            self.logger.error("❌ Ошибка исполнения %s: %s", opportunity.path, e, extra={'path': opportunity.path})
+            return False
+        finally:
+            self.inventory.release(reservation)
+            self.metrics.inflight_triangles.set(len(self.inventory))
     
     async def execute_triangular_trade(self, opportunity: TriangularOpportunity):
-        """Исполнение треугольной сделки"""
-        pair1, pair2, pair3, direction = opportunity.triangle
+        """Исполнение треугольной сделки (или цикла из 4-5 ног) нога за ногой"""
+        trace = opportunity.trace or LatencyTrace(opportunity.path)
         
-        self.logger.info(f"🚀 Исполнение треугольного арбитража:")
-        self.logger.info(f"   🔺 Путь: {opportunity.path}")
-        self.logger.info(f"   💰 Ожидаемая прибыль: {opportunity.net_profit_percent:.3f}%")
+        self.logger.info("🚀 Исполнение треугольного арбитража:")
+        self.logger.info("   🔺 Путь: %s", opportunity.path)
+        self.logger.info("   💰 Ожидаемая прибыль: %.3f%%", opportunity.net_profit_percent,
+                         extra={'path': opportunity.path, 'expected_profit_pct': opportunity.net_profit_percent})
         
         if self.trading_mode == 'test':
             # Симуляция
+            maker_leg = None
+            if self.execution_strategy == 'maker':
+                maker_leg = choose_maker_leg(self._leg_books(opportunity)[0], opportunity.sides, self.max_position)
+            plan = "\n".join(
+                f"{n}. {'🟢 BUY' if side == 'buy' else '🔴 SELL'} {symbol} по ${price:.6f}"
+                f"{' (🪤 post-only)' if n - 1 == maker_leg else ''}"
+                for n, (symbol, side, price) in enumerate(
+                    zip(opportunity.symbols, opportunity.sides, opportunity.leg_prices), 1)
+            )
             await self.send_telegram(f"""
 🧪 **СИМУЛЯЦИЯ ТРЕУГОЛЬНОЙ СДЕЛКИ**
 
@@ -375,109 +1049,171 @@ class TriangularArbitrageBot:
 💰 **Прибыль:** {opportunity.net_profit_percent:.3f}% (${opportunity.net_profit_usd:.2f})
 📊 **Валовая прибыль:** {opportunity.profit_percent:.3f}%
 💸 **Комиссии:** ${opportunity.fees_usd:.2f}
+🕒 **Свежесть котировок:** {opportunity.freshness:.2f}
 ⏰ **Время:** {datetime.now().strftime('%H:%M:%S')}
 
 📋 **План сделок:**
-1. 🟢 BUY {pair1} по ${opportunity.prices[pair1]['ask']:.6f}
-2. {'🔴 SELL' if direction == 'direct' else '🟢 BUY'} {pair2} по ${opportunity.prices[pair2]['bid' if direction == 'direct' else 'ask']:.6f}
-3. 🔴 SELL {pair3} по ${opportunity.prices[pair3]['bid']:.6f}
+{plan}
             """)
+            trace.mark('notify')
+            self.latency.record(trace)
             
             self.stats['total_trades'] += 1
             self.stats['successful_trades'] += 1
             self.stats['total_profit'] += opportunity.net_profit_usd
+            self.metrics.trades.inc(result='simulated')
+            self.metrics.total_profit.set(self.stats['total_profit'])
             return True
         
+        if self.execution_strategy == 'maker':
+            return await self.execute_maker_trade(opportunity, trace)
+        
         # Реальная торговля
         trades = []
+        fills = []
         start_time = time.time()
         
         try:
             initial_amount = self.max_position
+            amount = initial_amount  # сколько валюты текущего шага на руках
+            legs = list(zip(opportunity.symbols, opportunity.sides, opportunity.leg_prices))
             
-            # Сделка 1: Покупаем первую валюту
-            self.logger.info(f"1️⃣ Покупка {pair1}")
-            order1 = await self.exchange.create_market_buy_order(
-                pair1, initial_amount / opportunity.prices[pair1]['ask']
-            )
-            
-            if order1['status'] != 'closed':
-                raise Exception("Первая сделка не исполнена")
-            
-            trades.append(Trade(
-                symbol=pair1,
-                side='buy',
-                amount=order1['filled'],
-                price=order1['average'],
-                timestamp=datetime.now(),
-                order_id=order1['id']
-            ))
-            
-            amount1 = order1['filled']
-            await asyncio.sleep(0.1)  # Небольшая пауза
-            
-            # Сделка 2: Обмениваем на вторую валюту
-            self.logger.info(f"2️⃣ Обмен {pair2}")
-            if direction == 'direct':
-                order2 = await self.exchange.create_market_sell_order(pair2, amount1)
-            else:
-                order2 = await self.exchange.create_market_buy_order(pair2, amount1)
-            
-            if order2['status'] != 'closed':
-                raise Exception("Вторая сделка не исполнена")
-            
-            trades.append(Trade(
-                symbol=pair2,
-                side='sell' if direction == 'direct' else 'buy',
-                amount=order2['filled'],
-                price=order2['average'],
-                timestamp=datetime.now(),
-                order_id=order2['id']
-            ))
-            
-            amount2 = order2['filled']
-            await asyncio.sleep(0.1)  # Небольшая пауза
-            
-            # Сделка 3: Продаем за базовую валюту
-            self.logger.info(f"3️⃣ Продажа {pair3}")
-            order3 = await self.exchange.create_market_sell_order(pair3, amount2)
-            
-            if order3['status'] != 'closed':
-                raise Exception("Третья сделка не исполнена")
-            
-            trades.append(Trade(
-                symbol=pair3,
-                side='sell',
-                amount=order3['filled'],
-                price=order3['average'],
-                timestamp=datetime.now(),
-                order_id=order3['id']
-            ))
+            for n, (symbol, side, price) in enumerate(legs, 1):
+                self.logger.info("%s️⃣ %s %s", n, 'Покупка' if side == 'buy' else 'Продажа', symbol)
+                leg_start = time.perf_counter()
+                trace.mark(f'leg{n}_submit')
+                # Покупка: тратим amount в quote - объем в base по цене сканера; продажа: весь amount base
+                if side == 'buy':
+                    order = await self.exchange.create_market_buy_order(symbol, amount / price)
+                else:
+                    order = await self.exchange.create_market_sell_order(symbol, amount)
+                self.mark_leg_response(trace, n, order)
+                self.metrics.leg_fill_latency.observe(time.perf_counter() - leg_start, leg=str(n))
+                
+                if order['status'] != 'closed':
+                    raise Exception(f"Сделка {n} ({symbol}) не исполнена")
+                fills.append(self.record_leg_fill(opportunity, n, side, order, leg_start))
+                
+                trades.append(Trade(
+                    symbol=symbol,
+                    side=side,
+                    amount=order['filled'],
+                    price=order['average'],
+                    timestamp=datetime.now(),
+                    order_id=order['id'],
+                    leg=n
+                ))
+                
+                # Следующая нога тратит то, что получено: base после покупки, quote после продажи
+                amount = order['filled'] if side == 'buy' else (order.get('cost') or order['filled'] * order['average'])
+                if n < len(legs):
+                    await asyncio.sleep(0.1)  # Небольшая пауза
             
             # Расчет фактической прибыли
-            final_amount = order3['filled'] * order3['average']
+            final_amount = amount
             actual_profit = final_amount - initial_amount
-            execution_time = time.time() - start_time
-            
-            # Отправляем уведомление о успешной сделке
-            await self.send_trade_notification(opportunity, trades, actual_profit, execution_time, True)
-            
-            # Обновляем статистику
-            self.stats['total_trades'] += 1
-            self.stats['successful_trades'] += 1
-            self.stats['total_profit'] += actual_profit
-            
-            # Обновляем статистику в файле управления
-            self.update_stats_to_control()
-            
-            self.logger.info(f"✅ Треугольная сделка успешна! Прибыль: ${actual_profit:.2f}")
+            await self.complete_trade(opportunity, trace, trades, fills, actual_profit,
+                                      actual_profit / initial_amount * 100, time.time() - start_time)
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Ошибка исполнения треугольной сделки: {e}")
-            
-            # Уведомление об ошибке
-            await self.send_telegram(f"""
+            await self.fail_trade(opportunity, trace, e)
+            return False
+    
+    async def execute_maker_trade(self, opportunity: TriangularOpportunity, trace: LatencyTrace) -> bool:
+        """
+        Исполнение с мейкер-ногой: post-only ордер на наименее ликвидной ноге по цене, при которой
+        цикл прибылен, остальные ноги - IOC сразу после его исполнения
+        """
+        symbols, sides = opportunity.symbols, opportunity.sides
+        maker_leg = opportunity.maker_leg
+        if maker_leg is None:
+            maker_leg = choose_maker_leg(self._leg_books(opportunity)[0], sides, self.max_position)
+        amount, factor = self.maker_leg_amount(opportunity, maker_leg)
+        spend, _receive = leg_currencies(symbols[maker_leg], sides[maker_leg])
+        self.logger.info("🪤 Мейкер-нога %d: %s %s на %.8f %s", maker_leg + 1, sides[maker_leg],
+                         symbols[maker_leg], amount, spend, extra={'path': opportunity.path})
+        
+        strategy = MakerLegStrategy(self.exchange, self.taker_fee, self.maker_fee, self.min_profit,
+                                    reprice_bps=self.maker_reprice_bps, timeout=self.maker_timeout,
+                                    ioc_slippage_bps=self.maker_ioc_slippage_bps,
+                                    max_depth_bps=self.maker_max_depth_bps)
+        start_time = time.time()
+        leg_start = time.perf_counter()
+        trace.mark('leg1_submit')
+        try:
+            result = await strategy.execute(symbols, sides, maker_leg, amount,
+                                            lambda: self._leg_books(opportunity)[0])
+        except Exception as e:
+            await self.fail_trade(opportunity, trace, e)
+            return False
+        self.metrics.maker_orders.inc(result=result.status)
+        if result.reprices:
+            self.metrics.maker_reprices.inc(result.reprices)
+        if result.spent <= 0:
+            self.logger.info("🪤 Мейкер-нога не исполнена (%s), перестановок %d", result.status, result.reprices,
+                             extra={'path': opportunity.path})
+            return False
+        
+        trades = []
+        fills = []
+        for n, order in result.orders:
+            trades.append(Trade(
+                symbol=symbols[n],
+                side=sides[n],
+                amount=order['filled'],
+                price=order['average'],
+                timestamp=datetime.now(),
+                order_id=order['id'],
+                leg=n + 1
+            ))
+            # Модель проскальзывания - по такер-ногам: цена мейкера задана заранее
+            if n != maker_leg:
+                fills.append(self.record_leg_fill(opportunity, n + 1, sides[n], order, leg_start))
+        trace.mark('last_fill')
+        
+        if result.error:
+            await self.fail_trade(opportunity, trace, Exception(
+                f"{result.error} (мейкер-нога исполнена на {result.spent:.8f} {spend})"))
+            return False
+        
+        # Прибыль в валюте входа мейкер-ноги - пересчитываем в стартовую валюту
+        actual_profit = result.profit / factor
+        await self.complete_trade(opportunity, trace, trades, fills, actual_profit,
+                                  result.profit / result.spent * 100, time.time() - start_time)
+        return True
+    
+    async def complete_trade(self, opportunity: TriangularOpportunity, trace: LatencyTrace, trades: List[Trade],
+                             fills: List[LegFill], actual_profit: float, realized_percent: float,
+                             execution_time: float):
+        """Учет успешной сделки: уведомление, статистика, расписание, метрики"""
+        # Отправляем уведомление о успешной сделке
+        await self.send_trade_notification(opportunity, trades, actual_profit, execution_time, True, fills)
+        trace.mark('notify')
+        self.latency.record(trace)
+        
+        # Обновляем статистику
+        self.stats['total_trades'] += 1
+        self.stats['successful_trades'] += 1
+        self.stats['total_profit'] += actual_profit
+        self.scheduler.record_trade(opportunity.triangle, opportunity.net_profit_percent, realized_percent)
+        self.metrics.trades.inc(result='success')
+        self.metrics.total_profit.set(self.stats['total_profit'])
+        
+        # Обновляем статистику в файле управления
+        self.update_stats_to_control()
+        
+        self.logger.info("✅ Треугольная сделка успешна! Прибыль: $%.2f", actual_profit,
+                         extra={'path': opportunity.path, 'profit_usd': actual_profit})
+    
+    async def fail_trade(self, opportunity: TriangularOpportunity, trace: LatencyTrace, e: Exception):
+        """Учет прерванной сделки и уведомление об ошибке"""
+        self.track_exchange_error(e, 'order')
+        self.metrics.trades.inc(result='failed')
+        self.logger.error("❌ Ошибка исполнения треугольной сделки: %s", e, extra={'path': opportunity.path})
+        
+        # Уведомление об ошибке
+        await self.send_telegram(f"""
 ❌ **ОШИБКА ТРЕУГОЛЬНОЙ СДЕЛКИ**
 
 🔺 **Путь:** `{opportunity.path}`
@@ -485,14 +1221,38 @@ class TriangularArbitrageBot:
 ⏰ **Время:** {datetime.now().strftime('%H:%M:%S')}
 
 💡 Сделка была прервана для минимизации потерь
-            """)
-            
-            self.stats['total_trades'] += 1
-            # Обновляем статистику в файле управления
-            self.update_stats_to_control()
-            return False
+        """)
+        trace.mark('notify')
+        self.latency.record(trace)
+        
+        self.stats['total_trades'] += 1
+        # Обновляем статистику в файле управления
+        self.update_stats_to_control()
     
-    async def send_trade_notification(self, opportunity: TriangularOpportunity, trades: List[Trade], actual_profit: float, execution_time: float, success: bool):
+    def record_leg_fill(self, opportunity: TriangularOpportunity, leg: int, side: str, order: Dict,
+                        leg_start: float) -> LegFill:
+        """Сравнить исполнение ноги с ценой, по которой ее оценил сканер"""
+        fill = self.slippage.record_fill(
+            opportunity.path, leg, opportunity.symbols[leg - 1], side, opportunity.leg_prices[leg - 1],
+            order, (time.perf_counter() - leg_start) * 1000,
+        )
+        self.metrics.leg_slippage.observe(fill.slippage_bps, leg=str(leg))
+        self.logger.info("📉 Нога %d %s: ожидалось %.8f, исполнено %.8f (%+.1f б.п.), комиссия %.8f %s",
+                         leg, fill.symbol, fill.expected_price, fill.fill_price, fill.slippage_bps,
+                         fill.fee_cost, fill.fee_currency,
+                         extra={'path': opportunity.path, 'leg': leg, 'slippage_bps': fill.slippage_bps})
+        return fill
+    
+    def mark_leg_response(self, trace: LatencyTrace, leg: int, order: Dict):
+        """Метки подтверждения и исполнения ноги по ответу биржи"""
+        trace.mark(f'leg{leg}_ack')
+        # Market ордер MEXC возвращается уже исполненным - ack и fill совпадают.
+        # last_fill перезаписывает каждая нога - остается метка последней
+        if order.get('status') == 'closed':
+            trace.stamps[f'leg{leg}_fill'] = trace.stamps['last_fill'] = trace.stamps[f'leg{leg}_ack']
+    
+    async def send_trade_notification(self, opportunity: TriangularOpportunity, trades: List[Trade], actual_profit: float, execution_time: float, success: bool,
+                                      fills: Optional[List[LegFill]] = None):
         """Отправка уведомления о треугольной сделке"""
         profit_emoji = "💰" if actual_profit > 0 else "💸"
         status_emoji = "✅" if success else "❌"
@@ -504,16 +1264,39 @@ class TriangularArbitrageBot:
 {profit_emoji} **Фактическая прибыль:** ${actual_profit:.2f}
 📊 **Ожидалось:** ${opportunity.net_profit_usd:.2f}
 ⏱️ **Время исполнения:** {execution_time:.2f}с
-
+"""
+        
+        # Разбивка по этапам без учета пауз между ногами
+        if opportunity.trace:
+            tick_to_trade = opportunity.trace.interval_us('md_recv', 'leg1_submit')
+            leg_times = [opportunity.trace.interval_us(f'leg{i}_submit', f'leg{i}_fill')
+                         for i in range(1, len(opportunity.legs) + 1)]
+            if tick_to_trade is not None:
+                message += f"⚡ **Tick-to-trade:** {tick_to_trade / 1000:.1f} мс\n"
+            if all(t is not None for t in leg_times):
+                message += "🦵 **Ноги:** " + " / ".join(f"{t / 1000:.1f}" for t in leg_times) + " мс\n"
+        
+        # Откуда разница между ожидаемой и фактической прибылью.
+        # План ищется по номеру ноги: у мейкер-ноги его нет, остальные идут не по порядку
+        planned_prices = {fill.leg: fill.expected_price for fill in fills or ()}
+        if fills:
+            message += "📉 **Проскальзывание:** " + " / ".join(
+                f"{f.slippage_bps:+.1f}" for f in sorted(fills, key=lambda f: f.leg)) + " б.п.\n"
+            if opportunity.slippage_percent:
+                message += f"🧮 **Учтено сканером:** {opportunity.slippage_percent:.3f}%\n"
+        
+        message += """
 📋 **Детали сделок:**
 """
         
         for i, trade in enumerate(trades, 1):
             side_emoji = "🟢" if trade.side == 'buy' else "🔴"
+            planned_price = planned_prices.get(trade.leg)
+            planned = f" (план `${planned_price:.6f}`)" if planned_price is not None else ""
             message += f"""
 {i}. {side_emoji} **{trade.side.upper()}** `{trade.symbol}`
    💱 Количество: `{trade.amount:.8f}`
-   💲 Цена: `${trade.price:.6f}`
+   💲 Цена: `${trade.price:.6f}`{planned}
    🆔 Order ID: `{trade.order_id}`
    ⏰ Время: `{trade.timestamp.strftime('%H:%M:%S')}`
 """
@@ -534,6 +1317,21 @@ class TriangularArbitrageBot:
         self.logger.info("⚠️ Арбитраж по умолчанию ВЫКЛЮЧЕН")
         self.logger.info("💡 Используйте Telegram бот для запуска")
         
+        # HTTP эндпоинт /metrics работает в том же event loop
+        if self.metrics_port and not self.metrics_server:
+            try:
+                self.metrics_server = MetricsServer(self.metrics.registry, port=self.metrics_port)
+                await self.metrics_server.start()
+            except Exception as e:
+                self.logger.warning(f"⚠️ Не удалось запустить сервер метрик: {e}")
+                self.metrics_server = None
+        
+        # Новые листинги и делистинги подхватываются без рестарта
+        if self.market_refresh_interval > 0 and not self.market_refresh_loop_task:
+            self.market_refresh_loop_task = asyncio.create_task(self.market_refresh_loop())
+        if self.lifetime_sample_interval > 0 and not self.lifetime_task:
+            self.lifetime_task = asyncio.create_task(self.lifetime_loop())
+        
         # Ждем команды запуска через Telegram
         while True:
             try:
@@ -578,7 +1376,13 @@ class TriangularArbitrageBot:
                 self.stats['cycles'] += 1
                 cycle_start = time.time()
                 
-                self.logger.info(f"🔄 Цикл {self.stats['cycles']} - {datetime.now().strftime('%H:%M:%S')}")
+                self.logger.info("🔄 Цикл %d", self.stats['cycles'])
+                
+                if self.quote_feed:
+                    self.quote_feed.ensure_running()
+                    self.metrics.quote_workers.set(self.quote_feed.alive())
+                self.report_ws_connections()
+                self.report_dropped_logs()
                 
                 # Проверяем сигнал об обновлении настроек в процессе работы
                 if os.path.exists('settings_updated.signal'):
@@ -607,13 +1411,13 @@ class TriangularArbitrageBot:
                 opportunities = await self.find_triangular_opportunities()
                 
                 if opportunities:
-                    self.logger.info(f"🔺 Найдено {len(opportunities)} треугольных возможностей")
+                    self.logger.info("🔺 Найдено %d треугольных возможностей", len(opportunities))
                     
-                    # Исполняем лучшую возможность
                     best = opportunities[0]
-                    self.logger.info(f"💎 Лучшая возможность: {best.path} ({best.net_profit_percent:.3f}%)")
+                    self.logger.info("💎 Лучшая возможность: %s (%.3f%%)", best.path, best.net_profit_percent)
                     
-                    await self.execute_triangular_trade(best)
+                    # Исполняем лучшие возможности, не конфликтующие по ногам и балансу
+                    await self.execute_opportunities(opportunities)
                 else:
                     self.logger.info("📊 Треугольных возможностей не найдено")
                 
@@ -622,11 +1426,15 @@ class TriangularArbitrageBot:
                     uptime = time.time() - self.stats['start_time']
                     success_rate = (self.stats['successful_trades'] / max(1, self.stats['total_trades'])) * 100
                     
-                    self.logger.info(f"📊 Статистика: время работы {uptime/3600:.1f}ч, "
-                                   f"циклов {self.stats['cycles']}, "
-                                   f"сделок {self.stats['total_trades']}, "
-                                   f"успешность {success_rate:.1f}%, "
-                                   f"прибыль ${self.stats['total_profit']:.2f}")
+                    self.logger.info("📊 Статистика: время работы %.1fч, циклов %d, сделок %d, "
+                                     "успешность %.1f%%, прибыль $%.2f, потеряно записей лога %d",
+                                     uptime / 3600, self.stats['cycles'], self.stats['total_trades'],
+                                     success_rate, self.stats['total_profit'], self.report_dropped_logs())
+                    self.logger.info(f"⏱️ Задержки tick-to-trade:\n{format_latency_summary(self.latency.summary())}")
+                    self.logger.info("⌛ Жизнь возможностей:\n%s",
+                                     format_lifetime_summary(self.opportunity_analytics.summary()))
+                    self.logger.info("📉 Проскальзывание:\n%s", format_slippage_summary(self.slippage.summary()))
+                    self.scheduler.save()
                     
                     # Обновляем статистику в файле управления
                     self.update_stats_to_control()
@@ -654,14 +1462,14 @@ class TriangularArbitrageBot:
                 
                 # Пауза между циклами (2 минуты)
                 sleep_time = 120
-                self.logger.info(f"⏳ Ожидание {sleep_time} секунд...")
+                self.logger.info("⏳ Ожидание %d секунд...", sleep_time)
                 await asyncio.sleep(sleep_time)
                 
             except KeyboardInterrupt:
                 self.logger.info("⏹️ Остановка по запросу пользователя")
                 break
             except Exception as e:
-                self.logger.error(f"❌ Ошибка цикла: {e}")
+                self.logger.error("❌ Ошибка цикла: %s", e)
                 await asyncio.sleep(30)
         
         self.is_running = False
@@ -684,6 +1492,23 @@ class TriangularArbitrageBot:
 🔺 Только треугольный арбитраж на MEXC
         """)
         
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        
+        if self.book_feed:
+            await self.book_feed.stop()
+        
+        self.scheduler.save()
+        
+        if self.quote_feed:
+            await asyncio.to_thread(self.quote_feed.stop)
+        if isinstance(self.quotes, SharedQuoteTable):
+            self.quotes.close()
+        
+        for task in (self.market_refresh_task, self.market_refresh_loop_task, self.lifetime_task):
+            if task and not task.done():
+                task.cancel()
+        
         if self.exchange:
             await self.exchange.close()
 
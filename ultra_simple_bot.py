@@ -9,6 +9,8 @@ import time
 import os
 from datetime import datetime
 
+from valuation import free_balances, value_portfolio
+
 # Загружаем переменные окружения
 try:
     from dotenv import load_dotenv
@@ -73,33 +75,30 @@ class UltraSimpleBot:
             balance = exchange.fetch_balance()
             
             # Собираем валюты с балансом
-            currencies = []
-            total_usdt = 0
+            balances = free_balances(balance, min_amount=0.001)
             
-            for currency, info in balance.items():
-                free = info.get('free', 0)
-                if free > 0.001:
-                    currencies.append(f"{currency}: {free:.6f}")
-                    
-                    if currency == 'USDT':
-                        total_usdt += free
-                    else:
-                        # Пробуем оценить в USDT
-                        try:
-                            ticker = exchange.fetch_ticker(f"{currency}/USDT")
-                            usdt_value = free * ticker['last']
-                            total_usdt += usdt_value
-                            currencies[-1] += f" (≈{usdt_value:.2f} USDT)"
-                        except:
-                            pass
-            
-            if not currencies:
+            if not balances:
                 return "Нет доступных средств на MEXC"
             
+            # Оцениваем весь баланс одним запросом тикеров
+            try:
+                tickers = exchange.fetch_tickers()
+            except Exception:
+                tickers = {}
+            
+            valuation = value_portfolio(balances, tickers, 'USDT')
+            
+            currencies = []
+            for asset in valuation.assets:
+                line = f"{asset.currency}: {asset.amount:.6f}"
+                if asset.currency != 'USDT' and asset.value > 0:
+                    line += f" (≈{asset.value:.2f} USDT)"
+                currencies.append(line)
+            
             # Формируем отчет
             report = "💰 ОТЧЕТ О БАЛАНСЕ MEXC\n\n"
             report += "\n".join(currencies[:10])
-            report += f"\n\n💵 Общая стоимость: ≈{total_usdt:.2f} USDT"
+            report += f"\n\n💵 Общая стоимость: ≈{valuation.total:.2f} USDT"
             
             return report
             
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Торговая вселенная по ликвидности
+Пары ранжируются по объему (quoteVolume в USDT), спреду и глубине лучших уровней.
+Из ликвидных валют строятся треугольники, сканируются и подписываются только лучшие N,
+а треугольники с мертвыми парами (делистинг, нет котировок, нет объема) вытесняются.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from triangles import BASE_CURRENCIES, Triangle, is_tradable
+
+# Валюты, которые считаются равными доллару при пересчете объема
+USD_CURRENCIES = ('USDT', 'USDC', 'FDUSD', 'TUSD', 'DAI')
+
+
+@dataclass
+class PairLiquidity:
+    """Ликвидность одной пары"""
+    symbol: str
+    volume_usd: float   # суточный объем в USDT
+    spread_bps: float
+    depth_usd: float    # объем на лучших bid + ask в USDT (0 - биржа не отдала объемы)
+
+
+@dataclass
+class Universe:
+    """Результат пересчета вселенной"""
+    currencies: List[str]                        # валюты для построения треугольников
+    triangles: List[Triangle]                    # треугольники для сканирования, лучшие первыми
+    dead_symbols: Set[str] = field(default_factory=set)
+    evicted: List[Triangle] = field(default_factory=list)
+    updated: float = 0.0
+
+
+def usd_rates(tickers: Mapping[str, Mapping]) -> Dict[str, float]:
+    """Цена валюты в USDT по парам X/USDT (стейблкоины - 1.0)"""
+    rates = {currency: 1.0 for currency in USD_CURRENCIES}
+    for symbol, ticker in tickers.items():
+        if not symbol.endswith('/USDT'):
+            continue
+        bid, ask = ticker.get('bid') or 0.0, ticker.get('ask') or 0.0
+        price = (bid + ask) / 2 if bid > 0 and ask > 0 else ticker.get('last') or 0.0
+        if price > 0:
+            rates.setdefault(symbol.split('/')[0], price)
+    return rates
+
+
+def pair_liquidity(symbol: str, ticker: Mapping, rates: Mapping[str, float]) -> Optional[PairLiquidity]:
+    """Ликвидность пары; None - пара мертвая (нет котировки, объема или курса к USDT)"""
+    bid, ask = ticker.get('bid') or 0.0, ticker.get('ask') or 0.0
+    if bid <= 0 or ask <= 0 or ask < bid:
+        return None
+    base, quote = symbol.split('/', 1)
+    rate = rates.get(quote)
+    if not rate:
+        return None
+    volume = ticker.get('quoteVolume')
+    if volume is None and ticker.get('baseVolume') is not None:
+        volume = ticker['baseVolume'] * (bid + ask) / 2
+    if not volume:
+        return None
+    mid = (bid + ask) / 2
+    depth = ((ticker.get('bidVolume') or 0.0) * bid + (ticker.get('askVolume') or 0.0) * ask) * rate
+    return PairLiquidity(symbol, volume * rate, (ask - bid) / mid * 1e4, depth)
+
+
+class UniverseManager:
+    """
+    Периодический отбор ликвидных пар и треугольников.
+    Треугольник оценивается по самой слабой ноге: объем узкого места, деленный на
+    суммарный спред ног, - туда, где исполнение реально возможно.
+    """
+
+    def __init__(self, max_triangles: int = 300, max_currencies: int = 60,
+                 min_volume_usd: float = 50_000.0, max_spread_bps: float = 50.0,
+                 min_depth_usd: float = 0.0, base_currencies: Sequence[str] = BASE_CURRENCIES):
+        self.max_triangles = max_triangles
+        self.max_currencies = max_currencies
+        self.min_volume_usd = min_volume_usd
+        self.max_spread_bps = max_spread_bps
+        self.min_depth_usd = min_depth_usd
+        self.base_currencies = list(base_currencies)
+        self.live: Dict[str, PairLiquidity] = {}
+        self.updated: Optional[float] = None
+
+    def is_live(self, pair: Optional[PairLiquidity]) -> bool:
+        if pair is None:
+            return False
+        if pair.volume_usd < self.min_volume_usd or pair.spread_bps > self.max_spread_bps:
+            return False
+        # Объемы лучших уровней отдают не все тикеры - проверяем глубину, только если она есть
+        return not (self.min_depth_usd and 0 < pair.depth_usd < self.min_depth_usd)
+
+    def rank_pairs(self, tickers: Mapping[str, Mapping], markets: Mapping[str, Mapping]) -> Dict[str, PairLiquidity]:
+        """Живые пары с их ликвидностью"""
+        rates = usd_rates(tickers)
+        live = {}
+        for symbol, market in markets.items():
+            if '/' not in symbol or not is_tradable(market):
+                continue
+            pair = pair_liquidity(symbol, tickers.get(symbol) or {}, rates)
+            if self.is_live(pair):
+                live[symbol] = pair
+        return live
+
+    def select_currencies(self, live: Mapping[str, PairLiquidity]) -> List[str]:
+        """Валюты с самым большим объемом к базовым валютам"""
+        volume: Dict[str, float] = {}
+        bases = set(self.base_currencies)
+        for symbol, pair in live.items():
+            crypto, quote = symbol.split('/', 1)
+            if quote in bases:
+                volume[crypto] = max(volume.get(crypto, 0.0), pair.volume_usd)
+        ranked = sorted(volume, key=volume.get, reverse=True)
+        return ranked[:self.max_currencies]
+
+    def triangle_score(self, triangle: Triangle, live: Optional[Mapping[str, PairLiquidity]] = None) -> float:
+        """Объем самой слабой ноги с поправкой на суммарный спред; 0 - есть мертвая нога"""
+        live = self.live if live is None else live
+        legs = [live.get(symbol) for symbol in triangle[:3]]
+        if not all(legs):
+            return 0.0
+        bottleneck = min(pair.volume_usd for pair in legs)
+        spread = sum(pair.spread_bps for pair in legs)
+        return bottleneck / (1 + spread / 10)
+
+    def select(self, triangles: Iterable[Triangle]) -> Tuple[List[Triangle], List[Triangle]]:
+        """Лучшие max_triangles живых треугольников и вытесненные мертвые"""
+        triangles = list(triangles)
+        if not self.live:
+            return triangles, []
+        scored = [(self.triangle_score(t), t) for t in triangles]
+        evicted = [t for score, t in scored if score <= 0]
+        alive = [(score, t) for score, t in scored if score > 0]
+        alive.sort(key=lambda item: item[0], reverse=True)
+        return [t for _score, t in alive[:self.max_triangles]], evicted
+
+    def refresh(self, tickers: Mapping[str, Mapping], markets: Mapping[str, Mapping],
+                triangles: Iterable[Triangle] = ()) -> Universe:
+        """Пересчитать вселенную по снимку тикеров"""
+        previous = set(self.live)
+        self.live = self.rank_pairs(tickers, markets)
+        self.updated = time.time()
+        selected, evicted = self.select(triangles)
+        return Universe(
+            currencies=self.select_currencies(self.live),
+            triangles=selected,
+            dead_symbols=previous - set(self.live),
+            evicted=evicted,
+            updated=self.updated,
+        )
+
+    def is_due(self, interval: float) -> bool:
+        return self.updated is None or time.time() - self.updated >= interval
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Оценка портфеля по одному снимку тикеров
+Все монеты оцениваются из одного fetch_tickers (или хранилища котировок),
+монеты без прямой пары /USDT - через самый выгодный путь в графе рынков
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Служебные ключи баланса ccxt, которые не являются валютами
+_BALANCE_SERVICE_KEYS = {'info', 'free', 'used', 'total', 'timestamp', 'datetime', 'debt'}
+
+
+@dataclass
+class AssetValuation:
+    """Оценка одной валюты"""
+    currency: str
+    amount: float
+    value: float
+    path: List[str] = field(default_factory=list)  # валюта -> ... -> quote
+
+    @property
+    def is_direct(self) -> bool:
+        return len(self.path) <= 2
+
+
+@dataclass
+class PortfolioValuation:
+    """Оценка всего баланса"""
+    quote: str
+    assets: List[AssetValuation]
+    total: float
+    unpriced: List[str]
+
+
+def free_balances(balance: Mapping, min_amount: float = 0.0) -> Dict[str, float]:
+    """Свободные остатки из ответа fetch_balance"""
+    result = {}
+    for currency, info in balance.items():
+        if currency in _BALANCE_SERVICE_KEYS or not isinstance(info, Mapping):
+            continue
+        free = info.get('free') or 0.0
+        if free > min_amount:
+            result[currency] = free
+    return result
+
+
+def build_conversion_graph(tickers: Mapping[str, Mapping]) -> Dict[str, List[Tuple[str, float, str]]]:
+    """
+    Граф конвертаций: валюта -> [(куда, курс, символ)].
+    Продажа base за quote идет по bid, покупка base за quote - по 1/ask.
+    Если стакана нет, используется last.
+    """
+    graph: Dict[str, List[Tuple[str, float, str]]] = {}
+    for symbol, ticker in tickers.items():
+        if '/' not in symbol or not ticker:
+            continue
+        base, quote = symbol.split('/', 1)
+        quote = quote.split(':', 1)[0]
+        last = ticker.get('last') or 0.0
+        bid = ticker.get('bid') or last
+        ask = ticker.get('ask') or last
+        if bid > 0:
+            graph.setdefault(base, []).append((quote, bid, symbol))
+        if ask > 0:
+            graph.setdefault(quote, []).append((base, 1.0 / ask, symbol))
+    return graph
+
+
+def best_rates_to(graph: Dict[str, List[Tuple[str, float, str]]], target: str,
+                  max_hops: int = 3) -> Dict[str, Tuple[float, Optional[str]]]:
+    """
+    Лучший курс каждой валюты в target не более чем за max_hops конвертаций
+    (Bellman-Ford с ограничением глубины). Возвращает {валюта: (курс, следующая валюта)}.
+    """
+    best: Dict[str, Tuple[float, Optional[str]]] = {target: (1.0, None)}
+    for _ in range(max_hops):
+        updated = dict(best)
+        changed = False
+        for currency, edges in graph.items():
+            if currency == target:
+                continue
+            for to_currency, rate, _symbol in edges:
+                if to_currency not in best:
+                    continue
+                candidate = rate * best[to_currency][0]
+                if candidate > updated.get(currency, (0.0, None))[0]:
+                    updated[currency] = (candidate, to_currency)
+                    changed = True
+        best = updated
+        if not changed:
+            break
+    return best
+
+
+def _path(best: Dict[str, Tuple[float, Optional[str]]], currency: str, max_len: int) -> List[str]:
+    path = [currency]
+    while best[path[-1]][1] is not None and len(path) <= max_len:
+        path.append(best[path[-1]][1])
+    return path
+
+
+def value_portfolio(balances: Mapping[str, float], tickers: Mapping[str, Mapping],
+                    quote: str = 'USDT', max_hops: int = 3) -> PortfolioValuation:
+    """
+    Оценить остатки {валюта: количество} в quote по одному снимку тикеров.
+    tickers - результат fetch_tickers() или любой словарь symbol -> {bid, ask, last}.
+    """
+    graph = build_conversion_graph(tickers)
+    best = best_rates_to(graph, quote, max_hops)
+
+    assets = []
+    unpriced = []
+    total = 0.0
+    for currency, amount in balances.items():
+        if currency not in best:
+            unpriced.append(currency)
+            assets.append(AssetValuation(currency, amount, 0.0, []))
+            continue
+        rate = best[currency][0]
+        value = amount * rate
+        total += value
+        assets.append(AssetValuation(currency, amount, value, _path(best, currency, max_hops)))
+
+    assets.sort(key=lambda a: a.value, reverse=True)
+    return PortfolioValuation(quote=quote, assets=assets, total=total, unpriced=unpriced)
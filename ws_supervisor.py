@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Шардирование подписок WebSocket и надзор за соединениями
+MEXC ограничивает число подписок на одно соединение, а ccxt.pro держит одно соединение
+на экземпляр биржи. Поэтому символы раскладываются по нескольким экземплярам (шардам),
+у каждого свой BookFeed. Надзор считает поток сообщений по шарду: если шард с подписками
+замолчал дольше gap_timeout, его котировки помечаются устаревшими, соединение закрывается
+и пересоздается после паузы с разбросом, подписки восстанавливаются.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from book_feed import BookFeed, BookTop
+from quote_store import QuoteStore
+
+logger = logging.getLogger(__name__)
+
+# Лимит подписок на одно соединение MEXC spot
+MEXC_SUBSCRIPTIONS_PER_CONNECTION = 30
+
+
+def mexc_exchange():
+    """Публичный клиент ccxt.pro для одного соединения (ключи для стаканов не нужны)"""
+    import ccxt.pro as ccxt
+    return ccxt.mexc({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
+
+
+class ConnectionShard:
+    """Одно соединение: экземпляр биржи, его стаканы и статистика сообщений"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.symbols: List[str] = []
+        self.exchange = None
+        self.feed: Optional[BookFeed] = None
+        self.messages = 0
+        self.rate = 0.0                 # сообщений в секунду (EWMA)
+        self.last_message = 0.0         # time.monotonic() последнего сообщения
+        self.connected_at = 0.0
+        self.down = False
+        self.failures = 0               # перезапуски подряд без единого сообщения
+        self.restarts = 0
+        self._counted = 0
+        self._counted_at = 0.0
+
+    def on_message(self, _symbol: str):
+        self.messages += 1
+        self.last_message = time.monotonic()
+        self.failures = 0
+
+    def silent_for(self, now: float) -> float:
+        """Сколько секунд шард с подписками не получал сообщений"""
+        if not self.symbols:
+            return 0.0
+        return now - max(self.last_message, self.connected_at)
+
+    def update_rate(self, now: float, alpha: float = 0.3):
+        if self._counted_at:
+            elapsed = now - self._counted_at
+            if elapsed > 0:
+                current = (self.messages - self._counted) / elapsed
+                self.rate = current if not self.rate else alpha * current + (1 - alpha) * self.rate
+        self._counted, self._counted_at = self.messages, now
+
+
+class WsSupervisor:
+    """
+    Стаканы по нескольким соединениям с переподключением замолчавших.
+    Интерфейс совпадает с BookFeed (watch, unwatch, wait_ready, book, stop),
+    поэтому бот и процессы-воркеры используют его вместо одного BookFeed.
+    """
+
+    def __init__(self, exchange_factory: Callable, quotes: QuoteStore, depth: int = 10,
+                 per_connection: int = MEXC_SUBSCRIPTIONS_PER_CONNECTION, max_connections: int = 0,
+                 gap_timeout: float = 15.0, check_interval: float = 1.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 on_reconnect: Optional[Callable[[], None]] = None,
+                 on_resync: Optional[Callable[[str], None]] = None):
+        self.exchange_factory = exchange_factory
+        self.quotes = quotes
+        self.depth = depth
+        self.per_connection = per_connection
+        self.max_connections = max_connections  # 0 - без ограничения
+        self.gap_timeout = gap_timeout
+        self.check_interval = check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_reconnect = on_reconnect
+        self.on_resync = on_resync
+        self.shards: List[ConnectionShard] = []
+        self.by_symbol: 'OrderedDict[str, ConnectionShard]' = OrderedDict()
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._restarting: Dict[int, asyncio.Task] = {}
+
+    @property
+    def max_symbols(self) -> int:
+        if self.max_connections <= 0:
+            return 1 << 30
+        return self.max_connections * self.per_connection
+
+    def _connect(self, shard: ConnectionShard):
+        shard.exchange = self.exchange_factory()
+        shard.feed = BookFeed(shard.exchange, self.quotes, self.depth, max_symbols=self.per_connection,
+                              on_reconnect=self.on_reconnect, on_message=shard.on_message,
+                              on_resync=self.on_resync)
+        shard.connected_at = time.monotonic()
+        shard.down = False
+        if shard.symbols:
+            shard.feed.watch(shard.symbols)
+
+    def _shard_with_room(self) -> Optional[ConnectionShard]:
+        for shard in self.shards:
+            if len(shard.symbols) < self.per_connection:
+                return shard
+        if self.max_connections and len(self.shards) >= self.max_connections:
+            return None
+        shard = ConnectionShard(len(self.shards))
+        self._connect(shard)
+        self.shards.append(shard)
+        return shard
+
+    def watch(self, symbols: Iterable[str]):
+        """
+        Подписать символы; новые занимают свободные места в существующих соединениях.
+        При исчерпании лимита соединений вытесняется давно не нужный символ, как в BookFeed.
+        """
+        if self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitor())
+        for symbol in symbols:
+            if symbol in self.by_symbol:
+                self.by_symbol.move_to_end(symbol)
+                continue
+            shard = self._shard_with_room()
+            if shard is None:
+                self.unwatch([next(iter(self.by_symbol))])
+                shard = self._shard_with_room()
+            shard.symbols.append(symbol)
+            self.by_symbol[symbol] = shard
+            if not shard.down:
+                shard.feed.watch([symbol])
+
+    def unwatch(self, symbols: Iterable[str]):
+        for symbol in symbols:
+            shard = self.by_symbol.pop(symbol, None)
+            if shard is None:
+                continue
+            shard.symbols.remove(symbol)
+            shard.feed.unwatch([symbol])
+
+    async def wait_ready(self, symbols: Iterable[str], timeout: float) -> bool:
+        by_shard: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            shard = self.by_symbol.get(symbol)
+            if shard is not None and not shard.down:
+                by_shard.setdefault(shard.index, []).append(symbol)
+        results = await asyncio.gather(*(self.shards[index].feed.wait_ready(shard_symbols, timeout)
+                                         for index, shard_symbols in by_shard.items()))
+        return all(results)
+
+    def book(self, symbol: str) -> Optional[BookTop]:
+        shard = self.by_symbol.get(symbol)
+        if shard is None or shard.down:
+            return None
+        return shard.feed.book(symbol)
+
+    def unhealthy_symbols(self) -> Set[str]:
+        """Символы с испорченным стаканом во всех соединениях"""
+        unhealthy: Set[str] = set()
+        for shard in self.shards:
+            if shard.feed is not None and not shard.down:
+                unhealthy |= shard.feed.unhealthy_symbols()
+        return unhealthy
+
+    def backoff(self, failures: int) -> float:
+        """Экспоненциальная пауза с разбросом: шарды не переподключаются одновременно"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** min(failures, 10))
+        return random.uniform(delay / 2, delay)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = time.monotonic()
+            for shard in self.shards:
+                shard.update_rate(now)
+                if shard.down or shard.index in self._restarting:
+                    continue
+                silent = shard.silent_for(now)
+                if silent > self.gap_timeout:
+                    logger.warning("🔌 Соединение %d молчит %.1fс (%d символов), переподключение",
+                                   shard.index, silent, len(shard.symbols))
+                    self._restarting[shard.index] = asyncio.create_task(self._restart(shard))
+
+    async def _restart(self, shard: ConnectionShard):
+        """Пометить котировки устаревшими, закрыть соединение и открыть заново после паузы"""
+        try:
+            shard.down = True
+            self.quotes.mark_stale(shard.symbols)
+            if self.on_reconnect:
+                self.on_reconnect()
+            await self._disconnect(shard)
+            delay = self.backoff(shard.failures)
+            shard.failures += 1
+            shard.restarts += 1
+            await asyncio.sleep(delay)
+            self._connect(shard)
+            logger.info("🔌 Соединение %d восстановлено, переподписано %d символов", shard.index, len(shard.symbols))
+        finally:
+            self._restarting.pop(shard.index, None)
+
+    @staticmethod
+    async def _disconnect(shard: ConnectionShard):
+        if shard.feed is not None:
+            await shard.feed.stop()
+        close = getattr(shard.exchange, 'close', None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                logger.debug("Закрытие соединения %d: %s", shard.index, e)
+
+    def stats(self) -> List[Dict]:
+        """Состояние соединений для метрик и логов"""
+        now = time.monotonic()
+        return [
+            {'connection': shard.index, 'symbols': len(shard.symbols), 'rate': round(shard.rate, 2),
+             'silent': round(shard.silent_for(now), 1), 'down': shard.down, 'restarts': shard.restarts}
+            for shard in self.shards
+        ]
+
+    async def stop(self):
+        tasks = list(self._restarting.values())
+        if self._monitor_task is not None:
+            tasks.append(self._monitor_task)
+            self._monitor_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for shard in self.shards:
+            await self._disconnect(shard)